@@ -0,0 +1,50 @@
+"""
+Address matching, contact labels and the parcel spatial join
+"""
+import pytest
+import geopandas as gpd
+
+from conftest import run
+from fandu.utils import match_addresses
+from fandu.contact_utils import build_address_labels
+from fandu.text_utils import normalize_text_columns, join_text_columns
+from fandu.aggregates import AggregateStore
+
+
+def bench_match_addresses(benchmark, scale, hht_homes, addresses):
+    if scale >= 100:
+        pytest.skip("match_addresses is queries x addresses; hours at 100x")
+    master = addresses[["AddressId", "AddressLabel"]].copy()
+    unmatched = hht_homes[["clean_address"]].copy()
+    matched, _ = run(benchmark, scale, match_addresses, master, unmatched)
+    assert len(matched) > 0
+
+
+def bench_build_address_labels(benchmark, scale, contacts):
+    labels = run(benchmark, scale, build_address_labels, contacts)
+    assert len(labels) == len(contacts)
+
+
+def bench_parcel_sjoin(benchmark, scale, parcels, addresses):
+    joined = run(
+        benchmark, scale, gpd.sjoin,
+        addresses, parcels[["ParcelID", "geometry"]], how="left", predicate="within",
+    )
+    assert joined["ParcelID"].notna().all()
+
+
+def bench_normalize_text_columns(benchmark, scale, addresses):
+    cleaned, counts = run(benchmark, scale, normalize_text_columns, addresses, name="Addresses")
+    assert len(cleaned) == len(addresses)
+
+
+def bench_join_text_columns(benchmark, scale, addresses):
+    result = run(benchmark, scale, join_text_columns, addresses, ["BuildingNumber", "StreetName", "StreetType"])
+    assert len(result) == len(addresses)
+
+
+def bench_parcel_aggregates(benchmark, scale, parcels):
+    # The synthetic parcels have no mailing address, so OwnerOccupied is skipped
+    store = run(benchmark, scale, AggregateStore.build, parcels, "Parcels")
+    assert len(store.aggregates) > 0
+
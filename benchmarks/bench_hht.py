@@ -0,0 +1,48 @@
+"""
+HHT workbook parsing, GeoJSON export and HHTAnalysis summaries
+"""
+import pytest
+
+from conftest import run
+from fandu.utils import extract_and_fill_year_and_chair_column, split_address_and_host, save_to_geojson
+from fandu.hht_analysis import HHTAnalysis, plan_routes
+
+SUMMARIES = [
+    "yearly_summary", "annotated_years", "chair_summary", "street_summary",
+    "number_summary", "address_summary", "place_summary",
+]
+
+
+def bench_extract_and_fill_year_and_chair_column(benchmark, scale, hht_workbook):
+    result = run(benchmark, scale, extract_and_fill_year_and_chair_column, hht_workbook)
+    assert len(result) > 0
+
+
+def bench_split_address_and_host(benchmark, scale, hht_workbook):
+    rows = extract_and_fill_year_and_chair_column(hht_workbook)
+    result = run(benchmark, scale, split_address_and_host, rows)
+    assert "host_name" in result.columns
+
+
+def bench_save_to_geojson(benchmark, scale, hht_homes, tmp_path):
+    run(benchmark, scale, save_to_geojson, hht_homes, tmp_path / "hht.geojson")
+
+
+def _fresh_summary(df, summary):
+    # A new instance per call, so cached properties (aggregates) are rebuilt and timed
+    hht = HHTAnalysis.__new__(HHTAnalysis)
+    hht.df = df
+    return getattr(hht, summary)
+
+
+@pytest.mark.parametrize("summary", SUMMARIES)
+def bench_hht_analysis(benchmark, scale, hht_homes_csv, summary):
+    df = HHTAnalysis(hht_homes_csv).df
+    result = run(benchmark, scale, _fresh_summary, df, summary)
+    assert len(result) > 0
+
+
+def bench_plan_routes(benchmark, scale, hht_homes):
+    homes = hht_homes[hht_homes["latitude"].notna()]
+    result = run(benchmark, scale, plan_routes, homes)
+    assert len(result) == len(homes)
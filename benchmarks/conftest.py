@@ -0,0 +1,91 @@
+"""
+Shared fixtures for the benchmark suite
+
+Data is generated once per scale and session.  Select scales with
+--scales (multiples of the Fan, default 1), e.g. `--scales 1,10,100`.
+"""
+from functools import lru_cache
+from pathlib import Path
+
+import pytest
+
+import synthetic
+
+BASELINES = Path(__file__).parent / "baselines"
+
+
+def pytest_addoption(parser):
+    parser.addoption("--scales", default="1", help="Comma-separated data scales (multiples of the Fan), e.g. 1,10,100")
+
+
+@pytest.hookimpl(tryfirst=True)
+def pytest_configure(config):
+    # Keep saved runs with the suite, wherever pytest is started from
+    if config.getoption("benchmark_storage", None) == "file://./.benchmarks":
+        config.option.benchmark_storage = f"file://{BASELINES}"
+
+
+def pytest_generate_tests(metafunc):
+    if "scale" in metafunc.fixturenames:
+        scales = [int(s) for s in metafunc.config.getoption("scales").split(",")]
+        metafunc.parametrize("scale", scales, ids=[f"{s}x" for s in scales])
+
+
+def run(benchmark, scale, fn, *args, **kwargs):
+    """Benchmark `fn`, with fewer rounds at large scales where one call takes seconds."""
+    if scale <= 1:
+        return benchmark(fn, *args, **kwargs)
+    return benchmark.pedantic(fn, args=args, kwargs=kwargs, rounds=3 if scale <= 10 else 1, iterations=1)
+
+
+@lru_cache(maxsize=None)
+def _hht_workbook(scale):
+    return synthetic.make_hht_workbook(scale)
+
+
+@lru_cache(maxsize=None)
+def _hht_homes(scale):
+    return synthetic.make_hht_homes(scale)
+
+
+@lru_cache(maxsize=None)
+def _contacts(scale):
+    return synthetic.make_contacts(scale)
+
+
+@lru_cache(maxsize=None)
+def _layers(scale):
+    return synthetic.make_parcels_and_addresses(scale)
+
+
+@pytest.fixture
+def hht_workbook(scale):
+    """Raw workbook rows, as returned by load_excel_sheet(..., column_names=['data'])."""
+    return _hht_workbook(scale).copy()
+
+
+@pytest.fixture
+def hht_homes(scale):
+    return _hht_homes(scale).copy()
+
+
+@pytest.fixture
+def hht_homes_csv(scale, tmp_path_factory):
+    path = tmp_path_factory.mktemp(f"hht_{scale}x") / "hht_addresses_with_geo.csv"
+    _hht_homes(scale).to_csv(path, index=False)
+    return path
+
+
+@pytest.fixture
+def contacts(scale):
+    return _contacts(scale).copy()
+
+
+@pytest.fixture
+def parcels(scale):
+    return _layers(scale)[0]
+
+
+@pytest.fixture
+def addresses(scale):
+    return _layers(scale)[1]
@@ -0,0 +1,95 @@
+"""
+CLI cold-start benchmark
+
+Runs the fandu CLI in fresh interpreters under `python -X importtime` and
+fails if startup pulls in the scientific stack or goes over budget.
+
+    python benchmarks/startup.py
+    python benchmarks/startup.py --budget-ms 150 --top 15
+"""
+import os
+import re
+import sys
+import time
+import subprocess
+
+from pathlib import Path
+
+import click
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+# Scenario name -> interpreter arguments
+SCENARIOS = {
+    "import": ["-c", "import fandu._main"],
+    "--help": ["-m", "fandu._main", "--help"],
+    "dummy": ["-m", "fandu._main", "dummy"],
+}
+
+# Top-level packages that must not be imported just to start the CLI
+FORBIDDEN = [
+    "pandas", "numpy", "geopandas", "shapely", "pyproj", "pyogrio", "pyarrow",
+    "duckdb", "matplotlib", "IPython", "rapidfuzz", "sklearn", "scipy", "folium", "loguru",
+]
+
+_IMPORTTIME = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def run_importtime(args: list[str]) -> tuple[list[tuple[str, int, int]], float]:
+    """
+    Run `python -X importtime <args>` from the repo root.
+
+    Returns
+    -------
+    tuple
+        ([(module, self_us, cumulative_us), ...], wall-clock seconds)
+    """
+    env = dict(os.environ, PYTHONPATH=str(REPO_ROOT))
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", *args],
+        cwd=REPO_ROOT, env=env, capture_output=True, text=True,
+    )
+    wall = time.perf_counter() - start
+    if result.returncode != 0:
+        raise RuntimeError(f"{' '.join(args)} failed:\n{result.stderr[-2000:]}")
+
+    modules = []
+    for line in result.stderr.splitlines():
+        match = _IMPORTTIME.match(line)
+        if match:
+            modules.append((match.group(4), int(match.group(1)), int(match.group(2))))
+    return modules, wall
+
+
+@click.command()
+@click.option("--budget-ms", type=float, default=150.0, show_default=True, help="Maximum total import time per scenario")
+@click.option("--repeat", type=int, default=5, show_default=True, help="Runs per scenario (the fastest is reported)")
+@click.option("--top", type=int, default=10, show_default=True, help="Slowest imports listed for each scenario")
+def main(budget_ms, repeat, top):
+    """Benchmark and guard fandu CLI cold start."""
+    failures = []
+    for name, args in SCENARIOS.items():
+        runs = [run_importtime(args) for _ in range(repeat)]
+        modules, _ = min(runs, key=lambda run: sum(m[1] for m in run[0]))
+        total_ms = sum(self_us for _, self_us, _ in modules) / 1000
+        heavy = sorted({m.split(".")[0] for m, _, _ in modules} & set(FORBIDDEN))
+
+        click.echo(f"\n== {name}: imports {total_ms:.1f} ms, wall {min(r[1] for r in runs) * 1000:.0f} ms, "
+                   f"{len(modules)} modules")
+        for module, _, cumulative in sorted(modules, key=lambda m: -m[2])[:top]:
+            click.echo(f"   {cumulative / 1000:8.1f} ms  {module}")
+
+        if heavy:
+            failures.append(f"{name}: imports {', '.join(heavy)}")
+        if total_ms > budget_ms:
+            failures.append(f"{name}: {total_ms:.1f} ms of imports exceeds the {budget_ms:.0f} ms budget")
+
+    if failures:
+        click.echo("\nFAILED\n  " + "\n  ".join(failures))
+        sys.exit(1)
+    click.echo("\nOK")
+
+
+if __name__ == "__main__":
+    main()
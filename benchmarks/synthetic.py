@@ -0,0 +1,245 @@
+"""
+Synthetic Fan-shaped data at any scale
+
+Generators for the inputs the hot paths see, sized relative to the real Fan
+(scale=1 is roughly one neighborhood; 10 and 100 approach city scale):
+
+    make_hht_workbook   raw HHT workbook lines ('data' column), as read by load_excel_sheet
+    make_hht_homes      cleaned, geocoded HHT homes, as read by HHTAnalysis
+    make_contacts       a Wild Apricot contact export, as in precious/FDA_contacts-*.csv
+    make_parcels_and_addresses
+                        Parcels polygons and Addresses points (EPSG:32147)
+
+Everything is deterministic for a given (scale, seed).
+"""
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import geopandas as gpd
+import shapely
+
+# Row counts of the real Fan data at scale=1
+FAN_SIZE = {
+    "hht_years": 62,
+    "hht_homes": 576,
+    "contacts": 1848,
+    "parcels": 3464,
+    "addresses": 11313,
+}
+
+PROJECTED_CRS = "EPSG:32147"
+
+# E-W streets of one Fan-sized tile, north to south
+STREETS = [
+    ("Monument", "Ave"), ("Park", "Ave"), ("Hanover", "Ave"), ("Grove", "Ave"),
+    ("Stuart", "Ave"), ("Kensington", "Ave"), ("Floyd", "Ave"), ("Grace", "St"),
+]
+FIRST_NAMES = ["Ann", "William", "Louise", "Charles", "Betty", "James", "Patricia", "Sam", "Barbara",
+               "John", "Suzanne", "Horace", "Sarah", "Mary", "Robert", "Elizabeth", "David", "Susan"]
+LAST_NAMES = ["Velz", "Carleton", "Fowlkes", "Wilson", "Coons", "Glave", "Cates", "Perry", "Harrison",
+              "McCowan", "Sessoms", "Watlington", "Taylor", "Moore", "Jackson", "Martin", "Lee", "Clark"]
+PLACES = ["Grace Covenant Church", "Fan Free Clinic", "Branch House", "Stuart Circle Hospital"]
+DASHES = [" – ", " -- ", " - ", " — "]
+
+_LOT_WIDTH = 10.0       # meters
+_LOT_DEPTH = 40.0
+_BLOCK_SPACING = 100.0
+_TILE_ORIGIN = (3_560_000.0, 1_220_000.0)    # near the Fan in EPSG:32147
+
+
+def _rng(scale: float, seed: int) -> np.random.Generator:
+    return np.random.default_rng([seed, int(scale * 1000)])
+
+
+def _street_names(rng: np.random.Generator, n: int, tiles: int) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Random (number, street, type) triples drawn from `tiles` Fan-sized tiles."""
+    street = rng.integers(0, len(STREETS), n)
+    tile = rng.integers(0, tiles, n)
+    names = np.array([s for s, _ in STREETS], dtype=object)[street]
+    names = np.where(tile > 0, names + tile.astype(str), names)
+    types = np.array([t for _, t in STREETS], dtype=object)[street]
+    numbers = 1000 + 2 * rng.integers(0, FAN_SIZE["parcels"] // len(STREETS), n)
+    return numbers, names, types
+
+
+def _people(rng: np.random.Generator, n: int) -> tuple[np.ndarray, np.ndarray]:
+    first = np.array(FIRST_NAMES, dtype=object)[rng.integers(0, len(FIRST_NAMES), n)]
+    last = np.array(LAST_NAMES, dtype=object)[rng.integers(0, len(LAST_NAMES), n)]
+    return first, last
+
+
+def make_hht_workbook(scale: float = 1, seed: int = 0) -> pd.DataFrame:
+    """
+    Raw HHT workbook rows: a '<year> - Chair, ...' header per year (some with
+    a [note]), home lines '<address> – <hosts>', and occasional 'Tour B' markers.
+    """
+    rng = _rng(scale, seed)
+    years = max(int(FAN_SIZE["hht_years"] * scale), 1)
+    homes_per_year = FAN_SIZE["hht_homes"] / FAN_SIZE["hht_years"]
+    tiles = max(int(np.ceil(scale)), 1)
+
+    lines = []
+    for i in range(years):
+        year = 1963 + i
+        first, last = _people(rng, 2)
+        header = f"{year} - Chair, Mrs. {first[0]} ({first[1]}) {last[0]}"
+        if rng.random() < 0.1:
+            header += f" [Tour theme {i}]"
+        lines.append(header)
+
+        count = 0 if rng.random() < 0.02 else rng.poisson(homes_per_year)
+        numbers, names, types = _street_names(rng, count, tiles)
+        hosts_first, hosts_last = _people(rng, count)
+        tour_b_at = rng.integers(1, count) if count > 2 and rng.random() < 0.15 else None
+        for j in range(count):
+            if j == tour_b_at:
+                lines.append("Tour B")
+            address = f"{numbers[j]} {names[j]} {types[j]}."
+            if rng.random() < 0.05:
+                address += f" #{rng.integers(1, 5)}"
+            if rng.random() < 0.03:
+                address += f" [{PLACES[rng.integers(0, len(PLACES))]}]"
+            dash = DASHES[rng.integers(0, len(DASHES))]
+            lines.append(f"{address}{dash}Mr. & Mrs. {hosts_first[j]} {hosts_last[j]}")
+
+    return pd.DataFrame({"data": lines})
+
+
+def write_hht_workbook(path: Path, scale: float = 1, seed: int = 0) -> Path:
+    """Write `make_hht_workbook` as an .xlsx laid out like the real workbook (3 title rows)."""
+    rows = pd.concat([pd.DataFrame({"data": [None, "HHT Chairs & Homes", None]}), make_hht_workbook(scale, seed)])
+    rows.to_excel(path, index=False, header=False)
+    return Path(path)
+
+
+def make_hht_homes(scale: float = 1, seed: int = 0) -> pd.DataFrame:
+    """Cleaned and geocoded HHT homes with the columns HHTAnalysis and save_to_geojson use."""
+    rng = _rng(scale, seed)
+    n = int(FAN_SIZE["hht_homes"] * scale)
+    years = 1963 + rng.integers(0, max(int(FAN_SIZE["hht_years"] * scale), 1), n)
+    numbers, names, types = _street_names(rng, n, max(int(np.ceil(scale)), 1))
+    chair1_first, chair1_last = _people(rng, n)
+    chair2_first, chair2_last = _people(rng, n)
+    has_chair2 = rng.random(n) < 0.3
+    host_first, host_last = _people(rng, n)
+    places = np.where(rng.random(n) < 0.03, np.array(PLACES, dtype=object)[rng.integers(0, len(PLACES), n)], None)
+
+    chair1 = chair1_first + " " + chair1_last
+    chair2 = np.where(has_chair2, chair2_first + " " + chair2_last, None)
+    address = numbers.astype(str) + " " + names + " " + types + "."
+    df = pd.DataFrame({
+        "year": years,
+        "tour": np.where(rng.random(n) < 0.1, "B", "A"),
+        "notes": np.where(rng.random(n) < 0.1, "Tour theme", None),
+        "chair": chair1,
+        "chair1": chair1,
+        "chair1_first_name": chair1_first,
+        "chair1_last_name": chair1_last,
+        "chair2": chair2,
+        "chair2_first_name": np.where(has_chair2, chair2_first, None),
+        "chair2_last_name": np.where(has_chair2, chair2_last, None),
+        "informal_chairs": np.where(has_chair2, chair1 + " & " + chair2.astype(str), chair1),
+        "address": address,
+        "street_number": numbers.astype(float),
+        "street_name": names,
+        "street_type": types,
+        "place_name": places,
+        "host_name": "Mr. & Mrs. " + host_first + " " + host_last,
+        "clean_address": address,
+        "zip_code": 23220.0,
+        "state_plane_x": 11_783_000 + rng.normal(0, 800, n),
+        "state_plane_y": 3_725_000 + rng.normal(0, 500, n),
+        "latitude": np.where(rng.random(n) < 0.96, 37.55 + rng.normal(0, 0.003, n), np.nan),
+        "longitude": -77.46 + rng.normal(0, 0.005, n),
+    })
+    return df.sort_values("year", kind="stable").reset_index(drop=True)
+
+
+def make_contacts(scale: float = 1, seed: int = 0) -> pd.DataFrame:
+    """
+    A contact export with the headers already normalized the way
+    02_Contacts_in_fan.qmd does (e.g. 'AddressLine2').
+    """
+    rng = _rng(scale, seed)
+    n = int(FAN_SIZE["contacts"] * scale)
+    numbers, names, types = _street_names(rng, n, max(int(np.ceil(scale)), 1))
+    first, last = _people(rng, n)
+
+    # Mix of spellings the label builder has to normalize
+    long_types = np.where(types == "Ave", "Avenue", "Street")
+    spelled = np.where(rng.random(n) < 0.3, long_types, types)
+    apt = np.where(rng.random(n) < 0.1, " Apt " + rng.integers(1, 20, n).astype(str), "")
+    address = numbers.astype(str) + " " + np.where(rng.random(n) < 0.2, "W ", "") + names + " " + spelled + apt
+    in_fan = rng.random(n) < 0.8
+    address = np.where(in_fan, address, rng.integers(100, 9999, n).astype(str) + " Rivermere Ln")
+    fan_address = np.where(~in_fan & (rng.random(n) < 0.3), numbers.astype(str) + " " + names + " " + types, None)
+
+    return pd.DataFrame({
+        "Id": np.arange(1, n + 1),
+        "FirstName": first,
+        "LastName": last,
+        "Email": [f"{f.lower()}.{l.lower()}{i}@example.com" for i, (f, l) in enumerate(zip(first, last))],
+        "Address": address,
+        "AddressLine2": np.where(rng.random(n) < 0.05, "Unit " + rng.integers(1, 9, n).astype(str), None),
+        "City": np.where(in_fan, "Richmond", "Glen Allen"),
+        "State": "VA",
+        "Zip": np.where(in_fan, "23220", "23059"),
+        "MemberRole": np.where(rng.random(n) < 0.6, "Bundle member", "Bundle administrator"),
+        "Fan-AssociatedAddress(RequiredIfNon-FanResident)": fan_address,
+    })
+
+
+def make_parcels_and_addresses(scale: float = 1, seed: int = 0) -> tuple[gpd.GeoDataFrame, gpd.GeoDataFrame]:
+    """
+    Parcels as lots along the E-W streets of `scale` Fan-sized tiles, and
+    address points (several per multi-unit parcel) inside them.
+
+    Returns
+    -------
+    tuple
+        (parcels, addresses) GeoDataFrames in EPSG:32147.
+    """
+    rng = _rng(scale, seed)
+    n_parcels = int(FAN_SIZE["parcels"] * scale)
+    lots_per_street = FAN_SIZE["parcels"] // len(STREETS)
+
+    idx = np.arange(n_parcels)
+    lot = idx % lots_per_street
+    street = (idx // lots_per_street) % len(STREETS)
+    tile = idx // (lots_per_street * len(STREETS))
+    x0 = _TILE_ORIGIN[0] + lot * _LOT_WIDTH + tile * (lots_per_street * _LOT_WIDTH + _BLOCK_SPACING)
+    y1 = _TILE_ORIGIN[1] - street * _BLOCK_SPACING
+
+    names = np.array([s for s, _ in STREETS], dtype=object)[street]
+    names = np.where(tile > 0, names + tile.astype(str), names)
+    types = np.array([t for _, t in STREETS], dtype=object)[street]
+    numbers = 1000 + 2 * lot
+
+    parcels = gpd.GeoDataFrame({
+        "ParcelID": [f"P{i:08d}" for i in idx],
+        "PIN": [f"W{i:010d}" for i in idx],
+        "LandUse": rng.choice(["Single Family", "Multi Family", "Condo", "Commercial"], n_parcels, p=[0.6, 0.25, 0.1, 0.05]),
+        "PropertyClass": rng.choice(["R Two Story", "R Three Story", "Apartment"], n_parcels),
+        "TotalValue": rng.integers(150_000, 2_000_000, n_parcels),
+    }, geometry=shapely.box(x0, y1 - _LOT_DEPTH, x0 + _LOT_WIDTH, y1), crs=PROJECTED_CRS)
+
+    # Units per parcel, tuned so addresses/parcel matches the Fan (~3.3)
+    units = rng.choice([1, 2, 3, 4, 6, 8, 12, 24], n_parcels, p=[0.55, 0.12, 0.08, 0.08, 0.06, 0.05, 0.04, 0.02])
+    parcel = np.repeat(idx, units)
+    unit = np.arange(len(parcel)) - np.repeat(np.cumsum(units) - units, units)
+    label = (numbers[parcel].astype(str) + " " + names[parcel] + " " + types[parcel]).astype(object)
+    label = np.where(units[parcel] > 1, label + " Unit " + (unit + 1).astype(str), label)
+
+    px = x0[parcel] + rng.uniform(1, _LOT_WIDTH - 1, len(parcel))
+    py = y1[parcel] - rng.uniform(1, _LOT_DEPTH - 1, len(parcel))
+    addresses = gpd.GeoDataFrame({
+        "AddressId": [f"{i:07d}" for i in range(len(parcel))],
+        "AddressLabel": label,
+        "BuildingNumber": numbers[parcel],
+        "StreetName": names[parcel],
+        "StreetType": types[parcel],
+        "ZipCode": "23220",
+    }, geometry=shapely.points(px, py), crs=PROJECTED_CRS)
+
+    return parcels, addresses
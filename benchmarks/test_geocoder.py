@@ -0,0 +1,44 @@
+"""
+AddressGeocoder matching rules
+"""
+import pandas as pd
+import pytest
+
+from fandu.geocoder import AddressGeocoder
+
+CITY_ADDRESSES = [
+    "201 N Arthur Ashe Blvd",
+    "2701 W Grace St",
+    "4 N Mulberry St",
+    "1704 Park Ave",
+    "2100 Grove Ave",
+]
+
+
+@pytest.fixture(scope="module")
+def geocoder():
+    addresses = pd.DataFrame({
+        "AddressId": [str(i) for i in range(len(CITY_ADDRESSES))],
+        "AddressLabel": CITY_ADDRESSES,
+        "Latitude": 37.55,
+        "Longitude": -77.46,
+    })
+    return AddressGeocoder.from_addresses(addresses)
+
+
+@pytest.mark.parametrize("address", [
+    "201 S Arthur Ashe Blvd",
+    "2701 E Grace St",
+    "4 S Mulberry St",
+    "1704 Parkwood Ave",
+])
+def test_fuzzy_rejects_other_street(geocoder, address):
+    # Same building number on the other side of the street grid (or another street)
+    result = geocoder.geocode([address])
+    assert result["match_method"].isna().all()
+
+
+def test_fuzzy_accepts_misspelled_street(geocoder):
+    result = geocoder.geocode(["201 N Arthur Ash Blvd", "2100 Grvoe Ave"])
+    assert result["geocode_address"].tolist() == ["201 N Arthur Ashe Blvd", "2100 Grove Ave"]
+    assert result["match_method"].eq("fuzzy").all()
@@ -0,0 +1,16 @@
+"""
+HHT route planning
+"""
+from conftest import _hht_homes
+from fandu.hht_analysis import plan_routes
+
+
+def test_plan_routes_missing_keys():
+    # Homes missing a tour or year belong to no route
+    homes = _hht_homes(1)
+    homes = homes[homes["latitude"].notna()].copy()
+    homes.loc[homes.index[:3], "tour"] = None
+    homes.loc[homes.index[3:5], "year"] = None
+    result = plan_routes(homes)
+    assert len(result) == len(homes) - 5
+    assert result.groupby(["year", "tour"])["stop"].min().eq(1).all()
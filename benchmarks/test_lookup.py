@@ -0,0 +1,37 @@
+"""
+PointLookup results as served over HTTP
+"""
+import json
+
+import geopandas as gpd
+import shapely
+
+from fandu.lookup import build_lookup_index, PointLookup
+
+
+def test_lookup_blank_attributes_serialize(tmp_path):
+    # A parcel with no LandUse/PropertyClass and an address with no AddressId
+    parcels = gpd.GeoDataFrame(
+        {"ParcelID": [1], "PIN": ["W0000814001"], "LandUse": [None], "PropertyClass": [None]},
+        geometry=[shapely.box(-77.4640, 37.5500, -77.4630, 37.5510)], crs="EPSG:4326",
+    )
+    addresses = gpd.GeoDataFrame(
+        {"AddressId": [None], "AddressLabel": ["1827 Grove Ave"]},
+        geometry=[shapely.Point(-77.4635, 37.5505)], crs="EPSG:4326",
+    )
+    associations = gpd.GeoDataFrame(
+        {"Name": ["Fan District Association"]},
+        geometry=[shapely.box(-77.47, 37.54, -77.45, 37.56)], crs="EPSG:4326",
+    )
+    sources = {}
+    for layer, gdf in [("parcels", parcels), ("addresses", addresses), ("civic_associations", associations)]:
+        sources[layer] = tmp_path / f"{layer}.parquet"
+        gdf.to_parquet(sources[layer])
+
+    lookup = PointLookup(build_lookup_index(index_dir=tmp_path / "index", sources=sources))
+    result = lookup.lookup(-77.4635, 37.5505)
+    assert result["parcels.PIN"] == "W0000814001"
+    assert result["parcels.LandUse"] is None
+    assert result["addresses.AddressId"] is None
+    json.dumps(result)
+    json.dumps(lookup.lookup_many([-77.4635], [37.5505]).to_dict(orient="records"))
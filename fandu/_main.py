@@ -1,32 +1,213 @@
 import click
 
-from fandu.utils import test_function
+from pathlib import Path
+
+# Command implementations are imported inside each command, so that the CLI
+# (and `fandu --help`) starts without loading pandas, geopandas or duckdb.
+# benchmarks/startup.py guards this.
 
 
 @click.group()
-def cli():
+@click.option("--profile", "profile_dir", type=click.Path(file_okay=False, path_type=Path), default=None,
+              help="Write a JSON stage trace of this run to the folder")
+@click.option("--cprofile", is_flag=True, help="With --profile, also write a cProfile dump")
+@click.pass_context
+def cli(ctx, profile_dir, cprofile):
     """A simple CLI for working with shapefiles."""
-    pass
+    if profile_dir is not None:
+        from fandu.profiling import start_profiling, stop_profiling
+
+        start_profiling(ctx.invoked_subcommand or "fandu", trace_dir=profile_dir, cprofile=cprofile)
+        ctx.call_on_close(stop_profiling)
 
 @cli.command()
 def dummy():
     """ dummy test function """
+    from fandu.utils import test_function
     click.echo( test_function() )
 
 
 @cli.command()
-@click.argument("shapefile", type=click.Path(exists=True))
-def plot(shapefile):
-    """Plot the given shapefile."""
-    click.echo(f"Plotting shapefile: {shapefile}")
+@click.argument("inputs", nargs=-1, required=True, type=click.Path(exists=True, path_type=Path))
+@click.option("--output", type=click.Path(path_type=Path), default="plot.png", show_default=True, help="Output image")
+@click.option("--width", type=int, default=2000, show_default=True, help="Image width in pixels")
+@click.option("--crs", default=None, help="CRS to render in (default: CRS of the first input)")
+@click.option("--cmap", default="Blues", show_default=True, help="Matplotlib colormap for filled areas")
+def plot(inputs, output, width, crs, cmap):
+    """Render one or more vector files to a static image."""
+    from fandu.vector_utils import rasterize_vector_files, plot_raster
+
+    raster = rasterize_vector_files(inputs, width=width, crs=crs)
+    plot_raster(raster, output, cmap=cmap)
+    click.echo(f"Plotted {len(inputs)} layer(s) into {output}")
+
+@cli.command()
+@click.argument("inputs", nargs=-1, required=True, type=click.Path(exists=True, path_type=Path))
+@click.option("--output", type=click.Path(path_type=Path), default="merged_output.parquet", show_default=True, help="Output file (.parquet for GeoParquet, or any OGR format)")
+@click.option("--crs", default=None, help="Output CRS (default: CRS of the first input)")
+@click.option("--batch-size", type=int, default=65_536, show_default=True, help="Features per batch")
+@click.option("--source-column", default="source", show_default=True, help="Column recording each feature's input file")
+def merge(inputs, output, crs, batch_size, source_column):
+    """Merge vector files (shapefile, GeoJSON, GeoParquet) into one layer."""
+    from fandu.vector_utils import merge_vector_files
+
+    written = merge_vector_files(inputs, output, crs=crs, batch_size=batch_size, source_column=source_column or None)
+    click.echo(f"Merged {written} features from {len(inputs)} file(s) into {output}")
+
+@cli.command()
+@click.option("--contacts", type=click.Path(exists=True, path_type=Path), default="Contacts_in_fda.parquet", show_default=True, help="Cleaned contacts Parquet")
+@click.option("--parcels", type=click.Path(exists=True, path_type=Path), default="Single_parcels_in_fan.parquet", show_default=True, help="Single parcels Parquet")
+@click.option("--addresses", type=click.Path(exists=True, path_type=Path), default="Addresses_in_fan.parquet", show_default=True, help="Addresses Parquet")
+@click.option("--output", type=click.Path(path_type=Path), default="Golden_fan.parquet", show_default=True, help="Golden join output Parquet")
+@click.option("--cache-dir", type=click.Path(path_type=Path), default=None, help="Stage cache folder (default: .golden_cache next to output)")
+@click.option("--force", is_flag=True, help="Rebuild every stage")
+def golden(contacts, parcels, addresses, output, cache_dir, force):
+    """Build the golden parcel/address/contact join."""
+    from fandu.golden import build_golden
+
+    results = build_golden(
+        contacts_path=contacts,
+        parcels_path=parcels,
+        addresses_path=addresses,
+        output_path=output,
+        cache_dir=cache_dir,
+        force=force,
+    )
+    for stage, info in results.items():
+        status = "rebuilt" if info["rebuilt"] else "cached"
+        click.echo(f"{stage:<16} {status:<8} {info['path']}")
+
+@cli.command(context_settings={"ignore_unknown_options": True})
+@click.argument("lon", type=float, required=False)
+@click.argument("lat", type=float, required=False)
+@click.option("--batch", type=click.Path(exists=True, path_type=Path), default=None, help="CSV with 'lon' and 'lat' columns to look up")
+@click.option("--output", type=click.Path(path_type=Path), default=None, help="CSV output for --batch (default: stdout)")
+@click.option("--precious", type=click.Path(exists=True, path_type=Path), default="../precious/", show_default=True, help="Folder with the layer snapshots")
+@click.option("--index-dir", type=click.Path(path_type=Path), default=None, help="Index folder (default: <precious>/.cache/lookup)")
+@click.option("--rebuild", is_flag=True, help="Rebuild the index even if the snapshots are unchanged")
+@click.option("--serve", is_flag=True, help="Serve lookups over local HTTP instead")
+@click.option("--port", type=int, default=8765, show_default=True, help="Port for --serve")
+def lookup(lon, lat, batch, output, precious, index_dir, rebuild, serve, port):
+    """Find the parcel, address and civic association at LON LAT."""
+    from fandu.lookup import build_lookup_index, PointLookup, serve_lookup
+
+    index_dir = build_lookup_index(index_dir=index_dir, precious_folder=precious, force=rebuild)
+    point_lookup = PointLookup(index_dir)
+
+    if serve:
+        serve_lookup(point_lookup, port=port)
+    elif batch is not None:
+        import pandas as pd
+        points = pd.read_csv(batch)
+        result = pd.concat([points, point_lookup.lookup_many(points["lon"], points["lat"])], axis=1)
+        if output is None:
+            click.echo(result.to_csv(index=False), nl=False)
+        else:
+            result.to_csv(output, index=False)
+            click.echo(f"Looked up {len(result)} points -> {output}")
+    elif lon is not None and lat is not None:
+        for key, value in point_lookup.lookup(lon, lat).items():
+            click.echo(f"{key:<32} {value}")
+    else:
+        raise click.UsageError("Give LON LAT, --batch CSV or --serve")
 
 @cli.command()
-@click.argument("shapefile1", type=click.Path(exists=True))
-@click.argument("shapefile2", type=click.Path(exists=True))
-@click.option("--output", type=click.Path(), default="merged_output.shp", help="Output shapefile path")
-def merge(shapefile1, shapefile2, output):
-    """Merge two shapefiles."""
-    click.echo(f"Merging {shapefile1} and {shapefile2} into {output}")
+@click.argument("names", nargs=-1)
+@click.option("--precious", type=click.Path(exists=True, path_type=Path), default="../precious/", show_default=True, help="Folder with the layer snapshots")
+@click.option("--output-dir", type=click.Path(file_okay=False, path_type=Path), default="neighborhoods", show_default=True, help="One folder per association plus summary.csv")
+@click.option("--ext", default=".geojson", show_default=True, help="Snapshot format of Parcels and Addresses")
+@click.option("--jobs", "-j", type=int, default=None, help="Worker processes (default: number of CPUs)")
+@click.option("--owner-zip", "owner_zips", multiple=True, help="Mailing ZIP counted as owner occupied (repeatable; default any)")
+@click.option("--compare", is_flag=True, help="Also run the single-association flow in a loop and report the speedup")
+def neighborhoods(names, precious, output_dir, ext, jobs, owner_zips, compare):
+    """Build parcel and address outputs for civic associations NAMES (default all)."""
+    from tabulate import tabulate
+    from fandu.neighborhoods import build_associations, compare_with_loop
+
+    kwargs = dict(precious_folder=precious, output_dir=output_dir, ext=ext, jobs=jobs, owner_zips=owner_zips or None)
+    if compare:
+        timing = compare_with_loop(names or None, **kwargs)
+        summary = timing["summary"]
+    else:
+        summary = build_associations(names or None, **kwargs)
+    summary = summary.sort_values("parcels", ascending=False)
+    click.echo(tabulate(summary.head(20), headers="keys", showindex=False))
+    click.echo(f"Built {len(summary)} associations into {output_dir}")
+    if compare:
+        click.echo(f"Batch {timing['batch_seconds']:.1f}s vs loop {timing['loop_seconds']:.1f}s: "
+                   f"{timing['speedup']:.1f}x speedup")
+
+@cli.command()
+@click.argument("snapshots", nargs=-1, type=click.Path(exists=True, dir_okay=False, path_type=Path))
+@click.option("--feature", default=None, help="Compare the two newest snapshots of this feature instead")
+@click.option("--precious", type=click.Path(path_type=Path), default="../precious/", show_default=True, help="Folder with the layer snapshots (for --feature)")
+@click.option("--ext", default=None, help="Snapshot extension for --feature (default: any)")
+@click.option("--key", "key", multiple=True, help="Key column (repeatable; default: by feature)")
+@click.option("--output-dir", type=click.Path(file_okay=False, path_type=Path), default=None, help="Write added/removed/changed/changes Parquet files here")
+def diff(snapshots, feature, precious, ext, key, output_dir):
+    """Compare two snapshots of a layer: OLD NEW, or --feature for the newest two."""
+    from tabulate import tabulate
+    from fandu.snapshot_diff import diff_snapshots, list_snapshots
+
+    if feature:
+        snapshots = list_snapshots(precious, feature, ext=ext)[-2:]
+        if len(snapshots) < 2:
+            raise click.UsageError(f"Need two {feature} snapshots in {precious}")
+    elif len(snapshots) != 2:
+        raise click.UsageError("Give OLD NEW snapshots or --feature")
+
+    old, new = snapshots
+    result = diff_snapshots(old, new, key=key or None)
+    click.echo(f"{old.name} -> {new.name}")
+    summary = result.summary()
+    click.echo(tabulate([[k, v if not isinstance(v, list) else ", ".join(v)] for k, v in summary.items()]))
+    if len(result.changes):
+        click.echo(tabulate(result.column_counts().head(20).items(), headers=["column", "changed values"]))
+    if output_dir is not None:
+        result.write(output_dir)
+        click.echo(f"Wrote diff to {output_dir}")
+
+@cli.command()
+@click.argument("snapshot", type=click.Path(exists=True, dir_okay=False, path_type=Path))
+@click.option("--feature", default=None, help="Aggregate definition to use (default: from the snapshot name)")
+@click.option("--store-dir", type=click.Path(file_okay=False, path_type=Path), default=None, help="Store folder (default: .cache/<snapshot>.aggregates)")
+@click.option("--grid-size", "grid_sizes", type=int, multiple=True, help="Grid/hex cell size in meters (repeatable; default 100, 250, 500)")
+@click.option("--force", is_flag=True, help="Rebuild instead of refreshing from the previous snapshot")
+def aggregate(snapshot, feature, store_dir, grid_sizes, force):
+    """Precompute card and choropleth aggregates for SNAPSHOT, refreshing incrementally."""
+    from tabulate import tabulate
+    from fandu.aggregates import GRID_SIZES, update_aggregates
+
+    store = update_aggregates(snapshot, store_dir=store_dir, feature=feature,
+                              grid_sizes=grid_sizes or GRID_SIZES, force=force)
+    levels = store.aggregates.groupby("level", sort=False).agg(cells=("cell", "nunique"), features=("count", "sum"))
+    click.echo(tabulate(levels, headers=["level", "cells", "features"]))
+
+@cli.command()
+@click.argument("reports", nargs=-1)
+@click.option("--reports-dir", type=click.Path(exists=True, file_okay=False, path_type=Path), default=".", show_default=True, help="Quarto project folder")
+@click.option("--pattern", default="[0-9]*.qmd", show_default=True, help="Glob selecting the pipeline reports")
+@click.option("--jobs", "-j", type=int, default=None, help="Concurrent renders (default: number of CPUs)")
+@click.option("--force", is_flag=True, help="Render every report regardless of the cache")
+@click.option("--dry-run", is_flag=True, help="Only show what would be rendered")
+def build(reports, reports_dir, pattern, jobs, force, dry_run):
+    """Render the pipeline reports in dependency order, skipping unchanged ones."""
+    from tabulate import tabulate
+    from fandu.report_builder import build_reports
+
+    results = build_reports(
+        reports_dir=reports_dir,
+        names=reports or None,
+        pattern=pattern,
+        jobs=jobs,
+        force=force,
+        dry_run=dry_run,
+    )
+    rows = [[r["report"], r["status"], f"{r['seconds']:.1f}", ", ".join(r["depends_on"])] for r in results]
+    click.echo(tabulate(rows, headers=["report", "status", "seconds", "depends on"]))
+    click.echo(f"Total render time: {sum(r['seconds'] for r in results):.1f}s")
+    if any(r["status"] in ("failed", "blocked") for r in results):
+        raise SystemExit(1)
 
 if __name__ == "__main__":
     cli()
@@ -0,0 +1,501 @@
+"""
+Precomputed counts and value sums for dashboard cards and choropleths
+
+`AggregateStore` assigns every feature of a layer once to a cell at each level:
+
+    total            one cell, 'all'
+    block_number     hundred block of the street number, e.g. '2200 block'
+    block            hundred block on a street, e.g. '2200 Monument Ave'
+    street           street name, e.g. 'Monument Ave'
+    grid_<size>      square cells of <size> meters
+    hex_<size>       hexagons whose centers are <size> meters apart
+
+and keeps the row count (and the sum of the feature's value column) per cell
+and breakdown column, e.g. parcels per LandUse and OwnerOccupied.  Cards and
+choropleths are then answered from the aggregates:
+
+    store = update_aggregates(Path("../data/Parcels_in_fan.geojson"), feature="Parcels")
+    store.card(LandUse="Single Family")             # single family parcels
+    store.query("block_number")                     # parcels per hundred block
+    store.choropleth("hex_250", "value")            # total value per hexagon
+
+`update_aggregates` keeps the store in '.cache/<snapshot>.aggregates/' next to the
+snapshot.  When the snapshot changes, only the features whose aggregate inputs
+changed (location, block, street, value, breakdown columns) are reassigned and
+their old contributions replaced, via `fandu.snapshot_diff`.
+"""
+import json
+
+from pathlib import Path
+from typing import Optional, Sequence
+
+import numpy as np
+import pandas as pd
+from loguru import logger
+
+from fandu.cache_utils import (
+    file_fingerprint,
+    combine_fingerprints,
+    load_manifest,
+    save_manifest,
+    snapshot_cache_path,
+)
+from fandu.geo_utils import FAN_PROJECTED_CRS
+from fandu.profiling import profiled
+from fandu.snapshot_diff import SNAPSHOT_KEYS, apply_delta, diff_snapshots, read_snapshot, snapshot_feature, snapshot_key
+
+# Bump when the store layout or cell assignment changes, so stores are rebuilt.
+AGGREGATES_VERSION = "1"
+
+# Projected CRS of the grid and hex cells (meters)
+AGGREGATE_CRS = FAN_PROJECTED_CRS
+
+# Grid cell sizes / hex center spacings in meters
+GRID_SIZES = (100, 250, 500)
+
+
+def mail_owner_occupied(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    OwnerOccupied as the dashboard counts it: the mailing address starts with
+    the building number.  Frames without both columns are returned unchanged,
+    and the OwnerOccupied breakdown is skipped like any other missing dimension.
+    """
+    if not {"MailAddress", "AsrLocationBldgNo"}.issubset(df.columns):
+        return df
+    df = df.copy()
+    df["OwnerOccupied"] = [
+        str(mail).startswith(str(number))
+        for mail, number in zip(df["MailAddress"], df["AsrLocationBldgNo"])
+    ]
+    return df
+
+
+# Feature -> street number column, street name columns, summed value column,
+# breakdown columns, longitude/latitude columns (without a geometry) and an
+# optional step deriving columns before the inputs are taken
+AGGREGATE_FEATURES = {
+    "Parcels": {
+        "number": "AsrLocationBldgNo",
+        "street": [],
+        "value": "TotalValue",
+        "dimensions": ["LandUse", "OwnerOccupied"],
+        "prepare": mail_owner_occupied,
+    },
+    "Addresses": {
+        "number": "BuildingNumber",
+        "street": ["StreetDirection", "StreetName", "StreetType"],
+        "value": None,
+        "dimensions": ["Mailable"],
+    },
+    "HHT": {
+        "number": "street_number",
+        "street": ["street_name", "street_type"],
+        "value": None,
+        "dimensions": ["year"],
+        "lonlat": ["longitude", "latitude"],
+    },
+}
+
+
+def _feature_spec(feature: str) -> dict:
+    if feature not in AGGREGATE_FEATURES:
+        raise ValueError(f"No aggregate definition for {feature!r}; known: {', '.join(AGGREGATE_FEATURES)}")
+    return AGGREGATE_FEATURES[feature]
+
+
+def _street_numbers(values: pd.Series) -> pd.Series:
+    """Leading street number as float ('1625 1/2' -> 1625), NaN where there is none."""
+    digits = values.astype("string").str.extract(r"^\s*(\d+)", expand=False)
+    return pd.to_numeric(digits, errors="coerce").astype("float64")
+
+
+def _street_names(df: pd.DataFrame, columns: Sequence[str]) -> pd.Series:
+    """Non-blank street name parts joined with single spaces, NaN when all are blank."""
+    parts = [df[c].astype("string").str.strip().fillna("") for c in columns if c in df.columns]
+    if not parts:
+        return pd.Series(np.nan, index=df.index, dtype=object)
+    joined = parts[0].str.cat(parts[1:], sep=" ") if len(parts) > 1 else parts[0]
+    joined = joined.str.replace(r"\s+", " ", regex=True).str.strip()
+    return joined.where(joined != "").astype(object)
+
+
+def _projected_xy(df: pd.DataFrame, spec: dict):
+    """Projected x/y of each feature: geometry centroid, else the longitude/latitude columns."""
+    geometry = getattr(df, "geometry", None) if hasattr(df, "crs") else None
+    if geometry is not None:
+        import shapely
+
+        projected = geometry.set_crs("EPSG:4326") if geometry.crs is None else geometry
+        centroids = shapely.centroid(projected.to_crs(AGGREGATE_CRS).values)
+        return shapely.get_x(centroids), shapely.get_y(centroids)
+
+    lonlat = spec.get("lonlat") or []
+    if lonlat and set(lonlat).issubset(df.columns):
+        from pyproj import Transformer
+
+        lon, lat = (pd.to_numeric(df[c], errors="coerce").to_numpy("float64") for c in lonlat)
+        return Transformer.from_crs("EPSG:4326", AGGREGATE_CRS, always_xy=True).transform(lon, lat)
+    return None
+
+
+def _inputs(df: pd.DataFrame, feature: str, key: Optional[list]) -> pd.DataFrame:
+    """The columns the aggregates depend on, one row per feature (key columns first)."""
+    spec = _feature_spec(feature)
+    if spec.get("prepare") is not None:
+        df = spec["prepare"](df)
+
+    inputs = pd.DataFrame(index=df.index)
+    for column in key or []:
+        inputs[column] = df[column].to_numpy()
+    if spec.get("number") in df.columns:
+        inputs["number"] = _street_numbers(df[spec["number"]])
+    if spec.get("street"):
+        inputs["street"] = _street_names(df, spec["street"])
+    if spec.get("value") in df.columns:
+        inputs["value"] = pd.to_numeric(df[spec["value"]], errors="coerce").astype("float64")
+    for column in spec["dimensions"]:
+        if column in df.columns:
+            values = df[column]
+            inputs[column] = values.astype(object) if isinstance(values.dtype, pd.CategoricalDtype) else values
+    xy = _projected_xy(df, spec)
+    if xy is not None:
+        inputs["x"], inputs["y"] = xy
+
+    if key:
+        missing = inputs[key].isna().any(axis=1)
+        duplicated = inputs[key].duplicated() & ~missing
+        if missing.any() or duplicated.any():
+            logger.warning(f"{feature}: dropping {int(missing.sum())} rows without a {'/'.join(key)} "
+                           f"and {int(duplicated.sum())} duplicates")
+            inputs = inputs[~missing & ~duplicated]
+    return inputs.reset_index(drop=True)
+
+
+def _hex_cells(x: np.ndarray, y: np.ndarray, size: float):
+    """Axial (q, r) of the pointy-top hexagon containing each point; centers are `size` apart."""
+    radius = size / np.sqrt(3)
+    q = (np.sqrt(3) / 3 * x - y / 3) / radius
+    r = (2 / 3 * y) / radius
+    s = -q - r
+    rq, rr, rs = np.round(q), np.round(r), np.round(s)
+    dq, dr, ds = np.abs(rq - q), np.abs(rr - r), np.abs(rs - s)
+    fix_q = (dq > dr) & (dq > ds)
+    fix_r = ~fix_q & (dr > ds)
+    rq = np.where(fix_q, -rr - rs, rq)
+    rr = np.where(fix_r, -rq - rs, rr)
+    return rq, rr
+
+
+def _cell_ids(i: np.ndarray, j: np.ndarray) -> pd.Series:
+    i, j = (pd.Series(v).astype("Int64").astype("string") for v in (i, j))
+    return (i + "_" + j).astype(object)
+
+
+def _levels(inputs: pd.DataFrame, grid_sizes: Sequence[int]) -> list:
+    levels = ["total"]
+    if "number" in inputs:
+        levels.append("block_number")
+        if "street" in inputs:
+            levels.append("block")
+    if "street" in inputs:
+        levels.append("street")
+    if "x" in inputs:
+        levels += [f"grid_{size}" for size in grid_sizes] + [f"hex_{size}" for size in grid_sizes]
+    return levels
+
+
+def _with_cells(inputs: pd.DataFrame, grid_sizes: Sequence[int]) -> pd.DataFrame:
+    """`inputs` plus one cell column per level (NaN where a feature has no cell at that level)."""
+    members = inputs.reset_index(drop=True).copy()
+    members["total"] = "all"
+    if "number" in members:
+        hundred = (members["number"] // 100 * 100).astype("Int64").astype("string")
+        members["block_number"] = (hundred + " block").astype(object)
+        if "street" in members:
+            members["block"] = (hundred + " " + members["street"].astype("string")).astype(object)
+    if "x" in members:
+        x, y = members["x"].to_numpy("float64"), members["y"].to_numpy("float64")
+        for size in grid_sizes:
+            members[f"grid_{size}"] = _cell_ids(np.floor(x / size), np.floor(y / size))
+            members[f"hex_{size}"] = _cell_ids(*_hex_cells(x, y, size))
+    return members
+
+
+def _aggregate(members: pd.DataFrame, levels: Sequence[str], dimensions: Sequence[str]) -> pd.DataFrame:
+    """Long table of counts (and value sums) per level, cell and breakdown values."""
+    frames = []
+    for level in levels:
+        rows = members[members[level].notna()]
+        grouped = rows.groupby([level, *dimensions], dropna=False, observed=True, sort=True)
+        agg = grouped.size().rename("count").to_frame()
+        if "value" in members:
+            agg["value"] = grouped["value"].sum()
+        agg = agg.rename_axis(["cell", *dimensions]).reset_index()
+        agg.insert(0, "level", level)
+        frames.append(agg)
+    return pd.concat(frames, ignore_index=True)
+
+
+def _cell_polygons(level: str, cells: Sequence[str]):
+    """Polygons (in AGGREGATE_CRS) of grid or hex cell ids."""
+    import shapely
+
+    kind, size = level.rsplit("_", 1)
+    size = float(size)
+    ij = np.array([cell.split("_") for cell in cells], dtype="float64").reshape(-1, 2)
+    i, j = ij[:, 0], ij[:, 1]
+    if kind == "grid":
+        return shapely.box(i * size, j * size, (i + 1) * size, (j + 1) * size)
+    if kind == "hex":
+        radius = size / np.sqrt(3)
+        cx = radius * np.sqrt(3) * (i + j / 2)
+        cy = radius * 1.5 * j
+        angles = np.radians(30 + 60 * np.arange(7))
+        rings = np.stack([cx[:, None] + radius * np.cos(angles), cy[:, None] + radius * np.sin(angles)], axis=-1)
+        return shapely.polygons(rings)
+    raise ValueError(f"{level!r} is not a grid or hex level")
+
+
+class AggregateStore:
+    """
+    Counts and value sums of one feature per cell, at every level.
+
+    Parameters
+    ----------
+    feature : str
+        Key of `AGGREGATE_FEATURES`.
+    key : list or None
+        Key columns of the feature (None: no incremental refresh).
+    members : pd.DataFrame
+        One row per feature: key columns, aggregate inputs and a cell per level.
+    aggregates : pd.DataFrame, optional
+        Precomputed long table ('level', 'cell', breakdown columns, 'count'
+        [, 'value']); computed from `members` if omitted.
+    grid_sizes : sequence of int, optional
+        Grid cell sizes / hex spacings in meters.
+    """
+
+    def __init__(
+        self,
+        feature: str,
+        key: Optional[list],
+        members: Optional[pd.DataFrame],
+        aggregates: Optional[pd.DataFrame] = None,
+        grid_sizes: Sequence[int] = GRID_SIZES,
+        members_path: Optional[Path] = None,
+    ):
+        self.feature = feature
+        self.key = list(key) if key else None
+        self.grid_sizes = tuple(int(s) for s in grid_sizes)
+        self._members = members
+        self._members_path = members_path
+        self.dimensions = [c for c in _feature_spec(feature)["dimensions"]
+                           if c in (aggregates.columns if aggregates is not None else members.columns)]
+        if aggregates is None:
+            aggregates = _aggregate(members, _levels(members, self.grid_sizes), self.dimensions)
+        self.aggregates = aggregates
+
+    @property
+    def members(self) -> pd.DataFrame:
+        """Per-feature cell assignments (read from the store on first use)."""
+        if self._members is None:
+            self._members = pd.read_parquet(self._members_path)
+        return self._members
+
+    @property
+    def levels(self) -> list:
+        return list(pd.unique(self.aggregates["level"]))
+
+    @classmethod
+    @profiled()
+    def build(
+        cls,
+        df: pd.DataFrame,
+        feature: str,
+        key: Optional[Sequence[str]] = None,
+        grid_sizes: Sequence[int] = GRID_SIZES,
+    ) -> "AggregateStore":
+        """
+        Assign every row of `df` to its cells and aggregate.
+
+        `key` defaults to the feature's snapshot key when it has one
+        (`fandu.snapshot_diff.SNAPSHOT_KEYS`); without a key the store can't be
+        refreshed incrementally.
+        """
+        if key is None and feature in SNAPSHOT_KEYS:
+            key = snapshot_key(df, feature)
+        members = _with_cells(_inputs(df, feature, list(key) if key else None), grid_sizes)
+        return cls(feature, key, members, grid_sizes=grid_sizes)
+
+    @profiled()
+    def refresh(self, df: pd.DataFrame) -> "AggregateStore":
+        """
+        Store for a new snapshot `df`, reassigning only the features whose
+        aggregate inputs changed and replacing their old contributions.
+        """
+        if not self.key:
+            raise ValueError(f"{self.feature} aggregates have no key; rebuild them instead")
+
+        levels = self.levels
+        input_columns = [c for c in self.members.columns if c not in levels]
+        new_inputs = _inputs(df, self.feature, self.key)
+        diff = diff_snapshots(self.members[input_columns], new_inputs, key=self.key)
+        if diff.added_columns or diff.removed_columns:
+            logger.info(f"{self.feature}: aggregate inputs changed columns, rebuilding")
+            return AggregateStore(self.feature, self.key, _with_cells(new_inputs, self.grid_sizes),
+                                  grid_sizes=self.grid_sizes)
+
+        assign = lambda rows: _with_cells(rows, self.grid_sizes)
+        stale_keys = diff.removed.index.append(diff.changed.index)
+        stale = self.members[self.members.set_index(self.key).index.isin(stale_keys)]
+        fresh = assign(pd.concat([diff.added, diff.changed]).reset_index())
+
+        measures = ["count", "value"] if "value" in self.aggregates else ["count"]
+        removed = _aggregate(stale, levels, self.dimensions)
+        removed[measures] = -removed[measures]
+        combined = (
+            pd.concat([self.aggregates, _aggregate(fresh, levels, self.dimensions), removed], ignore_index=True)
+            .groupby(["level", "cell", *self.dimensions], dropna=False, observed=True, sort=True)[measures]
+            .sum()
+            .reset_index()
+        )
+        combined = combined[combined["count"] != 0].reset_index(drop=True)
+        # Keep levels in their original order
+        combined = combined.sort_values("level", key=lambda s: s.map(levels.index), kind="stable", ignore_index=True)
+
+        members = apply_delta(self.members, diff, assign)
+        logger.info(f"{self.feature}: refreshed aggregates from {len(fresh)} new/changed and "
+                    f"{len(stale)} stale features")
+        return AggregateStore(self.feature, self.key, members, combined, grid_sizes=self.grid_sizes)
+
+    def _filtered(self, level: str, filters: dict) -> pd.DataFrame:
+        if level not in self.levels:
+            raise ValueError(f"No {level!r} level in the {self.feature} aggregates; have {', '.join(self.levels)}")
+        rows = self.aggregates[self.aggregates["level"] == level]
+        for column, value in filters.items():
+            if column not in self.dimensions:
+                raise ValueError(f"Can't filter {self.feature} aggregates on {column!r}; "
+                                 f"breakdowns are {', '.join(self.dimensions)}")
+            values = value if isinstance(value, (list, tuple, set)) else [value]
+            rows = rows[rows[column].isin(values)]
+        return rows
+
+    def query(self, level: str, measure: str = "count", **filters) -> pd.Series:
+        """
+        `measure` ('count' or 'value') per cell of `level`, summed over the
+        breakdown columns not filtered on, e.g. `query("street", LandUse="Single Family")`.
+        A filter value may be a list of accepted values.
+        """
+        rows = self._filtered(level, filters)
+        return rows.groupby("cell", sort=True)[measure].sum().rename(measure)
+
+    def card(self, measure: str = "count", **filters):
+        """A single dashboard number: `measure` over all features matching `filters`."""
+        total = self._filtered("total", filters)[measure].sum()
+        return int(total) if measure == "count" else float(total)
+
+    def choropleth(self, level: str, measure: str = "count", **filters):
+        """GeoDataFrame (EPSG:4326) of the grid or hex cells of `level` with `measure`."""
+        import geopandas as gpd
+
+        values = self.query(level, measure, **filters)
+        return gpd.GeoDataFrame(
+            {"cell": values.index, measure: values.to_numpy()},
+            geometry=_cell_polygons(level, list(values.index)),
+            crs=AGGREGATE_CRS,
+        ).to_crs("EPSG:4326")
+
+    def save(self, store_dir: Path, manifest: Optional[dict] = None) -> Path:
+        """Write members.parquet, aggregates.parquet and manifest.json to `store_dir`."""
+        store_dir = Path(store_dir)
+        store_dir.mkdir(parents=True, exist_ok=True)
+        self.members.to_parquet(store_dir / "members.parquet", index=False)
+        self.aggregates.to_parquet(store_dir / "aggregates.parquet", index=False)
+        save_manifest(store_dir / "manifest.json", {
+            **(manifest or {}),
+            "feature": self.feature,
+            "key": self.key,
+            "grid_sizes": list(self.grid_sizes),
+            "levels": self.levels,
+        })
+        return store_dir
+
+    @classmethod
+    def load(cls, store_dir: Path) -> "AggregateStore":
+        """Open a saved store; its members are only read if it is refreshed."""
+        store_dir = Path(store_dir)
+        manifest = load_manifest(store_dir / "manifest.json")
+        if not manifest:
+            raise FileNotFoundError(f"No aggregate store in {store_dir}")
+        return cls(
+            manifest["feature"],
+            manifest["key"],
+            None,
+            pd.read_parquet(store_dir / "aggregates.parquet"),
+            grid_sizes=manifest["grid_sizes"],
+            members_path=store_dir / "members.parquet",
+        )
+
+
+def _config_fingerprint(feature: str, grid_sizes: Sequence[int]) -> str:
+    spec = json.dumps(_feature_spec(feature), sort_keys=True, default=lambda f: getattr(f, "__qualname__", str(f)))
+    return combine_fingerprints([AGGREGATES_VERSION, feature, spec, *grid_sizes])
+
+
+@profiled()
+def update_aggregates(
+    snapshot: Path,
+    store_dir: Optional[Path] = None,
+    feature: Optional[str] = None,
+    grid_sizes: Sequence[int] = GRID_SIZES,
+    force: bool = False,
+) -> AggregateStore:
+    """
+    Aggregates of a snapshot file, rebuilt or refreshed only when it changed.
+
+    Parameters
+    ----------
+    snapshot : Path
+        Layer file (e.g. 'precious/Parcels-2025-06-01.geojson' or 'data/Parcels_in_fan.geojson').
+    store_dir : Path, optional
+        Store folder (default: '.cache/<snapshot>.aggregates' next to the snapshot).
+        Point several dated snapshots at one folder to refresh it from one to the next.
+    feature : str, optional
+        Key of `AGGREGATE_FEATURES` (default: from the snapshot name).
+    grid_sizes : sequence of int, optional
+        Grid cell sizes / hex spacings in meters.
+    force : bool, optional
+        If True, rebuild from scratch.
+
+    Returns
+    -------
+    AggregateStore
+        The current store.  If the snapshot is unchanged, only its aggregates are read.
+    """
+    snapshot = Path(snapshot)
+    feature = feature or snapshot_feature(snapshot)
+    if feature is None:
+        raise ValueError(f"Can't tell the feature of {snapshot.name}; pass feature=")
+    store_dir = Path(store_dir) if store_dir is not None else snapshot_cache_path(snapshot, "aggregates", ext="")
+    grid_sizes = tuple(int(s) for s in grid_sizes)
+
+    config = _config_fingerprint(feature, grid_sizes)
+    fingerprint = file_fingerprint(snapshot)
+    manifest = load_manifest(store_dir / "manifest.json")
+    source = {"config": config, "source": snapshot.name, "source_fingerprint": fingerprint}
+
+    if not force and manifest.get("config") == config:
+        store = AggregateStore.load(store_dir)
+        if manifest.get("source_fingerprint") == fingerprint:
+            logger.info(f"{feature} aggregates in {store_dir} are current")
+            return store
+        if store.key:
+            logger.info(f"Refreshing {feature} aggregates: {manifest.get('source')} -> {snapshot.name}")
+            store = store.refresh(read_snapshot(snapshot))
+            store.save(store_dir, source)
+            return store
+
+    logger.info(f"Building {feature} aggregates from {snapshot.name}")
+    store = AggregateStore.build(read_snapshot(snapshot), feature, grid_sizes=grid_sizes)
+    store.save(store_dir, source)
+    return store
@@ -0,0 +1,134 @@
+"""
+Content fingerprints and build manifests for Fandu pipelines
+"""
+import json
+import hashlib
+
+from pathlib import Path
+from typing import TYPE_CHECKING, Iterable, Optional
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+FINGERPRINT_METADATA_KEY = b"fandu_fingerprint"
+
+
+def file_fingerprint(path: Path, chunk_size: int = 1 << 20) -> str:
+    """
+    Compute a SHA-256 fingerprint of a file's contents.
+
+    Parameters
+    ----------
+    path : Path
+        File to hash.
+    chunk_size : int, optional
+        Number of bytes read per chunk (default=1 MiB).
+
+    Returns
+    -------
+    str
+        Hex digest of the file contents.
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def combine_fingerprints(parts: Iterable[str]) -> str:
+    """
+    Combine several fingerprints (or any strings) into a single SHA-256 digest.
+    Order matters.
+    """
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(str(part).encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def load_manifest(path: Path) -> dict:
+    """
+    Load a JSON build manifest, returning an empty dict if it is missing or unreadable.
+    """
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def save_manifest(path: Path, manifest: dict) -> None:
+    """
+    Write a JSON build manifest atomically (write to a temp file, then rename).
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(path.suffix + ".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    tmp_path.replace(path)
+
+
+def is_stage_current(manifest: dict, stage: str, fingerprint: str, outputs: Optional[Iterable[Path]] = None) -> bool:
+    """
+    True if `stage` was last built from `fingerprint` and all of its outputs still exist.
+    """
+    if manifest.get(stage, {}).get("fingerprint") != fingerprint:
+        return False
+    return all(Path(p).is_file() for p in (outputs or []))
+
+
+def snapshot_cache_path(snapshot: Path, kind: str, ext: str = ".parquet") -> Path:
+    """
+    Location of a derived cache file for a snapshot, kept in a '.cache' folder
+    next to the snapshot, e.g. 'precious/.cache/Addresses-2025-05-16.geocoder.parquet'.
+
+    Parameters
+    ----------
+    snapshot : Path
+        Source snapshot file.
+    kind : str
+        Short name of the derived artifact (e.g. 'geocoder').
+    ext : str, optional
+        Extension of the cache file (default='.parquet').
+
+    Returns
+    -------
+    Path
+        Path of the cache file.  The folder is created if needed.
+    """
+    snapshot = Path(snapshot)
+    cache_dir = snapshot.parent / ".cache"
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    return cache_dir / f"{snapshot.stem}.{kind}{ext}"
+
+
+def write_fingerprinted_parquet(df: "pd.DataFrame", path: Path, fingerprint: str) -> None:
+    """
+    Write a DataFrame to Parquet, recording the fingerprint of the data it was
+    derived from in the file's schema metadata.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    metadata = dict(table.schema.metadata or {})
+    metadata[FINGERPRINT_METADATA_KEY] = fingerprint.encode("utf-8")
+    pq.write_table(table.replace_schema_metadata(metadata), path)
+
+
+def read_parquet_fingerprint(path: Path) -> Optional[str]:
+    """
+    Return the fingerprint stored by `write_fingerprinted_parquet`, or None if the
+    file is missing or has none.
+    """
+    import pyarrow.parquet as pq
+
+    try:
+        metadata = pq.read_schema(path).metadata or {}
+    except (FileNotFoundError, OSError):
+        return None
+    value = metadata.get(FINGERPRINT_METADATA_KEY)
+    return value.decode("utf-8") if value is not None else None
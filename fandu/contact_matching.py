@@ -0,0 +1,181 @@
+"""
+Incremental contact-to-address matching
+
+Every FDA_contacts export repeats most of the previous one, so matching all
+contacts again is wasted work.  `match_contacts` keys each contact by a
+fingerprint of its address fields and keeps what matching produced for it
+(the AddressLabel built from those fields, the matched city AddressId and
+RepresentativeParcelID, the score and the method) in a Parquet store.  A new
+export only re-matches contacts whose fingerprint is new; when the address or
+parcel targets change, every stored match is stale and all contacts are
+matched again.
+"""
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+import geopandas as gpd
+from loguru import logger
+
+from fandu.cache_utils import (
+    file_fingerprint,
+    combine_fingerprints,
+    read_parquet_fingerprint,
+    write_fingerprinted_parquet,
+)
+from fandu.contact_utils import FAN_ADDRESS_COLUMN, build_address_labels
+from fandu.profiling import profiled
+
+# Bump when label building or matching changes, so stored matches are redone.
+CONTACT_MATCH_VERSION = "2"
+
+# Default store, next to the golden join's stage cache
+CONTACT_MATCH_STORE = Path(".golden_cache") / "contact_matches.parquet"
+
+# Contact fields the match depends on
+CONTACT_ADDRESS_COLUMNS = ["Address", "AddressLine2", FAN_ADDRESS_COLUMN]
+
+# Columns `match_contacts` returns, aligned with the contacts
+MATCH_COLUMNS = ["AddressLabel", "MatchAddressId", "MatchParcelID", "MatchScore", "MatchMethod"]
+
+
+def contact_fingerprints(contacts: pd.DataFrame) -> pd.Series:
+    """
+    Fingerprint of each contact's address fields, as 16 hex digits.
+
+    Contacts missing a field (e.g. no AddressLine2 column) hash it as blank.
+    """
+    fields = contacts.reindex(columns=CONTACT_ADDRESS_COLUMNS).astype("string").fillna("")
+    hashes = pd.util.hash_pandas_object(fields, index=False)
+    return pd.Series([f"{h:016x}" for h in hashes.to_numpy()], index=contacts.index, dtype=object)
+
+
+def _address_parcels(addresses: gpd.GeoDataFrame, parcels_path: Path) -> pd.Series:
+    """RepresentativeParcelID of the parcel each address lies in, indexed by AddressId."""
+    parcels = gpd.read_parquet(parcels_path)[["RepresentativeParcelID", "geometry"]]
+    points = addresses[["AddressId", "geometry"]].to_crs(parcels.crs)
+    joined = gpd.sjoin(points, parcels, predicate="within", how="inner")
+    return joined.drop_duplicates("AddressId").set_index("AddressId")["RepresentativeParcelID"]
+
+
+def _match(contacts: pd.DataFrame, addresses_path: Path, parcels_path: Optional[Path],
+           threshold: float, fuzzy: bool) -> pd.DataFrame:
+    """Build labels for `contacts` and match them against the Fan addresses."""
+    from fandu.geocoder import AddressGeocoder
+
+    labels = build_address_labels(contacts)
+    matches = pd.DataFrame({
+        "AddressLabel": labels,
+        "MatchAddressId": pd.Series(None, index=contacts.index, dtype=object),
+        "MatchParcelID": np.nan,
+        "MatchScore": np.nan,
+        "MatchMethod": pd.Series(None, index=contacts.index, dtype=object),
+    })
+    present = labels.notna() & (labels.astype(str).str.strip() != "")
+    if not present.any():
+        return matches
+
+    addresses = gpd.read_parquet(addresses_path)
+    geocoded = AddressGeocoder.from_addresses(addresses).geocode(labels[present], threshold=threshold, fuzzy=fuzzy)
+    matches.loc[present, "MatchAddressId"] = geocoded["AddressId"].to_numpy()
+    matches.loc[present, "MatchScore"] = geocoded["match_score"].to_numpy()
+    matches.loc[present, "MatchMethod"] = geocoded["match_method"].to_numpy()
+
+    if parcels_path is not None:
+        parcel_ids = _address_parcels(addresses, parcels_path)
+        matches["MatchParcelID"] = matches["MatchAddressId"].map(parcel_ids).astype(float)
+    return matches
+
+
+@profiled()
+def match_contacts(
+    contacts: pd.DataFrame,
+    addresses_path: Path = Path("Addresses_in_fan.parquet"),
+    parcels_path: Optional[Path] = Path("Single_parcels_in_fan.parquet"),
+    store_path: Path = CONTACT_MATCH_STORE,
+    threshold: float = 85,
+    fuzzy: bool = True,
+    force: bool = False,
+) -> tuple[pd.DataFrame, dict]:
+    """
+    Match contacts to Fan addresses and parcels, reusing stored matches.
+
+    Parameters
+    ----------
+    contacts : pd.DataFrame
+        Contacts with normalized headers (as loaded in 02_Contacts_in_fan.qmd).
+    addresses_path : Path, optional
+        Fan addresses GeoParquet (output of 01_Addresses_in_fan.qmd).
+    parcels_path : Path, optional
+        Single parcels GeoParquet (output of 01_Parcels_in_fan.qmd); if None,
+        no parcel is matched.
+    store_path : Path, optional
+        Parquet match store (default='.golden_cache/contact_matches.parquet').
+    threshold : float, optional
+        Minimum fuzzy score (0-100) of a fuzzy address match (default=85).
+    fuzzy : bool, optional
+        If False, only exact and base address matches are made.
+    force : bool, optional
+        If True, ignore the store and match every contact.
+
+    Returns
+    -------
+    tuple
+        (matches, stats): `matches` holds `MATCH_COLUMNS` aligned with
+        `contacts.index`; MatchMethod is 'exact', 'base', 'fuzzy' or None, and
+        MatchAddressId is None when unmatched.
+        `stats` has 'contacts', 'hits', 'misses', 'hit_rate' and
+        'target_changed'.
+    """
+    store_path = Path(store_path)
+    target = combine_fingerprints([
+        CONTACT_MATCH_VERSION, threshold, fuzzy,
+        file_fingerprint(addresses_path),
+        file_fingerprint(parcels_path) if parcels_path is not None else "",
+    ])
+
+    stored_target = None if force else read_parquet_fingerprint(store_path)
+    target_changed = stored_target is not None and stored_target != target
+    if stored_target == target:
+        store = pd.read_parquet(store_path).set_index("fingerprint")
+    else:
+        store = pd.DataFrame(columns=MATCH_COLUMNS, index=pd.Index([], name="fingerprint"))
+
+    fingerprints = contact_fingerprints(contacts)
+    hit = fingerprints.isin(store.index).to_numpy()
+    matches = store.reindex(fingerprints.to_numpy())[MATCH_COLUMNS].set_axis(contacts.index)
+
+    if not hit.all():
+        # Contacts sharing address fields are matched once
+        missed = contacts[~hit].loc[~fingerprints[~hit].duplicated()]
+        fresh = _match(missed, addresses_path, parcels_path, threshold, fuzzy)
+        fresh.index = fingerprints[missed.index].to_numpy()
+        matches.loc[~hit, MATCH_COLUMNS] = fresh.reindex(fingerprints[~hit].to_numpy()).to_numpy()
+
+        fresh = fresh.rename_axis("fingerprint")
+        store = pd.concat([store[MATCH_COLUMNS], fresh]) if len(store) else fresh
+        store_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = store_path.with_suffix(".tmp")
+        write_fingerprinted_parquet(store.reset_index(), tmp_path, target)
+        tmp_path.replace(store_path)
+
+    matches["MatchParcelID"] = pd.to_numeric(matches["MatchParcelID"]).astype("Int64")
+    # Stored rows come back with NaN where fresh rows hold None
+    for col in ["MatchAddressId", "MatchMethod"]:
+        matches[col] = matches[col].astype(object).where(matches[col].notna(), None)
+    matches["MatchScore"] = pd.to_numeric(matches["MatchScore"])
+
+    stats = {
+        "contacts": len(contacts),
+        "hits": int(hit.sum()),
+        "misses": int((~hit).sum()),
+        "hit_rate": float(hit.mean()) if len(contacts) else 1.0,
+        "target_changed": target_changed,
+    }
+    logger.info(
+        f"Contact matches: {stats['hits']} of {stats['contacts']} from the store "
+        f"({stats['hit_rate']:.1%} hit rate), {stats['misses']} matched"
+        + (" (targets changed)" if target_changed else "")
+    )
+    return matches, stats
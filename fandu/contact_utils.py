@@ -0,0 +1,564 @@
+"""
+Contact address-label building for Fandu
+
+Turns the free-form Wild Apricot address fields into labels that match the
+city `AddressLabel` values, so contacts can be joined to Fan addresses.
+
+All work is done on whole columns: each distinct raw address is normalized
+once and the result is mapped back onto the frame.  Regular expressions are
+compiled at import time, and the street-name lookups (insert a missing street
+type, split a street name glued to a house number) use a single alternation
+keyed by street name instead of one regex pass per street.
+"""
+import re
+
+from functools import lru_cache
+from typing import Optional
+
+import pandas as pd
+
+
+# Long street types -> abbreviations used in the city AddressLabel
+street_replacements = {
+    "Avenue": "Ave",
+    "Alley" : "Al",
+    "Place": "Pl",
+    "Street": "St",
+    "Road": "Rd",
+    "Boulevard": "Blvd",
+    "Court": "Ct",
+    "Drive": "Dr",
+    "Ln" : "Lane",
+    "Circle" : "Cir",
+    "Apartment" : "Apt",
+    "Str":"St"
+}
+
+# Fan street names -> their street type
+street_data = {
+    "Addison": "St",
+    "Allen": "Ave",
+    "Allison": "St",
+    "Arthur Ashe": "Blvd",
+    "Belvidere": "St",
+    "Boyd": "St",
+    "Broad": "St",
+    "Brunswick": "St",
+    "Cathedral": "Pl",
+    "Davis": "Ave",
+    "Floyd": "Ave",
+    "Franklin": "St",
+    "Grace": "St",
+    "Granby": "St",
+    "Grove": "Ave",
+    "Hanover": "Ave",
+    "Harrison": "St",
+    "Harvie": "St",
+    "Horse Barn": "Al",
+    "Kensington": "Ave",
+    "Laurel": "St",
+    "Linden": "St",
+    "Lombardy": "St",
+    "Madumbie": "Lane",
+    "Main": "St",
+    "Meadow": "St",
+    "Monument": "Ave",
+    "Morris": "St",
+    "Mulberry": "St",
+    "Park": "Ave",
+    "Pine": "St",
+    "Plum": "St",
+    "Randolph": "St",
+    "Robinson": "St",
+    "Rowland": "St",
+    "Ryland": "St",
+    "Scuffletown": "Park",
+    "Shafer": "St",
+    "Shields": "Ave",
+    "Sidewalk": "Al",
+    "Stafford": "Ave",
+    "Strawberry": "St",
+    "Stuart": "Ave",
+    "Trouvaille": "Al",
+    "Vine": "St",
+    "West": "Ave",
+}
+
+# Bases whose units are labeled 'Unit' (resp. 'Apt') in the city database
+apt_to_unit = [
+    "1007 W Franklin St",
+    "101 N Stafford Ave",
+    "1605 Grove Ave",
+    "1524 West Ave",
+    "1723 Hanover Ave",
+    "1610 Grove Ave",
+    "2504 Grove Ave",
+    "1814 Park Ave",
+    "1828 Park Ave",
+    "2416 Park Ave",
+    "2606 Park Ave",
+    "612 W Franklin St",
+    "2620 Stuart Ave",
+    "2601 W Grace St",
+    "2042 W Grace St",
+    "2735 W Grace St",
+    "503 N Arthur Ashe Blvd",
+    "511 N Arthur Ashe Blvd"
+]
+
+unit_to_apt = [
+    "2217 Hanover Ave",
+    "16 N Rowland St",
+    "1809 Park Ave",
+    "2111 Floyd Ave",
+    "2703 Kensington Ave"
+]
+
+FAN_ADDRESS_COLUMN = "Fan-AssociatedAddress(RequiredIfNon-FanResident)"
+
+
+# --- Precompiled patterns ---
+
+_WHITESPACE = re.compile(r"\s+")
+_CITY_STATE = re.compile(r"\b(Richmond|VA|Virginia)\b[,.]?", re.IGNORECASE)
+
+# Streets longest-first, matching the order the per-street loop has always used
+_STREETS_BY_LENGTH = sorted(street_data.keys(), key=len, reverse=True)
+
+# A street name glued to a preceding letter or digit, e.g. '1508Hanover'
+_GLUED_STREET = re.compile(
+    r"(?<=[A-Za-z0-9])(?:" + "|".join(re.escape(s) for s in _STREETS_BY_LENGTH) + r")\b",
+    re.IGNORECASE,
+)
+_GLUED_STREET_FIXES = [
+    (
+        street,
+        re.compile(rf"(?<!\s)(?<=\d){re.escape(street)}\b", re.IGNORECASE),
+        re.compile(rf"^(\d+)([A-Za-z]){re.escape(street)}\b", re.IGNORECASE),
+        re.compile(rf"(?<=[A-Za-z0-9]){re.escape(street)}\b", re.IGNORECASE),
+    )
+    for street in _STREETS_BY_LENGTH
+]
+
+_STREET_REPLACEMENT = re.compile(r"\b(" + "|".join(map(re.escape, street_replacements)) + r")\b")
+
+_PROTECTED_TYPES = "|".join(["Ave", "St", "Pl", "Rd", "Blvd", "Ct", "Dr", "Ln", "Ter"])
+_DIRECTIONS = [
+    (re.compile(rf"^(\d+)\s+North(?!\s+({_PROTECTED_TYPES})\b)"), r"\1 N"),
+    (re.compile(rf"^(\d+)\s+South(?!\s+({_PROTECTED_TYPES})\b)"), r"\1 S"),
+    (re.compile(rf"^(\d+)\s+East(?!\s+({_PROTECTED_TYPES})\b)"), r"\1 E"),
+    (re.compile(rf"^(\d+)\s+West(?!\s+({_PROTECTED_TYPES})\b)"), r"\1 W"),
+]
+
+# Street name -> type lookup for insert_missing_street_type
+_STREET_TYPE_LOOKUP = {
+    name.lower(): street_type
+    for name, street_type in street_data.items()
+    if street_type is not None and str(street_type).lower() != "none"
+}
+_STREET_NAME = re.compile(
+    r"\b(" + "|".join(re.escape(name) for name in street_data if name.lower() in _STREET_TYPE_LOOKUP) + r")\b",
+    re.IGNORECASE,
+)
+_STREET_TYPE_FOLLOWS = {
+    name: re.compile(rf"\s+{street_type}\b", re.IGNORECASE)
+    for name, street_type in _STREET_TYPE_LOOKUP.items()
+}
+
+_APT_TO_UNIT = frozenset(apt_to_unit)
+_UNIT_TO_APT = frozenset(unit_to_apt)
+
+_BASE_AND_SUFFIX = re.compile(
+    r"^(.*\b(?:St|Ave|Rd|Blvd|Cir|Dr|Way|Ln|Pl|Al|Ct|Terr|Park)\b)(.*)$",
+    re.IGNORECASE,
+)
+_UNIT_MARKER = re.compile(r"\b(Apt|Unit|Suite|Ste|Room|Rear)\b", re.IGNORECASE)
+_UNIT_CODE = re.compile(r"^([#]?\d+[A-Za-z]*|[A-Za-z]\d*|[A-Z])\b")
+_APT_WORD = re.compile(r"\b(Apt|Apartment|Appt)\b", re.IGNORECASE)
+_UNIT_WORD = re.compile(r"\b(Unit|Ste|Suite)\b", re.IGNORECASE)
+
+
+def create_address_label(address1, address2=""):
+    """
+    Combine the Wild Apricot 'Address' and 'AddressLine2' fields into one string,
+    dropping a few known junk second lines.
+    """
+    if (pd.isna(address1)):
+        address1 = ""
+    if (pd.isna(address2)):
+        address2 = ""
+
+    if address2=="#2":
+        address2 = "Apt 2"
+
+    if address2.lower().find("warsaw")>=0:
+        address2 = ""
+
+    if address2.lower().find("2709 monument ave")>=0:
+        address1 = address2
+        address2 = ""
+
+    if address2.lower().find("kavaclub")>=0:
+        address2 = ""
+
+    addr = ""
+    if address1 and address2:
+        addr = address1 + ' ' + address2
+    if not address1:
+        addr = address2
+    if not address2:
+        addr = address1
+    if not addr:
+        return ""
+
+    return addr
+
+
+def extract_clean_street(addr):
+    """
+    Keep only the first three words (number, direction/name, type) of an address.
+    """
+    if pd.isna(addr):
+        return addr
+    parts = addr.split()
+    addr = " ".join( parts[:3] )
+    return addr
+
+
+def _split_glued_streets(addr: str) -> str:
+    """
+    Insert a space before street names stuck to a number or letter
+    ('1508Hanover' -> '1508 Hanover', '123BHanover' -> '123 Hanover Apt B').
+    """
+    # Nothing glued means every per-street fix below is a no-op
+    if not _GLUED_STREET.search(addr):
+        return addr
+
+    fixed = addr
+    for street, stuck_to_number, number_letter_prefix, stuck_to_alnum in _GLUED_STREET_FIXES:
+        # Case 1: Add a space before the street name if it's stuck to a number
+        fixed = stuck_to_number.sub(f" {street}", fixed)
+
+        # Case 2: Handle number-letter prefix like '123BHanover'
+        m = number_letter_prefix.match(fixed)
+        if m:
+            number, letter = m.group(1), m.group(2)
+            rest = fixed[m.end():].strip()
+            fixed = f"{number} {street} {rest} Apt {letter.upper()}".strip()
+
+        # Case 3: Add a space before the street if stuck to a letter/number
+        fixed = stuck_to_alnum.sub(f" {street}", fixed)
+
+        # Normalize spaces
+        fixed = _WHITESPACE.sub(" ", fixed).strip()
+
+    return fixed
+
+
+def normalize_contact_address(addr):
+    """
+    Clean a combined contact address toward the city AddressLabel form:
+    strip city/state, split glued street names, abbreviate street types and
+    directions, and apply the known one-off unit fixes.
+    """
+    if not addr:
+        return ""
+
+    addr = addr.replace("Rowland Ave","Rowland St")
+    addr = addr.replace("N. Boulevard","N Arthur Ashe Blvd")
+
+    addr = _CITY_STATE.sub('', addr)
+    addr = _WHITESPACE.sub(' ', addr).strip()
+
+    addr = _split_glued_streets(addr)
+
+    addr = addr.replace("1529’W","1529 W")
+    addr = addr.replace("DavisAve","Davis Ave")
+
+    addr = addr.replace("2620 Stuart Avenue #1B","2620 Stuart Avenue")
+
+    addr = addr.strip().title()
+    addr = addr.replace(".#", " ")
+    addr = addr.replace(",#"," Unit ")
+    addr = addr.replace("U-PL-F","PL-F")
+
+    addr = addr.replace(" #6C", " Unit 6C")
+    addr = addr.replace(" 5078"," Apt 5078")
+
+    addr = addr.replace(".", " ")
+    addr = addr.replace(",", "")
+    addr = addr.replace("#", "")
+    addr = addr.replace("’", " ")
+    addr = addr.replace("½"," 1/2 ")
+
+    # Replace street types at word boundaries
+    addr = _STREET_REPLACEMENT.sub(lambda m: street_replacements[m.group(1)], addr)
+
+    # Abbreviate a leading direction unless it is itself the street name (e.g. 'West Ave')
+    for pattern, replacement in _DIRECTIONS:
+        addr = pattern.sub(replacement, addr)
+
+    if addr.startswith("1400 Grove Ave"):
+        addr = addr.replace("U1","Unit 1")
+        addr = addr.replace("U2","Unit 2")
+
+    addr = addr.replace("1001A","1001 A")
+    if addr.startswith("413 Stuart Circle"):
+        addr = addr.replace("Unit 5 E","Unit 5-E")
+        addr = addr.replace("Unit 6-C","Rear 6-C")
+        addr = addr.replace("U-Pl-F","PLF")
+
+    addr = addr.replace("1723 Hanover Ave 6","1723 Hanover Ave Unit 6")
+    addr = addr.replace("2616 Monument Ave 6","2616 Monument Ave Apt 6")
+    addr = addr.replace("1105 Floyd Ave 1","1105 Floyd Ave Apt 1")
+    if addr=="1524 West Ave Unit 1":
+        addr = "1524 West Ave Unit 01"
+    if addr=="1524 West Ave Unit 2":
+        addr = "1524 West Ave Unit 02"
+    if addr=="406-A N Davis Ave":
+        addr = "406 N Davis Ave Apt A"
+
+    addr = _WHITESPACE.sub(" ", addr).strip()
+
+    return addr
+
+
+def insert_missing_street_type(label: str) -> str:
+    """
+    Ensures each AddressLabel includes the proper StreetType after the StreetName.
+    e.g. '1007 W Franklin' -> '1007 W Franklin St'
+    """
+    if not isinstance(label, str) or not label.strip():
+        return label
+
+    if label.lower().find("stuart cir")>=0:
+        return label
+
+    if label.lower().find("stuart ave")>=0:
+        return label
+
+    # Normalize spaces
+    label = _WHITESPACE.sub(" ", label.strip())
+
+    def add_type(m):
+        name = m.group(1).lower()
+        if _STREET_TYPE_FOLLOWS[name].match(label, m.end()):
+            return m.group(0)
+        return f"{m.group(1)} {_STREET_TYPE_LOOKUP[name]}"
+
+    label = _STREET_NAME.sub(add_type, label)
+
+    # Clean double spaces after replacement
+    label = _WHITESPACE.sub(" ", label).strip()
+    return label
+
+
+def normalize_apt_and_unit(label: str,
+                           apt_to_unit_bases=None,
+                           unit_to_apt_bases=None):
+    """
+    Normalize apartment/unit suffixes in address labels, inserting Apt when missing.
+    Examples:
+        "1064 Monument Ave 10"  -> "1064 Monument Ave Apt 10"
+        "710 W Franklin St Unit 2005A" -> maybe "710 W Franklin St Apt 2005A" (if base in unit_to_apt_bases)
+        "612 W Franklin St Apt 5" -> "612 W Franklin St Unit 5" (if base in apt_to_unit_bases)
+    """
+    if not isinstance(label, str) or not label.strip():
+        return label
+
+    apt_to_unit_bases = apt_to_unit_bases or ()
+    unit_to_apt_bases = unit_to_apt_bases or ()
+
+    label = label.strip()
+
+    # Match address up to recognized street type
+    m = _BASE_AND_SUFFIX.match(label)
+    if not m:
+        return label  # no clear base found
+
+    base, suffix = m.group(1).strip(), m.group(2).strip()
+    suffix = _WHITESPACE.sub(" ", suffix)
+
+    # Insert 'Apt' if suffix lacks marker and looks like a unit code
+    if suffix and not _UNIT_MARKER.search(suffix) and _UNIT_CODE.match(suffix):
+        suffix = "Apt " + suffix
+
+    # Apply base-specific conversions
+    if base in apt_to_unit_bases:
+        suffix = _APT_WORD.sub('Unit', suffix)
+    elif base in unit_to_apt_bases:
+        suffix = _UNIT_WORD.sub('Apt', suffix)
+
+    # Rebuild label and clean spacing
+    normalized = f"{base} {suffix}".strip()
+    normalized = _WHITESPACE.sub(" ", normalized)
+    return normalized
+
+
+def normalize_413_stuart_circle(label: str) -> str:
+    """Normalize a single 'AddressLabel' entry for 413 Stuart Cir."""
+    label = label.strip()
+
+    # Only act on rows beginning with 413 Stuart Cir
+    if not label.lower().startswith("413 stuart cir"):
+        return label
+
+    base = "413 Stuart Cir"
+    remainder = label[len(base):].strip()
+
+    # if no remainder, return base as-is
+    if remainder == "":
+        return base
+
+    # Normalize separators
+    remainder = remainder.replace(",", " ").replace("#", " ").strip()
+
+    # Convert 'Suite' or 'Apt' to 'Unit'
+    remainder = re.sub(r'(?i)\b(Suite|Apt|Apartment)\b', 'Unit', remainder)
+
+    # Normalize PL patterns (e.g. Ple, PLF, U-Pl-F)
+    remainder = re.sub(r'(?i)\b(Ple|PlE|Pl[eE])\b', 'PL-E', remainder)
+    remainder = re.sub(r'(?i)\b(Plf|PlF|Pl[fF])\b', 'PL-F', remainder)
+    remainder = re.sub(r'(?i)\b(Plg|PlG|Pl[gG])\b', 'PL-G', remainder)
+    remainder = re.sub(r'(?i)\b(Pl[a-dA-D])\b', lambda m: f"PL-{m.group(1)[-1].upper()}", remainder)
+
+    # Add "Unit" prefix if missing
+    if not re.match(r'(?i)\b(Unit|Rear)\b', remainder):
+        remainder = "Unit " + remainder
+
+    # Standardize spacing and hyphens
+    remainder = re.sub(r'\s+', ' ', remainder)
+    remainder = re.sub(r'(\d)([A-Z])', r'\1-\2', remainder)  # 6C → 6-C
+    remainder = re.sub(r'([A-Z])(\d)', r'\1-\2', remainder)  # PL1 → PL-1
+
+    # Title case (for Unit, Rear) and uppercase letter segments
+    remainder = re.sub(r'\b(Unit|Rear)\b', lambda m: m.group(1).title(), remainder)
+    remainder = re.sub(r'\b([A-Z]{1,3})\b', lambda m: m.group(1).upper(), remainder)
+
+    remainder = remainder.replace("Unit 6-C","Rear 6-C")
+    remainder = remainder.replace("U-Pl -F","PL-F")
+    remainder = remainder.replace('5 E',"5-E")
+
+    return f"{base} {remainder}".strip()
+
+
+def normalize_one_offs(label):
+    """
+    Hand fixes for individual contact addresses that don't follow any rule.
+    """
+    addr = label
+    # These apts are labeled 1 and 2, not A and B
+    if addr.startswith("16 N Rowland St"):
+        addr = addr.replace("Apt A","Apt 1")
+        addr = addr.replace("Apt B","Apt 2")
+
+    if addr.startswith("612 W Franklin St"):
+        parts = label.split()
+
+        # Process only the last word
+        last = parts[-1]
+        last_clean = re.sub(r"-", "", last).lower()
+        if last_clean.startswith("u"):
+            last_clean = last_clean.replace("u","Unit ")
+        parts[-1] = last_clean
+        addr = " ".join(parts)
+
+    if addr.startswith("2616 W Main St"):
+        addr = addr.replace("Apt 1","Apt A")
+        addr = addr.replace("Apt 2","Apt B")
+
+    if addr.startswith("2620 Stuart Ave"):
+        parts = label.split()
+        last = parts[-1]
+        last_clean = re.sub(r"-", "", last).lower()
+        parts[-1] = last_clean
+        addr = " ".join(parts)
+
+    if addr=="2016 B Park Ave":
+        addr = "2016 Park Ave Apt B"
+
+    if addr=="2320 B Floyd Ave":
+        addr = "2320 Floyd Ave Apt B"
+
+    if addr == "2414A Stuart Ave":
+        addr = "2414 Stuart Ave Apt 1"
+
+    if addr == "2024 Grove Ave Side Door":
+        addr = "2024 Grove Ave Apt A"
+
+    if addr == "2404 Grove Ave Apt 1":
+        addr = "2404 Grove Ave Apt A"
+
+    if addr == "612 W Franklin st":
+        addr = "612 W Franklin St"
+
+    if addr == "1918 Grove Ave Av":
+        addr = "1918 Grove Ave"
+
+    return addr
+
+
+@lru_cache(maxsize=65536)
+def normalize_contact_label(label: str) -> str:
+    """
+    Run the full label normalization chain on one raw label.  Cached, so each
+    distinct raw address is only normalized once per process.
+    """
+    label = normalize_contact_address(label)
+    label = insert_missing_street_type(label)
+    label = normalize_apt_and_unit(label, apt_to_unit_bases=_APT_TO_UNIT, unit_to_apt_bases=_UNIT_TO_APT)
+    label = normalize_413_stuart_circle(label)
+    label = normalize_one_offs(label)
+    return label
+
+
+def _map_unique(values: pd.Series, func) -> pd.Series:
+    """Apply `func` once per distinct value of `values` and broadcast the results."""
+    uniques = pd.unique(values)
+    lookup = {u: func(u) for u in uniques}
+    return values.map(lookup)
+
+
+def build_address_labels(
+    contacts: pd.DataFrame,
+    address_col: str = "Address",
+    address2_col: Optional[str] = "AddressLine2",
+    fan_address_col: Optional[str] = FAN_ADDRESS_COLUMN,
+) -> pd.Series:
+    """
+    Build the matching AddressLabel for every contact.
+
+    Parameters
+    ----------
+    contacts : pd.DataFrame
+        Contacts with normalized headers (as loaded in 02_Contacts_in_fan.qmd).
+    address_col : str, optional
+        First address line column (default='Address').
+    address2_col : str, optional
+        Second address line column; skipped if None or missing (default='AddressLine2').
+    fan_address_col : str, optional
+        Fan-associated address column, which overrides the home address when
+        filled in; skipped if None or missing.
+
+    Returns
+    -------
+    pd.Series
+        Normalized address labels, aligned with `contacts.index`.
+    """
+    address1 = contacts[address_col].fillna("")
+    if address2_col is not None and address2_col in contacts.columns:
+        address2 = contacts[address2_col].fillna("")
+    else:
+        address2 = pd.Series("", index=contacts.index)
+
+    # Combine address lines, once per distinct (line1, line2) pair
+    pairs = pd.Series(list(zip(address1, address2)), index=contacts.index)
+    labels = _map_unique(pairs, lambda pair: create_address_label(*pair))
+
+    # Use the Fan-associated address when one is given
+    if fan_address_col is not None and fan_address_col in contacts.columns:
+        fan_address = contacts[fan_address_col]
+        mask = fan_address.notna() & (fan_address.astype(str).str.strip() != "")
+        labels = labels.where(~mask, _map_unique(fan_address[mask], extract_clean_street))
+
+    return _map_unique(labels, normalize_contact_label)
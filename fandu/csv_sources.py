@@ -0,0 +1,287 @@
+"""
+Schema-declared CSV ingestion
+
+City exports (Parcels_*.csv) and the Wild Apricot contact export
+(FDA_contacts-*.csv) are read with the pyarrow CSV engine from a declared
+source (`CSV_SOURCES`): how headers are normalized, how many rows follow the
+header before the data, and the Arrow type of each column.  Undeclared columns
+are read as strings, so nothing is inferred and a column keeps its type from
+one export to the next.
+
+    read_source_csv       typed pandas frame, converted with `DTYPE_SCHEMAS`
+    iter_source_batches   Arrow record batches, for files too big to hold
+
+Both take `columns` (normalized names) so unused columns are never converted.
+Typing happens while parsing: the source's `DTYPE_SCHEMAS` entry becomes Arrow
+column types (categories as dictionary columns, nullable ints, strings) and
+other low-cardinality strings are dictionary-encoded in Arrow, so no pandas
+post-pass is needed.
+"""
+import csv
+
+from pathlib import Path
+from typing import Iterator, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pv
+from loguru import logger
+
+from fandu.dtype_utils import CATEGORY_RATIO, DTYPE_SCHEMAS, STRING_DTYPE
+from fandu.profiling import profiled
+
+# Bytes per batch read by the streaming reader
+CSV_BLOCK_SIZE = 1 << 22
+
+# DTYPE_SCHEMAS dtype -> Arrow type read by the CSV parser
+_ARROW_DTYPES = {
+    "category": pa.dictionary(pa.int32(), pa.string()),
+    "string": pa.string(),
+    "Int8": pa.int8(),
+    "Int16": pa.int16(),
+    "Int32": pa.int32(),
+    "Int64": pa.int64(),
+}
+
+# Arrow type -> pandas dtype when converting typed reads
+_PANDAS_DTYPES = {
+    pa.string(): STRING_DTYPE,
+    pa.int8(): pd.Int8Dtype(),
+    pa.int16(): pd.Int16Dtype(),
+    pa.int32(): pd.Int32Dtype(),
+    pa.int64(): pd.Int64Dtype(),
+}
+
+
+def title_case_headers(name: str) -> str:
+    """'Member role' -> 'MemberRole', 'Member since.1' -> 'MemberSince_1' (as the contact reports do)."""
+    return name.title().replace(" ", "").replace(":", "").replace(".", "_")
+
+
+# Source -> DTYPE_SCHEMAS entry, header normalization, rows between the header
+# and the data, Arrow types of declared columns and timestamp formats
+CSV_SOURCES = {
+    "Parcels": {
+        "dtypes": "Parcels",
+        "headers": None,
+        "skip_rows": 0,
+        "types": {
+            "ParcelID": "int32",
+            "CountOfPIN": "int32",
+            "AssessmentDate": "timestamp[s]",
+            "LandValue": "double",
+            "DwellingValue": "double",
+            "TotalValue": "double",
+            "LandSqFt": "double",
+            "Mailable": "int8",
+            "OBJECTID": "int64",
+            "Shape__Area": "double",
+            "Shape__Length": "double",
+        },
+        "timestamp_formats": ["%m/%d/%Y %I:%M:%S %p"],
+    },
+    "FDA_contacts": {
+        "dtypes": "Contacts",
+        "headers": title_case_headers,
+        # Wild Apricot repeats the header as system codes on the second row
+        "skip_rows": 1,
+        # As pd.read_csv infers them, so `load_contacts_csv` keeps its dtypes
+        "types": {
+            "Id": "int64",
+            "UserId": "int64",
+            "AccessToProfileByOthers": "bool",
+            "Archived": "bool",
+            "Balance": "double",
+            "BundleId": "double",
+            "Donor": "bool",
+            "EmailDeliveryDisabled": "bool",
+            "EmailDeliveryDisabledAutomatically": "bool",
+            "EventAnnouncements": "bool",
+            "EventRegistrant": "bool",
+            "Isaccountadministrator": "bool",
+            "Member": "bool",
+            "MemberEmailsAndNewsletters": "bool",
+            "MembershipEnabled": "bool",
+            "MembershipEnabled(Duplicate)": "bool",
+            "Membershipenabled": "bool",
+            "MembershipLevelId(Duplicate)": "double",
+            "Membershiplevelid": "double",
+            "ProfileLastUpdatedBy": "double",
+            "ReceivingEmailsDisabled": "bool",
+            "RegisteredForSpecificEvent": "double",
+            "SuspendedMember": "bool",
+            "TermsOfUseAccepted": "bool",
+            "Termsofuseaccepted": "bool",
+            "Text(Sms)Messaging": "bool",
+            "TotalDonated": "double",
+        },
+        "timestamp_formats": [],
+    },
+}
+
+
+def _source_spec(path: Path, source: Optional[str]) -> tuple[str, dict]:
+    """Source name and definition, by name or from the file name's prefix."""
+    if source is None:
+        matches = [name for name in CSV_SOURCES if Path(path).stem.startswith(name)]
+        if not matches:
+            raise ValueError(f"No CSV source matches {Path(path).name}; pass source= (known: {', '.join(CSV_SOURCES)})")
+        source = max(matches, key=len)
+    if source not in CSV_SOURCES:
+        raise ValueError(f"Unknown CSV source {source!r}; known: {', '.join(CSV_SOURCES)}")
+    return source, CSV_SOURCES[source]
+
+
+def source_headers(path: Path, source: Optional[str] = None) -> tuple[list, list]:
+    """
+    Raw and normalized column names of a source CSV.
+
+    Raw names are de-duplicated the way `pd.read_csv` does ('Member since',
+    'Member since.1') before normalization.
+    """
+    _, spec = _source_spec(path, source)
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        header = next(csv.reader(f))
+
+    raw, seen = [], {}
+    for name in header:
+        count = seen.get(name, 0)
+        seen[name] = count + 1
+        raw.append(f"{name}.{count}" if count else name)
+    normalize = spec["headers"] or (lambda name: name)
+    return raw, [normalize(name) for name in raw]
+
+
+def _csv_options(path: Path, source: Optional[str], columns: Optional[Sequence[str]], block_size: int,
+                 typed: bool = False):
+    """
+    pyarrow read/parse/convert options for a source CSV and its raw/normalized names.
+
+    If `typed`, the source's `DTYPE_SCHEMAS` entry is read as Arrow types and
+    takes precedence over the source's declared types (e.g. contact ids stay
+    strings).
+    """
+    _, spec = _source_spec(path, source)
+    raw, names = source_headers(path, source)
+    if columns is not None:
+        unknown = [c for c in columns if c not in names]
+        if unknown:
+            raise ValueError(f"{Path(path).name} has no columns {unknown}")
+
+    declared = {name: pa.type_for_alias(alias) for name, alias in spec["types"].items()}
+    if typed:
+        declared.update({
+            name: _ARROW_DTYPES[dtype]
+            for name, dtype in DTYPE_SCHEMAS[spec["dtypes"]].items()
+            if dtype in _ARROW_DTYPES
+        })
+    types = {name: declared.get(name, pa.string()) for name in names}
+    read_options = pv.ReadOptions(
+        skip_rows=1 + spec["skip_rows"], column_names=names, block_size=block_size, encoding="utf-8"
+    )
+    parse_options = pv.ParseOptions(newlines_in_values=True)
+    convert_options = pv.ConvertOptions(
+        column_types=types,
+        include_columns=list(columns) if columns is not None else None,
+        strings_can_be_null=True,
+        timestamp_parsers=spec["timestamp_formats"] or None,
+    )
+    return (read_options, parse_options, convert_options), raw, names
+
+
+def iter_source_batches(
+    path: Path,
+    source: Optional[str] = None,
+    columns: Optional[Sequence[str]] = None,
+    block_size: int = CSV_BLOCK_SIZE,
+) -> Iterator[pa.RecordBatch]:
+    """
+    Stream a source CSV as typed Arrow record batches.
+
+    Parameters
+    ----------
+    path : Path
+        CSV export, e.g. data/Parcels_5964925308626061370.csv.
+    source : str, optional
+        `CSV_SOURCES` entry (default: the one the file name starts with).
+    columns : sequence of str, optional
+        Normalized columns to read (default: all).
+    block_size : int, optional
+        Bytes of CSV parsed per batch (default=4 MiB).
+
+    Yields
+    ------
+    pa.RecordBatch
+        Batches with normalized column names and declared types.
+    """
+    options, _, _ = _csv_options(path, source, columns, block_size)
+    with pv.open_csv(path, *options) as reader:
+        yield from reader
+
+
+def _encode_categories(table: pa.Table, declared: dict) -> pa.Table:
+    """
+    Dictionary-encode undeclared string columns with at most `CATEGORY_RATIO`
+    distinct values per row, the rule `optimize_dtypes` applies in pandas.
+    """
+    for i, column in enumerate(table.columns):
+        name = table.column_names[i]
+        if name in declared or not pa.types.is_string(column.type) or column.null_count == len(column):
+            continue
+        if pc.count_distinct(column).as_py() <= CATEGORY_RATIO * len(column):
+            table = table.set_column(i, name, column.dictionary_encode())
+    return table
+
+
+@profiled()
+def read_source_csv(
+    path: Path,
+    source: Optional[str] = None,
+    columns: Optional[Sequence[str]] = None,
+    normalize: bool = True,
+    optimize: bool = True,
+):
+    """
+    Read a source CSV into a typed DataFrame.
+
+    Parameters
+    ----------
+    path : Path
+        CSV export, e.g. precious/FDA_contacts-2025-09-28.csv.
+    source : str, optional
+        `CSV_SOURCES` entry (default: the one the file name starts with).
+    columns : sequence of str, optional
+        Normalized columns to read (default: all).
+    normalize : bool, optional
+        If True (default), return normalized column names, otherwise the raw
+        export headers as `pd.read_csv` names them.
+    optimize : bool, optional
+        If True (default) and `normalize`, read with the source's
+        `DTYPE_SCHEMAS` entry (categories, nullable ints, pyarrow strings)
+        and make other low-cardinality strings categories.
+
+    Returns
+    -------
+    pd.DataFrame
+        One row per record; the skipped header rows are not included.
+    """
+    name, spec = _source_spec(path, source)
+    typed = optimize and normalize
+    options, raw, names = _csv_options(path, source, columns, CSV_BLOCK_SIZE, typed=typed)
+    table = pv.read_csv(path, *options)
+    logger.debug(f"{Path(path).name}: read {table.num_rows} rows x {table.num_columns} columns as {name}")
+
+    if typed:
+        table = _encode_categories(table, DTYPE_SCHEMAS[spec["dtypes"]])
+        return table.to_pandas(types_mapper=_PANDAS_DTYPES.get)
+
+    if not normalize:
+        raw_names = dict(zip(names, raw))
+        table = table.rename_columns([raw_names[c] for c in table.column_names])
+    df = table.to_pandas()
+    # Missing strings as NaN rather than None, as pd.read_csv gives them
+    strings = df.columns[df.dtypes == object]
+    df[strings] = df[strings].where(df[strings].notna(), np.nan)
+    return df
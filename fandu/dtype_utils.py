@@ -0,0 +1,187 @@
+"""
+Memory-lean dtypes for loaded frames
+
+Parcels, addresses, contacts and the HHT homes load with object and float64
+columns, so a value like 'Single Family' or '23220' is stored once per row.
+`optimize_dtypes` converts a frame using a declared schema (`DTYPE_SCHEMAS`)
+and infers the rest:
+
+    category     repeated strings (StreetName, LandUse, MemberRole, ...)
+    string       pyarrow-backed strings for free text and ids
+    Int8..Int64  the smallest nullable int holding integer-valued columns
+
+and logs memory before and after.  Categories only accept their existing
+values, so declare a column "string" if a report assigns new values to it.
+"""
+from typing import Optional, Union
+
+import numpy as np
+import pandas as pd
+from loguru import logger
+
+# pyarrow-backed string dtype (falls back to Python strings without pyarrow)
+try:
+    STRING_DTYPE = pd.StringDtype("pyarrow")
+except ImportError:
+    STRING_DTYPE = pd.StringDtype("python")
+
+# Object columns with at most this share of distinct values become categoricals
+CATEGORY_RATIO = 0.5
+
+# Declared dtypes per dataset; undeclared columns are inferred
+DTYPE_SCHEMAS = {
+    "Parcels": {
+        "ParcelID": "Int32",
+        "PIN": "string",
+        "OwnerName": "string",
+        "AsrLocationBldgNo": "string",
+        "MailAddress": "string",
+        "MailCity": "category",
+        "MailState": "category",
+        "MailZip": "category",
+        "ProvalAsmtNhood": "category",
+        "TaxExemptCode": "category",
+        "PropertyClassID": "category",
+        "PropertyClass": "category",
+        "LandUse": "category",
+        "Mailable": "Int8",
+        "FanUse": "category",
+        "FanUseType": "category",
+    },
+    "Addresses": {
+        "AddressId": "string",
+        "AddressLabel": "string",
+        "BuildingNumber": "string",
+        "StreetDirection": "category",
+        "StreetName": "category",
+        "StreetType": "category",
+        "UnitType": "category",
+        "ZipCode": "category",
+        "Mailable": "category",
+        "AddressStreet": "category",
+    },
+    "Contacts": {
+        "UserId": "string",
+        "Id": "string",
+        "Address": "string",
+        "AddressLine2": "string",
+        "Fan-AssociatedAddress(RequiredIfNon-FanResident)": "string",
+        "City": "string",
+        "Zip": "string",
+        "MemberRole": "category",
+        "Membershiplevel": "category",
+        "Membershiplevelname": "category",
+        "Status": "category",
+        "State": "category",
+    },
+    "HHT": {
+        "year": "Int16",
+        "street_number": "Int32",
+        "street_name": "category",
+        "street_type": "category",
+        "place_name": "string",
+        "clean_address": "string",
+        "address": "string",
+        "notes": "string",
+    },
+}
+
+_NULLABLE_INTS = ["Int8", "Int16", "Int32", "Int64"]
+
+
+def memory_mb(df: pd.DataFrame) -> float:
+    """Deep memory usage of a frame in MB."""
+    return df.memory_usage(deep=True).sum() / 1024 ** 2
+
+
+def _smallest_int(values: pd.Series) -> Optional[str]:
+    """Smallest nullable int dtype holding `values`, or None if they aren't integers."""
+    present = values.dropna()
+    if present.empty:
+        return None
+    if pd.api.types.is_float_dtype(present) and not np.array_equal(present, np.floor(present)):
+        return None
+    low, high = present.min(), present.max()
+    for dtype in _NULLABLE_INTS:
+        info = np.iinfo(dtype.lower())
+        if info.min <= low and high <= info.max:
+            return dtype
+    return None
+
+
+def _infer_dtype(values: pd.Series, category_ratio: float):
+    """Inferred dtype for an undeclared column, or None to leave it as is."""
+    if pd.api.types.is_bool_dtype(values) or isinstance(values.dtype, pd.CategoricalDtype):
+        return None
+    if pd.api.types.is_integer_dtype(values) or pd.api.types.is_float_dtype(values):
+        return _smallest_int(values)
+    if values.dtype == object:
+        present = values.dropna()
+        if present.empty or not present.map(type).eq(str).all():
+            return None
+        if present.nunique() <= category_ratio * len(values):
+            return "category"
+        return STRING_DTYPE
+    return None
+
+
+def _as_dtype(dtype):
+    return STRING_DTYPE if dtype == "string" else dtype
+
+
+def optimize_dtypes(
+    df: pd.DataFrame,
+    schema: Union[str, dict, None] = None,
+    infer: bool = True,
+    category_ratio: float = CATEGORY_RATIO,
+    name: Optional[str] = None,
+) -> pd.DataFrame:
+    """
+    Convert a frame to memory-lean dtypes.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        Frame to convert (also a GeoDataFrame; geometry columns are left alone).
+    schema : str or dict, optional
+        A `DTYPE_SCHEMAS` name or a {column: dtype} mapping.  Declared columns
+        missing from `df` are ignored.
+    infer : bool, optional
+        If True (default), infer dtypes for undeclared columns.
+    category_ratio : float, optional
+        Undeclared string columns with at most this share of distinct values
+        become categoricals, the rest pyarrow strings (default=0.5).
+    name : str, optional
+        Label for the memory log line (default: the schema name).
+
+    Returns
+    -------
+    pd.DataFrame
+        A converted copy of `df`.
+    """
+    declared = DTYPE_SCHEMAS[schema] if isinstance(schema, str) else dict(schema or {})
+    label = name or (schema if isinstance(schema, str) else "frame")
+    before = memory_mb(df)
+
+    dtypes = {}
+    for column in df.columns:
+        values = df[column]
+        if isinstance(values, pd.DataFrame) or values.dtype.name == "geometry":
+            continue
+        if column in declared:
+            dtypes[column] = _as_dtype(declared[column])
+        elif infer:
+            dtype = _infer_dtype(values, category_ratio)
+            if dtype is not None:
+                dtypes[column] = dtype
+
+    result = df.copy()
+    for column, dtype in dtypes.items():
+        try:
+            result[column] = result[column].astype(dtype)
+        except (TypeError, ValueError) as e:
+            logger.warning(f"{label}: could not convert {column} to {dtype}: {e}")
+
+    after = memory_mb(result)
+    logger.info(f"{label}: {before:.1f} MB -> {after:.1f} MB ({len(dtypes)} columns converted)")
+    return result
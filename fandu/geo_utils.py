@@ -3,17 +3,53 @@ Geospatial Utilities for Fandu
 """
 import os
 import re
+import json
+import pickle
+import itertools
 
 from pathlib import Path
 
 import zipfile
-import geopandas as gpd
-import matplotlib.pyplot as plt
 
 from datetime import datetime
-from typing import Optional
+from typing import TYPE_CHECKING, Optional
 from loguru import logger
 
+from fandu.cache_utils import (
+    file_fingerprint,
+    combine_fingerprints,
+    read_parquet_fingerprint,
+    snapshot_cache_path,
+    write_fingerprinted_parquet,
+)
+from fandu.profiling import profiled
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# geopandas, pyproj and scikit-learn are imported inside the functions that
+# need them; get_newest_path is used everywhere and should stay cheap.
+
+# Projected CRS for distance work in the Fan: NAD83 / Virginia South (meters)
+FAN_PROJECTED_CRS = "EPSG:32147"
+
+# Bump when the cached address tree layout changes
+ADDRESS_TREE_VERSION = "1"
+
+# In-process address trees, keyed by (snapshot path, mtime, size)
+_address_trees = {}
+
+# Bump when the cached reprojection layout changes
+REPROJECTION_VERSION = "1"
+
+# pyproj Transformers keyed by (source CRS, target CRS), reused across calls
+_transformers = {}
+
+# Snapshot fingerprints keyed by (path, mtime, size), and reprojected
+# geometries keyed by (reprojection fingerprint, rows)
+_snapshot_fingerprints = {}
+_reprojections = {}
+
 
 def get_newest_path(path: Path, feature: str, ext: str = ".geojson") -> Optional[Path]:
     """
@@ -64,6 +100,8 @@ def get_newest_path(path: Path, feature: str, ext: str = ".geojson") -> Optional
 
 def load_shapefile_from_zip(zip_path="../data/neighborhoods-shp.zip" ):
     """Extracts, loads a shapefile from a ZIP archive."""
+    import geopandas as gpd
+
     extract_dir = "shapefile_temp"
     os.makedirs(extract_dir, exist_ok=True)
 
@@ -91,3 +129,743 @@ def rva_geohub_url( feature ):
     return f"https://services1.arcgis.com/k3vhq11XkBNeeOfM/arcgis/rest/services/{feature}/FeatureServer/0/query?where=1=1&outFields=*&f=geojson"
 
 
+@profiled()
+def load_address_tree(
+    snapshot_path: Optional[Path] = None,
+    precious_folder: Path = Path("../precious/"),
+    ext: str = ".geojson",
+    id_col: str = "AddressId",
+    label_col: str = "AddressLabel",
+    rebuild: bool = False,
+) -> dict:
+    """
+    Load a KD-tree over the projected address points of an Addresses snapshot.
+
+    The tree is pickled to 'precious/.cache/<snapshot>.kdtree.pkl' and reused
+    until the snapshot's contents change; within a session it is also kept in memory.
+
+    Parameters
+    ----------
+    snapshot_path : Path, optional
+        Addresses snapshot (.geojson or .parquet).  If omitted, the newest
+        'Addresses' file in `precious_folder` is used.
+    precious_folder : Path, optional
+        Folder searched when `snapshot_path` is omitted (default='../precious/').
+    ext : str, optional
+        Snapshot extension searched for (default='.geojson').
+    id_col, label_col : str, optional
+        Address id and label columns (default='AddressId', 'AddressLabel').
+    rebuild : bool, optional
+        If True, ignore any cached tree.
+
+    Returns
+    -------
+    dict
+        'tree' (sklearn KDTree over FAN_PROJECTED_CRS coordinates), 'AddressId',
+        'AddressLabel', 'latitude', 'longitude' arrays in tree order, and 'fingerprint'.
+    """
+    import numpy as np
+    import geopandas as gpd
+    from sklearn.neighbors import KDTree
+
+    if snapshot_path is None:
+        snapshot_path = get_newest_path(Path(precious_folder), "Addresses", ext=ext)
+        if snapshot_path is None:
+            raise FileNotFoundError(f"No Addresses snapshot found in {precious_folder}")
+    snapshot_path = Path(snapshot_path).resolve()
+
+    stat = snapshot_path.stat()
+    memo_key = (str(snapshot_path), stat.st_mtime_ns, stat.st_size, id_col, label_col)
+    if not rebuild and memo_key in _address_trees:
+        return _address_trees[memo_key]
+
+    fingerprint = combine_fingerprints([ADDRESS_TREE_VERSION, id_col, label_col, file_fingerprint(snapshot_path)])
+    cache_path = snapshot_cache_path(snapshot_path, "kdtree", ".pkl")
+
+    tree = None
+    if not rebuild and cache_path.is_file():
+        with open(cache_path, "rb") as f:
+            cached = pickle.load(f)
+        if cached.get("fingerprint") == fingerprint:
+            logger.info(f"Loading address tree: {cache_path.name}")
+            tree = cached
+
+    if tree is None:
+        logger.info(f"Building address tree from {snapshot_path.name}")
+        if snapshot_path.suffix.lower() == ".parquet":
+            addresses = gpd.read_parquet(snapshot_path)
+        else:
+            addresses = gpd.read_file(snapshot_path)
+        addresses = addresses[addresses.geometry.notna() & ~addresses.geometry.is_empty]
+        points = addresses.geometry.representative_point()
+        projected = points.to_crs(FAN_PROJECTED_CRS)
+        wgs84 = points.to_crs(epsg=4326)
+
+        tree = {
+            "fingerprint": fingerprint,
+            "tree": KDTree(np.column_stack([projected.x.to_numpy(), projected.y.to_numpy()])),
+            "AddressId": addresses[id_col].astype(str).to_numpy(dtype=object),
+            "AddressLabel": addresses[label_col].astype(str).to_numpy(dtype=object),
+            "latitude": wgs84.y.to_numpy(),
+            "longitude": wgs84.x.to_numpy(),
+        }
+        with open(cache_path, "wb") as f:
+            pickle.dump(tree, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    _address_trees[memo_key] = tree
+    return tree
+
+
+@profiled()
+def snap_to_addresses(
+    points: "pd.DataFrame",
+    k: int = 1,
+    lat_col: str = "lat",
+    lon_col: str = "lon",
+    max_distance: Optional[float] = None,
+    snapshot_path: Optional[Path] = None,
+    precious_folder: Path = Path("../precious/"),
+) -> "pd.DataFrame":
+    """
+    Snap geocoded points to their k nearest city address points.
+
+    Parameters
+    ----------
+    points : pd.DataFrame
+        Frame with WGS84 latitude/longitude columns, e.g. data/geocoded_contacts.csv.
+    k : int, optional
+        Number of nearest addresses returned per point (default=1).
+    lat_col, lon_col : str, optional
+        Latitude and longitude columns (default='lat', 'lon').
+    max_distance : float, optional
+        Neighbours further than this many meters are dropped (returned as NaN).
+    snapshot_path, precious_folder : optional
+        Addresses snapshot to snap to; see `load_address_tree`.
+
+    Returns
+    -------
+    pd.DataFrame
+        k rows per input point, indexed like `points`, with columns 'snap_rank'
+        (1 = nearest), 'AddressId', 'AddressLabel', 'snap_distance_m',
+        'snap_latitude' and 'snap_longitude'.  Points without coordinates get NaN rows.
+    """
+    import numpy as np
+    import pandas as pd
+    from pyproj import Transformer
+
+    address_tree = load_address_tree(snapshot_path=snapshot_path, precious_folder=precious_folder)
+    k = min(k, len(address_tree["AddressId"]))
+
+    lat = pd.to_numeric(points[lat_col], errors="coerce").to_numpy(dtype=float)
+    lon = pd.to_numeric(points[lon_col], errors="coerce").to_numpy(dtype=float)
+    valid = ~(np.isnan(lat) | np.isnan(lon))
+
+    distances = np.full((len(points), k), np.nan)
+    neighbours = np.full((len(points), k), -1, dtype=np.int64)
+    if valid.any():
+        to_projected = Transformer.from_crs("EPSG:4326", FAN_PROJECTED_CRS, always_xy=True)
+        x, y = to_projected.transform(lon[valid], lat[valid])
+        distances[valid], neighbours[valid] = address_tree["tree"].query(np.column_stack([x, y]), k=k)
+    if max_distance is not None:
+        too_far = distances > max_distance
+        distances[too_far], neighbours[too_far] = np.nan, -1
+
+    neighbours, distances = neighbours.ravel(), distances.ravel()
+    found = neighbours >= 0
+
+    def pick(values, fill):
+        out = np.full(len(neighbours), fill, dtype=values.dtype)
+        out[found] = values[neighbours[found]]
+        return out
+
+    return pd.DataFrame({
+        "snap_rank": np.tile(np.arange(1, k + 1), len(points)),
+        "AddressId": pick(address_tree["AddressId"], None),
+        "AddressLabel": pick(address_tree["AddressLabel"], None),
+        "snap_distance_m": distances,
+        "snap_latitude": pick(address_tree["latitude"], np.nan),
+        "snap_longitude": pick(address_tree["longitude"], np.nan),
+    }, index=points.index.repeat(k))
+
+
+def get_transformer(source_crs, target_crs):
+    """ Cached always_xy pyproj Transformer between two CRS (anything pyproj accepts) """
+    from pyproj import CRS, Transformer
+
+    source, target = CRS.from_user_input(source_crs), CRS.from_user_input(target_crs)
+    key = (source.to_wkt(), target.to_wkt())
+    if key not in _transformers:
+        _transformers[key] = Transformer.from_crs(source, target, always_xy=True)
+    return _transformers[key]
+
+
+def transform_geometries(geometries, source_crs, target_crs):
+    """
+    Reproject an array of shapely geometries in one pass over their coordinates.
+
+    All coordinates are pulled into a single (n, 2) array, transformed with a
+    reused Transformer and written back; the result is a new object array.
+    """
+    import numpy as np
+    import shapely
+
+    transformer = get_transformer(source_crs, target_crs)
+
+    def transform(xy):
+        x, y = transformer.transform(xy[:, 0], xy[:, 1])
+        return np.column_stack([x, y])
+
+    return shapely.transform(np.asarray(geometries, dtype=object), transform)
+
+
+def snapshot_fingerprint(snapshot: Path) -> str:
+    """ `file_fingerprint` of a snapshot, hashed once per process while it is unchanged """
+    snapshot = Path(snapshot).resolve()
+    stat = snapshot.stat()
+    key = (str(snapshot), stat.st_mtime_ns, stat.st_size)
+    if key not in _snapshot_fingerprints:
+        _snapshot_fingerprints[key] = file_fingerprint(snapshot)
+    return _snapshot_fingerprints[key]
+
+
+def _crs_label(crs) -> str:
+    """ Short file-name-safe CRS label, e.g. 'EPSG_4326' """
+    authority = crs.to_authority()
+    if authority:
+        return "_".join(authority)
+    return combine_fingerprints([crs.to_wkt()])[:12]
+
+
+@profiled()
+def to_crs_cached(gdf, crs, snapshot: Path):
+    """
+    `gdf.to_crs(crs)` for a layer read straight from a snapshot, cached on disk.
+
+    The projected geometry is stored as WKB in
+    '.cache/<snapshot>.crs-<label>.parquet' next to the snapshot, keyed by the
+    snapshot's contents and both CRS, so later reports and builds skip the
+    reprojection; within a session it is also kept in memory.
+
+    Parameters
+    ----------
+    gdf : gpd.GeoDataFrame
+        The snapshot as read, unfiltered and in file order.
+    crs : str, int or pyproj.CRS
+        Target CRS, e.g. `data[selector].crs` or 'EPSG:4326'.
+    snapshot : Path
+        File `gdf` was read from.
+
+    Returns
+    -------
+    gpd.GeoDataFrame
+        A copy of `gdf` in `crs`.
+    """
+    import pyarrow.parquet as pq
+    import shapely
+    from pyproj import CRS
+
+    target = CRS.from_user_input(crs)
+    if gdf.crs is None or gdf.crs.equals(target):
+        return gdf.to_crs(target) if gdf.crs is not None else gdf.copy()
+
+    fingerprint = combine_fingerprints([
+        REPROJECTION_VERSION, snapshot_fingerprint(snapshot), gdf.crs.to_wkt(), target.to_wkt(),
+    ])
+    memo_key = (fingerprint, len(gdf))
+    geometries = _reprojections.get(memo_key)
+
+    cache_path = snapshot_cache_path(snapshot, f"crs-{_crs_label(target)}")
+    if geometries is None and read_parquet_fingerprint(cache_path) == fingerprint:
+        cached = shapely.from_wkb(pq.read_table(cache_path).column("geometry").to_numpy(zero_copy_only=False))
+        if len(cached) == len(gdf):
+            logger.debug(f"Loading {len(cached)} reprojected geometries: {cache_path.name}")
+            geometries = cached
+
+    if geometries is None:
+        import pandas as pd
+
+        geometries = transform_geometries(gdf.geometry.values, gdf.crs, target)
+        tmp_path = cache_path.with_suffix(".tmp")
+        write_fingerprinted_parquet(pd.DataFrame({"geometry": shapely.to_wkb(geometries)}), tmp_path, fingerprint)
+        tmp_path.replace(cache_path)
+    _reprojections[memo_key] = geometries
+
+    result = gdf.copy()
+    result[result.geometry.name] = geometries
+    return result.set_crs(target, allow_override=True)
+
+
+# Esri mobile geodatabases (.geodatabase) are SQLite files whose geometries are
+# ST_Geometry blobs that GDAL cannot decode; the reader below walks the layer's
+# R-tree index and decodes only the features it needs.
+
+# Arrow types for the SQLite column declarations used by mobile geodatabases
+_GDB_ARROW_TYPES = {
+    "int16": "int16", "int32": "int32", "int64": "int64", "integer": "int64",
+    "float32": "float", "float64": "double", "realdate": "timestamp[ms]",
+    "text": "string", "uuidtext": "string", "blob": "binary",
+}
+
+# ST_Geometry type codes of polygon layers
+_GDB_POLYGON_TYPES = (3, 6)
+
+# Exact boundary predicates accepted by the reader
+_GDB_PREDICATES = ("intersects", "within")
+
+# Julian day of 1970-01-01, the epoch of 'realdate' columns
+_JULIAN_UNIX_EPOCH = 2440587.5
+
+# Characters of GeoJSON text read at a time by the streaming reader
+GEOJSON_CHUNK_SIZE = 1 << 20
+
+_GEOJSON_FEATURES = re.compile(r'"features"\s*:\s*\[')
+_GEOJSON_CRS = re.compile(r'"crs"\s*:\s*\{.*?"name"\s*:\s*"([^"]+)"', re.DOTALL)
+_GEOJSON_SEPARATOR = re.compile(r"[\s,]*")
+
+
+def _gdb_layer(con, layer: Optional[str] = None) -> dict:
+    """ Geometry column, spatial reference and column types of a geodatabase layer """
+    layers = con.execute(
+        "SELECT f_table_name, f_geometry_column, geometry_type, srid FROM st_geometry_columns "
+        "WHERE f_table_name NOT LIKE 'GDB_%'"
+    ).fetchall()
+    if layer is None:
+        if len(layers) != 1:
+            raise ValueError(f"Geodatabase has layers {[l[0] for l in layers]}; pass layer=")
+        layer = layers[0][0]
+    match = [l for l in layers if l[0].lower() == layer.lower()]
+    if not match:
+        raise ValueError(f"No layer {layer!r} in geodatabase; layers are {[l[0] for l in layers]}")
+    table, geometry_column, geometry_type, srid = match[0]
+    if geometry_type not in _GDB_POLYGON_TYPES:
+        raise ValueError(f"Layer {table!r} is not a polygon layer (ST_Geometry type {geometry_type})")
+
+    definition = con.execute(
+        "SELECT Definition FROM GDB_Items WHERE Name = ? OR Name = ?", (table, f"main.{table}")
+    ).fetchone()[0]
+    reference = {
+        name: float(re.search(f"<{name}>([^<]+)</{name}>", definition).group(1))
+        for name in ("XOrigin", "YOrigin", "XYScale")
+    }
+
+    info = con.execute(f'PRAGMA table_info("{table}")').fetchall()
+    index = f"st_spindex__{table}_{geometry_column}"
+    has_index = con.execute("SELECT 1 FROM sqlite_master WHERE name = ?", (index,)).fetchone() is not None
+    return {
+        "table": table,
+        "geometry_column": geometry_column,
+        "crs": f"EPSG:{srid}",
+        "origin": (reference["XOrigin"], reference["YOrigin"]),
+        "scale": reference["XYScale"],
+        "key": next(name for _, name, _, _, _, pk in info if pk),
+        "index": index if has_index else None,
+        "types": {name: decl.lower().split("(")[0] for _, name, decl, _, _, _ in info if name != geometry_column},
+    }
+
+
+def _st_part_sizes(header, n: int) -> list:
+    """ Point counts of a multipart ST_Geometry, read from the varints before its coordinates """
+    # The header ends with: parts - 1, the first parts - 1 point counts, the
+    # coordinate byte length and six fixed values.
+    for k in range(1, len(header) - 8):
+        sizes = [int(s) for s in header[-7 - k:-7]]
+        if header[-8 - k] == k and sum(sizes) < n:
+            return sizes + [n - sum(sizes)]
+    return [n]
+
+
+def _st_polygon(values, n: int, multipart: bool, origin: tuple, scale: float):
+    """ Shapely (Multi)Polygon from the varints of one ST_Geometry polygon blob """
+    import numpy as np
+    import shapely
+
+    xy = values[-2 * n:].reshape(n, 2).cumsum(axis=0) / scale + origin
+    parts = np.split(xy, np.cumsum(_st_part_sizes(values[:-2 * n], n) if multipart else [n])[:-1])
+    # Every part but the last ends with a separator point at the false origin
+    parts = [part[:-1] for part in parts[:-1]] + parts[-1:]
+
+    # A part can hold several rings; each ring closes on its first point
+    rings = []
+    for part in parts:
+        start = 0
+        while start < len(part):
+            closing = np.flatnonzero((part[start + 1:] == part[start]).all(axis=1))
+            end = start + closing[0] + 2 if len(closing) else len(part)
+            if end - start >= 3:
+                rings.append(shapely.linearrings(part[start:end]))
+            start = end
+    if not rings:
+        return None
+
+    # Exterior rings are counter-clockwise, holes clockwise
+    ccw = shapely.is_ccw(rings)
+    shells = [[ring, []] for ring, is_ccw in zip(rings, ccw) if is_ccw] or [[rings[0], []]]
+    for ring, is_ccw in zip(rings, ccw):
+        if not is_ccw and ring is not shells[0][0]:
+            hole = shapely.Polygon(ring)
+            owner = next((s for s in shells if shapely.Polygon(s[0]).covers(hole)), shells[0])
+            owner[1].append(ring)
+    polygons = [shapely.Polygon(shell, holes) for shell, holes in shells]
+    return polygons[0] if len(polygons) == 1 else shapely.MultiPolygon(polygons)
+
+
+def _decode_st_geometry(blobs: list, origin: tuple, scale: float) -> list:
+    """
+    Decode Esri ST_Geometry polygon blobs.
+
+    A blob is a 10-byte header (magic, point count, flags) followed by signed
+    varints: a variable header, then x/y pairs in integer grid units, the
+    first absolute and the rest as deltas.  All varints of the batch are
+    decoded in one vectorized pass.
+    """
+    import numpy as np
+
+    geoms = [None] * len(blobs)
+    present = [i for i, blob in enumerate(blobs) if blob is not None and len(blob) > 10]
+    if not present:
+        return geoms
+
+    payload = np.frombuffer(b"".join(blobs[i][10:] for i in present), dtype=np.uint8)
+    ends = np.flatnonzero(payload < 0x80)
+    starts = np.r_[0, ends[:-1] + 1]
+    # Byte k of a varint carries 6 value bits (k=0, plus the sign) or 7 bits
+    position = np.arange(len(payload)) - np.repeat(starts, ends - starts + 1)
+    bits = np.where(position == 0, payload & 0x3F, payload & 0x7F).astype(np.int64)
+    values = np.add.reduceat(bits << np.maximum(7 * position - 1, 0), starts)
+    values = np.where(payload[starts] & 0x40, -values, values)
+
+    # Index of the first varint after each blob
+    stops = np.searchsorted(ends, np.cumsum([len(blobs[i]) - 10 for i in present]))
+    first = 0
+    for i, stop in zip(present, stops):
+        n = int.from_bytes(blobs[i][4:8], "little")
+        if n:
+            geoms[i] = _st_polygon(values[first:stop], n, bool(blobs[i][9] & 0x40), origin, scale)
+        first = stop
+    return geoms
+
+
+def _gdb_column_array(values: list, kind: str):
+    """ Arrow array of one geodatabase column, converting 'realdate' Julian days """
+    import numpy as np
+    import pyarrow as pa
+
+    arrow_type = _GDB_ARROW_TYPES.get(kind)
+    if kind == "realdate":
+        days = np.array(values, dtype=float)
+        missing = np.isnan(days)
+        millis = np.round((np.where(missing, _JULIAN_UNIX_EPOCH, days) - _JULIAN_UNIX_EPOCH) * 86_400_000)
+        return pa.array(millis.astype(np.int64), type=pa.timestamp("ms"), mask=missing)
+    return pa.array(values, type=pa.type_for_alias(arrow_type) if arrow_type else None)
+
+
+def iter_geodatabase_batches(
+    path: Path,
+    layer: Optional[str] = None,
+    bbox: Optional[tuple] = None,
+    boundary=None,
+    columns: Optional[list] = None,
+    predicate: str = "intersects",
+    batch_size: int = 65_536,
+):
+    """
+    Stream the features of an Esri mobile geodatabase layer as Arrow batches.
+
+    Candidates are selected through the layer's R-tree spatial index, so only
+    features whose envelope meets `bbox` (or the bounds of `boundary`) are
+    read and decoded; `boundary` then keeps those meeting it exactly.
+
+    Parameters
+    ----------
+    path : Path
+        The .geodatabase file, e.g. data/Parcels_434803130420322328.geodatabase.
+    layer : str, optional
+        Feature table to read (default: the only one in the geodatabase).
+    bbox : tuple, optional
+        (minx, miny, maxx, maxy) in the layer's CRS.
+    boundary : GeoDataFrame, GeoSeries or shapely geometry, optional
+        Area to read, e.g. the Fan District boundary.  Frames are reprojected
+        to the layer's CRS; bare geometries are taken to be in it.
+    columns : list of str, optional
+        Attribute columns to read (default: all).  Pass [] for geometry only.
+    predicate : str, optional
+        'intersects' or 'within' `boundary` (default='intersects').
+    batch_size : int, optional
+        Maximum features per batch (default=65536).
+
+    Yields
+    ------
+    tuple
+        (batch, crs): a pyarrow RecordBatch with WKB geometry in a 'geometry'
+        column, and the layer's CRS as a string.
+    """
+    import sqlite3
+
+    import numpy as np
+    import pyarrow as pa
+    import shapely
+
+    if predicate not in _GDB_PREDICATES:
+        raise ValueError(f"predicate must be one of {_GDB_PREDICATES}, not {predicate!r}")
+
+    con = sqlite3.connect(f"file:{Path(path).resolve()}?mode=ro", uri=True)
+    try:
+        layer_info = _gdb_layer(con, layer)
+        types = layer_info["types"]
+        columns = [c for c in types if c != layer_info["key"]] if columns is None else list(columns)
+        unknown = [c for c in columns if c not in types]
+        if unknown:
+            raise ValueError(f"Layer {layer_info['table']!r} has no columns {unknown}")
+
+        if boundary is not None:
+            if hasattr(boundary, "to_crs"):
+                boundary = boundary.to_crs(layer_info["crs"]).union_all()
+            shapely.prepare(boundary)
+            bbox = bbox or boundary.bounds
+
+        selected = ", ".join(f't."{c}"' for c in [*columns, layer_info["geometry_column"]])
+        query = f'SELECT {selected} FROM "{layer_info["table"]}" t'
+        params = ()
+        if bbox is not None and layer_info["index"]:
+            query += (f' JOIN "{layer_info["index"]}" i ON i.pkid = t."{layer_info["key"]}"'
+                      " WHERE i.minx <= ? AND i.maxx >= ? AND i.miny <= ? AND i.maxy >= ?")
+            minx, miny, maxx, maxy = bbox
+            params = (maxx, minx, maxy, miny)
+
+        cursor = con.execute(query, params)
+        read = kept = 0
+        while rows := cursor.fetchmany(batch_size):
+            values = list(zip(*rows))
+            geoms = np.array(_decode_st_geometry(values[-1], layer_info["origin"], layer_info["scale"]), dtype=object)
+            keep = np.ones(len(rows), dtype=bool)
+            if boundary is not None:
+                keep = getattr(shapely, predicate)(geoms, boundary)
+            elif bbox is not None:
+                keep = shapely.intersects(geoms, shapely.box(*bbox))
+            read, kept = read + len(rows), kept + int(keep.sum())
+            if not keep.any():
+                continue
+
+            indices = np.flatnonzero(keep)
+            arrays = [_gdb_column_array([column[i] for i in indices], types[name])
+                      for name, column in zip(columns, values)]
+            arrays.append(pa.array(shapely.to_wkb(geoms[indices]), type=pa.binary()))
+            yield pa.RecordBatch.from_arrays(arrays, names=[*columns, "geometry"]), layer_info["crs"]
+
+        if not kept:
+            # An empty batch still carries the schema and CRS
+            arrays = [_gdb_column_array([], types[name]) for name in columns] + [pa.array([], type=pa.binary())]
+            yield pa.RecordBatch.from_arrays(arrays, names=[*columns, "geometry"]), layer_info["crs"]
+    finally:
+        con.close()
+    logger.debug(f"Decoded {read} candidate features of {layer_info['table']}, kept {kept}")
+
+
+@profiled()
+def read_geodatabase(
+    path: Path,
+    layer: Optional[str] = None,
+    bbox: Optional[tuple] = None,
+    boundary=None,
+    columns: Optional[list] = None,
+    predicate: str = "intersects",
+):
+    """
+    Read an Esri mobile geodatabase layer into a GeoDataFrame.
+
+    See `iter_geodatabase_batches`; e.g. the Fan parcels are
+    read_geodatabase(path, boundary=fan_boundary, predicate="within").
+
+    Returns
+    -------
+    gpd.GeoDataFrame
+        The selected features in the layer's CRS.
+    """
+    import geopandas as gpd
+    import pyarrow as pa
+
+    batches, crs = [], None
+    for batch, crs in iter_geodatabase_batches(
+        path, layer=layer, bbox=bbox, boundary=boundary, columns=columns, predicate=predicate
+    ):
+        batches.append(batch)
+
+    table = pa.Table.from_batches(batches)
+    geometry = gpd.GeoSeries.from_wkb(table.column("geometry").to_numpy(zero_copy_only=False), crs=crs)
+    return gpd.GeoDataFrame(table.drop_columns(["geometry"]).to_pandas(), geometry=geometry)
+
+
+def _geojson_bounds(coordinates) -> Optional[tuple]:
+    """ (minx, miny, maxx, maxy) of GeoJSON coordinates of any nesting, None if empty """
+    if not coordinates:
+        return None
+    first = coordinates[0]
+    if not isinstance(first, list):
+        return coordinates[0], coordinates[1], coordinates[0], coordinates[1]
+    if not isinstance(first[0], list):
+        xs, ys = [p[0] for p in coordinates], [p[1] for p in coordinates]
+        return min(xs), min(ys), max(xs), max(ys)
+    parts = [b for b in map(_geojson_bounds, coordinates) if b is not None]
+    if not parts:
+        return None
+    minx, miny, maxx, maxy = zip(*parts)
+    return min(minx), min(miny), max(maxx), max(maxy)
+
+
+def _geometry_bounds(geometry: Optional[dict]) -> Optional[tuple]:
+    if not geometry:
+        return None
+    if geometry.get("type") == "GeometryCollection":
+        parts = [b for b in map(_geometry_bounds, geometry.get("geometries", [])) if b is not None]
+        return _geojson_bounds([[b[0], b[1]] for b in parts] + [[b[2], b[3]] for b in parts])
+    return _geojson_bounds(geometry.get("coordinates"))
+
+
+def _iter_geojson_features(path: Path, header: dict, chunk_size: int = GEOJSON_CHUNK_SIZE):
+    """
+    Features of a GeoJSON FeatureCollection, decoded one at a time.
+
+    The file is read in chunks and each feature is parsed with the C scanner
+    behind `json.JSONDecoder.raw_decode`, so only the current chunk and the
+    features a caller keeps are ever in memory.  The CRS named before the
+    'features' array is stored in header['crs'].
+    """
+    decoder = json.JSONDecoder()
+    with open(path, encoding="utf-8-sig") as f:
+        buffer, start = "", None
+        while start is None:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                raise ValueError(f"{path} is not a GeoJSON FeatureCollection")
+            buffer += chunk
+            start = _GEOJSON_FEATURES.search(buffer)
+
+        crs = _GEOJSON_CRS.search(buffer, 0, start.start())
+        header["crs"] = "EPSG:4326" if crs is None or "CRS84" in crs.group(1) else crs.group(1)
+
+        position, exhausted = start.end(), False
+        while True:
+            position = _GEOJSON_SEPARATOR.match(buffer, position).end()
+            if buffer.startswith("]", position):
+                return
+            try:
+                feature, position = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                # The feature runs past the buffer: read on, keeping only its start
+                if exhausted:
+                    raise
+                chunk = f.read(chunk_size)
+                buffer, position, exhausted = buffer[position:] + chunk, 0, not chunk
+                continue
+            yield feature
+
+
+def iter_geojson_batches(
+    path: Path,
+    bbox: Optional[tuple] = None,
+    boundary=None,
+    columns: Optional[list] = None,
+    predicate: str = "intersects",
+    batch_size: int = 10_000,
+):
+    """
+    Stream the features of a GeoJSON file that fall in an area as GeoDataFrames.
+
+    Features are parsed one at a time and rejected on the bounding box of their
+    raw coordinates before any shapely geometry is built, so peak memory
+    follows the size of the output rather than of the (full-city) input.
+    Properties keep their JSON types; unlike `gpd.read_file`, date strings
+    are not converted.
+
+    Parameters
+    ----------
+    path : Path
+        GeoJSON FeatureCollection, e.g. precious/Addresses-2025-05-16.geojson.
+    bbox : tuple, optional
+        (minx, miny, maxx, maxy) in the file's CRS (lon/lat for GeoJSON).
+    boundary : GeoDataFrame, GeoSeries or shapely geometry, optional
+        Area to read, e.g. one civic association.  Frames are reprojected to
+        the file's CRS; bare geometries are taken to be in it.
+    columns : list of str, optional
+        Properties to keep (default: all).
+    predicate : str, optional
+        'intersects' or 'within' `boundary` (default='intersects').
+    batch_size : int, optional
+        Maximum features per batch (default=10000).
+
+    Yields
+    ------
+    gpd.GeoDataFrame
+        Batches of the selected features.  At least one (possibly empty)
+        batch is yielded.
+    """
+    import pandas as pd
+    import geopandas as gpd
+    import shapely
+    from shapely.geometry import shape
+
+    if predicate not in _GDB_PREDICATES:
+        raise ValueError(f"predicate must be one of {_GDB_PREDICATES}, not {predicate!r}")
+
+    header = {}
+    features = _iter_geojson_features(path, header)
+    first = next(features, None)
+    crs = header.get("crs", "EPSG:4326")
+    if boundary is not None:
+        if hasattr(boundary, "to_crs"):
+            boundary = boundary.to_crs(crs).union_all()
+        shapely.prepare(boundary)
+        bbox = bbox or boundary.bounds
+
+    def to_frame(batch):
+        properties = pd.DataFrame.from_records([f.get("properties") or {} for f in batch], columns=columns)
+        geometry = [shape(f["geometry"]) if f.get("geometry") else None for f in batch]
+        gdf = gpd.GeoDataFrame(properties, geometry=gpd.GeoSeries(geometry, crs=crs))
+        if boundary is not None and len(gdf):
+            gdf = gdf[getattr(shapely, predicate)(gdf.geometry.values, boundary)]
+        return gdf
+
+    read = kept = 0
+    batch = []
+    for feature in itertools.chain([first] if first is not None else [], features):
+        read += 1
+        if bbox is not None:
+            bounds = _geometry_bounds(feature.get("geometry"))
+            if bounds is None or bounds[0] > bbox[2] or bounds[2] < bbox[0] or bounds[1] > bbox[3] or bounds[3] < bbox[1]:
+                continue
+        batch.append(feature)
+        if len(batch) == batch_size:
+            gdf = to_frame(batch)
+            kept, batch = kept + len(gdf), []
+            if len(gdf):
+                yield gdf
+
+    gdf = to_frame(batch)
+    logger.debug(f"{Path(path).name}: parsed {read} features, kept {kept + len(gdf)}")
+    if len(gdf) or not kept:
+        yield gdf
+
+
+@profiled()
+def read_geojson(
+    path: Path,
+    bbox: Optional[tuple] = None,
+    boundary=None,
+    columns: Optional[list] = None,
+    predicate: str = "intersects",
+):
+    """
+    Read the features of a GeoJSON file that fall in an area.
+
+    See `iter_geojson_batches`; e.g. the addresses of one civic association are
+    read_geojson(path, boundary=association, predicate="within").
+
+    Returns
+    -------
+    gpd.GeoDataFrame
+        The selected features, in the file's CRS.
+    """
+    import pandas as pd
+
+    batches = list(iter_geojson_batches(path, bbox=bbox, boundary=boundary, columns=columns, predicate=predicate))
+    return pd.concat(batches, ignore_index=True) if len(batches) > 1 else batches[0].reset_index(drop=True)
@@ -0,0 +1,324 @@
+"""
+Offline bulk geocoder against the city Addresses layer
+
+Builds a normalized-address index from an `Addresses` snapshot (see precious/README.md)
+and geocodes whole columns at once:
+
+    1. exact lookup on the normalized full address,
+    2. exact lookup on the normalized base address (unit dropped),
+    3. fuzzy match on the street name, blocked by building number and street
+       direction, for whatever is left.
+
+The index is persisted as Parquet next to the snapshot and reused as long as
+the snapshot's contents don't change.
+"""
+import re
+
+from pathlib import Path
+from typing import Optional, Union
+
+import numpy as np
+import pandas as pd
+import geopandas as gpd
+from loguru import logger
+from rapidfuzz import fuzz, process
+
+from fandu.geo_utils import get_newest_path
+from fandu.cache_utils import (
+    file_fingerprint,
+    combine_fingerprints,
+    snapshot_cache_path,
+    write_fingerprinted_parquet,
+    read_parquet_fingerprint,
+)
+from fandu.profiling import profiled
+
+# Bump when normalization or the index layout changes, so cached indexes are rebuilt.
+GEOCODER_INDEX_VERSION = "2"
+
+# Words mapped to a single canonical token, applied after upper-casing
+GEOCODER_WORD_MAP = {
+    "AVENUE": "AVE", "AV": "AVE",
+    "STREET": "ST", "STR": "ST",
+    "BOULEVARD": "BLVD",
+    "PLACE": "PL",
+    "ALLEY": "AL", "ALY": "AL",
+    "CIRCLE": "CIR",
+    "COURT": "CT",
+    "DRIVE": "DR",
+    "ROAD": "RD",
+    "LANE": "LN",
+    "TERRACE": "TER", "TERR": "TER",
+    "NORTH": "N", "SOUTH": "S", "EAST": "E", "WEST": "W",
+    "APARTMENT": "UNIT", "APT": "UNIT", "STE": "UNIT", "SUITE": "UNIT",
+}
+
+_WORD = re.compile(r"\b(" + "|".join(sorted(GEOCODER_WORD_MAP, key=len, reverse=True)) + r")\b")
+_CITY_STATE_ZIP = re.compile(r"\b(RICHMOND|VIRGINIA|VA)\b|\b\d{5}(-\d{4})?\s*$")
+_PUNCTUATION = re.compile(r"[.,#]")
+_UNIT_SUFFIX = re.compile(r"\s+(UNIT|ROOM|FL|GAR|BSMT|REAR|CARR)\b.*$")
+# Building number (with any 1/2) and street direction, then the street name
+_BLOCK_PREFIX = r"^(\d+(?: 1/2)?)(?: ([NSEW]))?(?= |$)"
+
+GEOCODE_COLUMNS = ["geocode_address", "AddressId", "latitude", "longitude", "match_score", "match_method"]
+
+
+def normalize_geocoder_address(addresses: pd.Series) -> pd.Series:
+    """
+    Normalize a column of free-form addresses into geocoder keys.
+
+    Upper-cases, drops city/state/zip and punctuation, and maps street types,
+    directions and unit words to one canonical token each.
+    For example '1614 1/2 West Grace Street, Apt. 1, Richmond, VA 23220'
+    becomes '1614 1/2 W GRACE ST UNIT 1'.
+    """
+    keys = addresses.fillna("").astype(str).str.upper()
+    keys = keys.str.replace("\u00a0", " ", regex=False).str.replace("½", " 1/2 ", regex=False)
+    keys = keys.str.replace(_PUNCTUATION, " ", regex=True)
+    keys = keys.str.replace(_CITY_STATE_ZIP, " ", regex=True)
+    keys = keys.str.replace(_WORD, lambda m: GEOCODER_WORD_MAP[m.group(1)], regex=True)
+    keys = keys.str.replace(r"\s+", " ", regex=True).str.strip()
+    return keys
+
+
+def _base_keys(keys: pd.Series) -> pd.Series:
+    """Drop the unit part ('... UNIT 2', '... ROOM 1715') from normalized keys."""
+    return keys.str.replace(_UNIT_SUFFIX, "", regex=True)
+
+
+def _blocks(keys: pd.Series) -> pd.Series:
+    """
+    Blocking key for fuzzy matching: the building number and street direction
+    ('201 S'), so '201 S Arthur Ashe Blvd' is never scored against
+    '201 N Arthur Ashe Blvd'.  A key without a direction blocks on the number
+    alone ('1704').
+    """
+    parts = keys.str.extract(_BLOCK_PREFIX, expand=True)
+    return parts[0].str.cat(parts[1], sep=" ", na_rep="").str.rstrip().where(parts[0].notna())
+
+
+def _street_keys(keys: pd.Series) -> pd.Series:
+    """What fuzzy matching scores: the key after the building number and direction."""
+    return keys.str.replace(_BLOCK_PREFIX, "", regex=True).str.strip()
+
+
+class AddressGeocoder:
+    """
+    Geocode addresses against a normalized index of the city Addresses layer.
+
+    Build once with `from_snapshot` (cached) or `from_addresses`, then call
+    `geocode` on a whole column.
+    """
+
+    def __init__(self, index: pd.DataFrame):
+        self.index = index.reset_index(drop=True)
+
+        # Exact lookups: first address per key wins, in stable AddressId order
+        self._by_key = self.index.drop_duplicates("key").set_index("key")
+        # Base lookups only make sense for bases that are themselves an address
+        # ('2100 Hanover Ave') or that have a single unit.
+        base_counts = self.index["base_key"].value_counts()
+        unique_bases = base_counts[base_counts == 1].index
+        base_rows = self.index[
+            (self.index["key"] == self.index["base_key"]) | self.index["base_key"].isin(unique_bases)
+        ]
+        self._by_base = base_rows.drop_duplicates("base_key").set_index("base_key")
+        self._blocks = {block: rows for block, rows in self.index.groupby("block", sort=False)}
+
+    # --- Construction and persistence ---
+
+    @classmethod
+    def from_addresses(
+        cls,
+        addresses: pd.DataFrame,
+        label_col: str = "AddressLabel",
+        id_col: str = "AddressId",
+    ) -> "AddressGeocoder":
+        """
+        Build the index from an Addresses frame.
+
+        Coordinates come from the geometry (reprojected to EPSG:4326) when
+        `addresses` is a GeoDataFrame, otherwise from 'Latitude'/'Longitude'.
+        """
+        if isinstance(addresses, gpd.GeoDataFrame) and addresses.geometry.name in addresses.columns:
+            points = addresses.geometry
+            if addresses.crs is not None and addresses.crs.to_epsg() != 4326:
+                points = points.to_crs(epsg=4326)
+            points = points.representative_point()
+            latitude, longitude = points.y.to_numpy(), points.x.to_numpy()
+        else:
+            latitude = addresses["Latitude"].to_numpy(dtype=float)
+            longitude = addresses["Longitude"].to_numpy(dtype=float)
+
+        index = pd.DataFrame({
+            "AddressId": addresses[id_col].astype(str).to_numpy(),
+            "AddressLabel": addresses[label_col].astype(str).to_numpy(),
+            "latitude": latitude,
+            "longitude": longitude,
+        })
+        index["key"] = normalize_geocoder_address(index["AddressLabel"])
+        index["base_key"] = _base_keys(index["key"])
+        index["block"] = _blocks(index["key"])
+        index["street_key"] = _street_keys(index["key"])
+        index = index[index["key"] != ""].sort_values("AddressId", kind="stable")
+
+        logger.info(f"Built geocoder index: {len(index)} addresses")
+        return cls(index)
+
+    @classmethod
+    def from_snapshot(
+        cls,
+        snapshot_path: Optional[Path] = None,
+        precious_folder: Path = Path("../precious/"),
+        feature: str = "Addresses",
+        ext: str = ".geojson",
+        rebuild: bool = False,
+    ) -> "AddressGeocoder":
+        """
+        Load the geocoder for an Addresses snapshot, building and caching its index
+        the first time.
+
+        Parameters
+        ----------
+        snapshot_path : Path, optional
+            Addresses snapshot (.geojson, .parquet or .csv).  If omitted, the newest
+            `feature` file in `precious_folder` is used.
+        precious_folder : Path, optional
+            Folder searched when `snapshot_path` is omitted (default='../precious/').
+        feature : str, optional
+            Feature name prefix searched for (default='Addresses').
+        ext : str, optional
+            Snapshot extension searched for (default='.geojson').
+        rebuild : bool, optional
+            If True, ignore any cached index.
+
+        Returns
+        -------
+        AddressGeocoder
+        """
+        if snapshot_path is None:
+            snapshot_path = get_newest_path(Path(precious_folder), feature, ext=ext)
+            if snapshot_path is None:
+                raise FileNotFoundError(f"No {feature} snapshot found in {precious_folder}")
+        snapshot_path = Path(snapshot_path)
+
+        cache_path = snapshot_cache_path(snapshot_path, "geocoder")
+        fingerprint = combine_fingerprints([GEOCODER_INDEX_VERSION, file_fingerprint(snapshot_path)])
+
+        if not rebuild and read_parquet_fingerprint(cache_path) == fingerprint:
+            logger.info(f"Loading geocoder index: {cache_path.name}")
+            return cls.load(cache_path)
+
+        logger.info(f"Building geocoder index from {snapshot_path.name}")
+        geocoder = cls.from_addresses(_read_snapshot(snapshot_path))
+        geocoder.save(cache_path, fingerprint)
+        return geocoder
+
+    def save(self, path: Path, fingerprint: str = "") -> None:
+        """Persist the index as Parquet."""
+        write_fingerprinted_parquet(self.index, path, fingerprint)
+
+    @classmethod
+    def load(cls, path: Path) -> "AddressGeocoder":
+        """Load an index written by `save`."""
+        return cls(pd.read_parquet(path))
+
+    # --- Geocoding ---
+
+    @profiled()
+    def geocode(
+        self,
+        addresses: Union[pd.Series, list],
+        threshold: float = 85,
+        fuzzy: bool = True,
+    ) -> pd.DataFrame:
+        """
+        Geocode a column of addresses in one call.
+
+        Parameters
+        ----------
+        addresses : pd.Series or list
+            Free-form addresses, e.g. '1825 Grove Ave., Richmond, VA'.
+        threshold : float, optional
+            Minimum fuzzy score (0-100) to accept a fuzzy match (default=85).
+        fuzzy : bool, optional
+            If False, only exact and base lookups are tried.
+
+        Returns
+        -------
+        pd.DataFrame
+            Aligned with `addresses`, with columns 'geocode_address' (the matched
+            city AddressLabel), 'AddressId', 'latitude', 'longitude',
+            'match_score' (100 for exact) and 'match_method'
+            ('exact', 'base', 'fuzzy' or None when unmatched).
+        """
+        addresses = pd.Series(addresses) if not isinstance(addresses, pd.Series) else addresses
+        keys = normalize_geocoder_address(addresses).reset_index(drop=True)
+
+        result = pd.DataFrame({
+            "geocode_address": pd.Series([None] * len(keys), dtype=object),
+            "AddressId": pd.Series([None] * len(keys), dtype=object),
+            "latitude": np.nan,
+            "longitude": np.nan,
+            "match_score": np.nan,
+            "match_method": pd.Series([None] * len(keys), dtype=object),
+        })
+
+        def fill(positions, matched, method, score):
+            result.loc[positions, "geocode_address"] = matched["AddressLabel"].to_numpy()
+            result.loc[positions, "AddressId"] = matched["AddressId"].to_numpy()
+            result.loc[positions, "latitude"] = matched["latitude"].to_numpy()
+            result.loc[positions, "longitude"] = matched["longitude"].to_numpy()
+            result.loc[positions, "match_score"] = score
+            result.loc[positions, "match_method"] = method
+
+        # 1. Exact lookup on the full key
+        exact = keys.isin(self._by_key.index) & (keys != "")
+        fill(exact, self._by_key.loc[keys[exact]], "exact", 100.0)
+
+        # 2. Exact lookup on the base key
+        remaining = ~exact & (keys != "")
+        base_keys = _base_keys(keys)
+        base = remaining & base_keys.isin(self._by_base.index)
+        fill(base, self._by_base.loc[base_keys[base]], "base", 100.0)
+
+        # 3. Fuzzy match on the street name within number-and-direction blocks
+        remaining &= ~base
+        fuzzy_count = 0
+        if fuzzy and remaining.any():
+            pending = pd.DataFrame({"key": _street_keys(keys[remaining]), "block": _blocks(keys[remaining])})
+            for block, queries in pending.dropna(subset=["block"]).groupby("block", sort=False):
+                candidates = self._blocks.get(block)
+                if candidates is None:
+                    continue
+                scores = process.cdist(
+                    queries["key"].tolist(),
+                    candidates["street_key"].tolist(),
+                    scorer=fuzz.token_sort_ratio,
+                    dtype=np.float32,
+                )
+                best = scores.argmax(axis=1)
+                best_scores = scores[np.arange(len(best)), best]
+                accepted = best_scores >= threshold
+                if accepted.any():
+                    fill(queries.index[accepted], candidates.iloc[best[accepted]], "fuzzy",
+                         best_scores[accepted].astype(float))
+                    fuzzy_count += int(accepted.sum())
+
+        logger.info(f"Geocoded {int(exact.sum() + base.sum()) + fuzzy_count} of {len(keys)} addresses "
+                    f"(exact={int(exact.sum())}, base={int(base.sum())}, fuzzy={fuzzy_count})")
+        result.index = addresses.index
+        return result
+
+
+def _read_snapshot(path: Path) -> pd.DataFrame:
+    """Read an Addresses snapshot in any of the formats kept in precious/."""
+    suffix = path.suffix.lower()
+    if suffix == ".parquet":
+        try:
+            return gpd.read_parquet(path)
+        except ValueError:
+            return pd.read_parquet(path)
+    if suffix == ".csv":
+        return pd.read_csv(path, dtype={"AddressId": str})
+    return gpd.read_file(path)
@@ -0,0 +1,361 @@
+"""
+Golden join of Fan parcels, addresses and FDA contacts
+
+The join runs in three stages, each cached as Parquet in a cache folder:
+
+    contacts        - collapse bundle members into their bundle administrator
+    parcel_address  - full outer spatial join of single parcels and addresses
+    golden          - full outer join of the two, zone assignment, final ordering
+
+Each stage is fingerprinted by the contents of its inputs, and only stages whose
+inputs changed are rebuilt.  A new contacts export re-runs the contact collapse
+and the final join, but not the spatial join.
+"""
+from pathlib import Path
+from typing import Optional
+
+import duckdb
+from loguru import logger
+
+from fandu.cache_utils import (
+    file_fingerprint,
+    combine_fingerprints,
+    load_manifest,
+    save_manifest,
+    is_stage_current,
+)
+from fandu.profiling import stage
+
+# Bump when the SQL of a stage changes, so cached outputs are rebuilt.
+GOLDEN_STAGE_VERSION = "1"
+
+CONTACTS_STAGE_SQL = """
+CREATE OR REPLACE TABLE contacts AS SELECT * FROM read_parquet('{contacts}');
+
+ALTER TABLE contacts ADD COLUMN IF NOT EXISTS member_names TEXT;
+ALTER TABLE contacts ADD COLUMN IF NOT EXISTS member_cnt INT DEFAULT 1;
+
+-- Compute the bundle summaries (members + admin) and update bundle administrators
+UPDATE contacts AS admin
+SET
+    member_names = summary.member_names,
+    member_cnt = summary.member_cnt
+FROM (
+    SELECT
+        bundleid,
+        STRING_AGG(firstname || ' ' || lastname, ', ' ORDER BY id) AS member_names,
+        COUNT(*) AS member_cnt
+    FROM contacts
+    WHERE memberrole IN ('Bundle Administrator', 'Bundle member')
+    GROUP BY bundleid
+) AS summary
+WHERE admin.bundleid = summary.bundleid
+  AND admin.memberrole = 'Bundle Administrator';
+
+-- Ensure individuals with no bundleid have member_cnt = 1
+UPDATE contacts
+SET member_cnt = 1
+WHERE bundleid IS NULL;
+
+-- Delete bundle member rows (keep admins and non-bundled)
+DELETE FROM contacts
+WHERE memberrole = 'Bundle member'
+  AND bundleid IS NOT NULL;
+
+UPDATE contacts
+  SET member_names = firstname || ' ' || lastname
+  WHERE member_names IS NULL;
+
+COPY (SELECT * FROM contacts ORDER BY id) TO '{output}' (FORMAT PARQUET);
+"""
+
+PARCEL_ADDRESS_STAGE_SQL = """
+CREATE OR REPLACE TABLE addresses AS SELECT * FROM read_parquet('{addresses}');
+CREATE OR REPLACE TABLE parcels AS SELECT * FROM read_parquet('{parcels}');
+
+CREATE OR REPLACE TABLE parcel_address_join AS
+SELECT
+    p.RepresentativeParcelID,
+    p.LandUse,
+    p.PropertyClass,
+    p.geometry AS parcel_geom,
+    p.ParcelGeometryID,
+    p.FanUse,
+    p.FanUseType,
+    p.FanUseOrder,
+    a.AddressId,
+    a.AddressLabel,
+    a.BuildingNumber,
+    a.StreetDirection,
+    a.StreetName,
+    a.StreetType,
+    a.ExtensionWithUnit,
+    a.UnitType,
+    a.UnitValue,
+    a.ZipCode,
+    a.Mailable AS AddressMailable,
+    a.AddressBase,
+    a.AddressExtension,
+    a.AddressStreet,
+    a.geometry AS addr_geom,
+    a.AddressGeometryID
+FROM parcels p
+  FULL OUTER JOIN addresses a
+  ON ST_Within(a.geometry, p.geometry);
+
+COPY (
+    SELECT * FROM parcel_address_join
+    ORDER BY RepresentativeParcelID, AddressId
+) TO '{output}' (FORMAT PARQUET);
+"""
+
+GOLDEN_JOIN_SQL = """
+CREATE OR REPLACE TABLE golden_join AS
+SELECT
+  a.*,
+  b.*
+FROM
+  read_parquet('{parcel_address}') a
+  FULL OUTER JOIN read_parquet('{contacts}') b ON (a.AddressLabel = b.AddressLabel);
+
+UPDATE golden_join
+  SET AddressNote = 'Valid Fan Address'
+  WHERE Member IS NULL;
+
+ALTER TABLE golden_join ADD COLUMN zone TEXT DEFAULT NULL;
+
+UPDATE golden_join
+SET zone = CASE
+    WHEN AddressStreet ILIKE '%FLOYD%' then 'Floyd Zone'
+    when AddressStreet ILIKE '%W MAIN%'
+       OR AddressStreet in ('S Cathedral Pl','Cathedral Pl')
+       or AddressStreet in ('S Addison St','S Allen Ave','S Brunswick St','S Granby St',
+        'S Harvie St','S Lombardy St','S Meadow St','S Morris St','S Mulberry St',
+        'S Plum St','S Robinson St','S Rowland St','S Shields Ave',
+        'S Stafford Ave','S Vine St','Sidewalk Al') THEN 'W Main Zone'
+    WHEN AddressStreet ILIKE '%GROVE%'
+      or AddressStreet ILIKE '%HORSE BARN%' THEN 'Grove Zone'
+    WHEN AddressStreet ILIKE '%HANOVER%'
+      or AddressStreet ILIKE '%HARVIE PL%'
+      or AddressStreet ILIKE '%MADUMBIE LANE%'
+      OR AddressStreet ILIKE '%TROUVAILLE%' THEN 'Hanover Zone'
+    WHEN AddressStreet ILIKE '%KENSINGTON%' THEN 'Kensington Zone'
+    WHEN AddressStreet ILIKE '%MONUMENT%'
+      OR AddressStreet ILIKE '%STUART CIR%'
+      OR AddressStreet ILIKE '%W FRANKLIN%' THEN 'Monument / W Franklin Zone'
+    WHEN AddressStreet ILIKE '%PARK%' THEN 'Park Zone'
+    WHEN AddressStreet ILIKE '%STUART AVE%' THEN 'Stuart Zone'
+    WHEN AddressStreet ILIKE '%WEST AVE%'
+      or AddressStreet ILIKE '%BOYD%' THEN 'West Ave Zone'
+    WHEN AddressStreet ILIKE '%W GRACE%'
+      or addressStreet ILIKE '%SHAFER%' THEN 'W Grace Zone'
+    WHEN AddressStreet ILIKE '%W BROAD%' then 'W Broad Zone'
+    WHEN REPLACE(AddressStreet, '\u00A0', ' ') ILIKE 'N %' or
+      AddressStreet in ('Allison St','Boyd St','Ryland St','Randolph St','Strawberry St') THEN CASE
+      when try_cast(split_part(BuildingNumber,' ',1) as integer) < 100 then 'Floyd Zone'
+      when try_cast(split_part(BuildingNumber,' ',1) as integer) < 200 then 'Grove Zone'
+      when try_cast(split_part(BuildingNumber,' ',1) as integer) < 300 then 'Hanover Zone'
+      when try_cast(split_part(BuildingNumber,' ',1) as integer) < 400 then 'Stuart Zone'
+      when try_cast(split_part(BuildingNumber,' ',1) as integer) < 500 then 'Floyd Zone'
+      when try_cast(split_part(BuildingNumber,' ',1) as integer) < 600 then 'Park Zone'
+      when try_cast(split_part(BuildingNumber,' ',1) as integer) < 700 then 'Monument / W Franklin Zone'
+      when try_cast(split_part(BuildingNumber,' ',1) as integer) < 900 then 'W Grace Zone'
+      when try_cast(split_part(BuildingNumber,' ',1) as integer) >= 900 then 'W Broad Zone'
+      else 'uncaught value' end
+    else 'zNo Address'
+END;
+
+COPY (
+    SELECT * FROM golden_join
+    ORDER BY RepresentativeParcelID, AddressId, id
+) TO '{golden_join}' (FORMAT PARQUET);
+"""
+
+GOLDEN_VIEW_SQL = """
+CREATE OR REPLACE VIEW golden_view AS
+SELECT
+  email,
+  lastName || ', ' || firstname as SortableName,
+  firstname || ' ' || lastname as FullName,
+  firstname,
+  lastname,
+  AddressLabel,
+  City,
+  State,
+  Zip_norm,
+  BuildingNumber,
+  AddressStreet,
+  AddressBase,
+  member,
+  membershiplevelName,
+  member_cnt,
+  member_names,
+  FanUse,
+  FanUseOrder,
+  FanUseType,
+  LandUse,
+  PropertyClass,
+  AddressMailable,
+  AddressNote,
+  zone,
+  case
+    when member='True' then 'Current member'
+    when member='False' and len(membershiplevelname)>0 then 'Expired member'
+    when member='False' and (len(membershiplevelname)=0 or membershiplevelname is NULL) then 'Contact'
+    else 'Not in FDA DB' end as FanMemberStatus,
+  (case when Member='True' then 1 else 0 end ) as Stats_Member_cnt,
+  (case when Member<>'True' and Member is not NULL then 1 else 0 end) as Stats_Contacts_cnt,
+  (case when Member is NULL and LandUse is not NULL then 1 else 0 end ) as Stats_Addr_not_in_FDA,
+  (case when Member is NULL and LandUse is NULL then 1 else 0 end ) as Stats_Addr_not_in_Fan,
+  id as UserId,
+  RepresentativeParcelId,
+  ParcelGeometryID,
+  AddressId,
+  AddressGeometryId
+FROM
+  read_parquet('{golden_join}');
+
+COPY (
+    SELECT * FROM golden_view
+    ORDER BY
+      case when Member='True' then 1
+        when Member='False' then 10
+        else 99 end,
+      Member,
+      case when not (membershiplevelname is NULL or membershiplevelname='') then 1 else 10 end,
+      AddressStreet,
+      AddressLabel,
+      SortableName,
+      UserId,
+      RepresentativeParcelId,
+      AddressId
+) TO '{output}' (FORMAT PARQUET);
+"""
+
+
+def _sql_path(path: Path) -> str:
+    """Quote a path for use inside a DuckDB SQL string literal."""
+    return Path(path).resolve().as_posix().replace("'", "''")
+
+
+def _connect(spatial: bool = False) -> duckdb.DuckDBPyConnection:
+    con = duckdb.connect()
+    if spatial:
+        con.execute("INSTALL spatial; LOAD spatial;")
+    return con
+
+
+def build_golden(
+    contacts_path: Path = Path("Contacts_in_fda.parquet"),
+    parcels_path: Path = Path("Single_parcels_in_fan.parquet"),
+    addresses_path: Path = Path("Addresses_in_fan.parquet"),
+    output_path: Path = Path("Golden_fan.parquet"),
+    cache_dir: Optional[Path] = None,
+    force: bool = False,
+) -> dict:
+    """
+    Build the golden parcel/address/contact join, rebuilding only stale stages.
+
+    Parameters
+    ----------
+    contacts_path : Path
+        Cleaned contacts Parquet (output of 02_Contacts_in_fan.qmd).
+    parcels_path : Path
+        Single parcels Parquet (output of 01_Parcels_in_fan.qmd).
+    addresses_path : Path
+        Addresses Parquet (output of 01_Addresses_in_fan.qmd).
+    output_path : Path
+        Destination of the final, stably ordered golden Parquet.
+    cache_dir : Path, optional
+        Folder for intermediate stage outputs and the manifest
+        (default='.golden_cache' next to `output_path`).
+    force : bool, optional
+        If True, rebuild every stage regardless of fingerprints.
+
+    Returns
+    -------
+    dict
+        Stage name -> {"path": Path, "rebuilt": bool}.  Includes the intermediate
+        'contacts', 'parcel_address' and 'golden_join' tables and the final 'golden'.
+    """
+    contacts_path = Path(contacts_path)
+    parcels_path = Path(parcels_path)
+    addresses_path = Path(addresses_path)
+    output_path = Path(output_path)
+    cache_dir = Path(cache_dir) if cache_dir is not None else output_path.parent / ".golden_cache"
+    cache_dir.mkdir(parents=True, exist_ok=True)
+
+    for p in (contacts_path, parcels_path, addresses_path):
+        if not p.is_file():
+            raise FileNotFoundError(f"File not found: {p}")
+
+    manifest_path = cache_dir / "manifest.json"
+    manifest = {} if force else load_manifest(manifest_path)
+
+    contacts_out = cache_dir / "contacts_collapsed.parquet"
+    parcel_address_out = cache_dir / "parcel_address_join.parquet"
+    golden_join_out = cache_dir / "golden_join.parquet"
+
+    contacts_fp = combine_fingerprints([GOLDEN_STAGE_VERSION, file_fingerprint(contacts_path)])
+    parcel_address_fp = combine_fingerprints([
+        GOLDEN_STAGE_VERSION,
+        file_fingerprint(parcels_path),
+        file_fingerprint(addresses_path),
+    ])
+    golden_fp = combine_fingerprints([GOLDEN_STAGE_VERSION, contacts_fp, parcel_address_fp])
+
+    results = {}
+
+    # --- Stage 1: contact bundle collapse ---
+    rebuilt = not is_stage_current(manifest, "contacts", contacts_fp, [contacts_out])
+    if rebuilt:
+        logger.info(f"Collapsing bundle members: {contacts_path.name}")
+        with stage("golden.contacts"), _connect() as con:
+            con.execute(CONTACTS_STAGE_SQL.format(
+                contacts=_sql_path(contacts_path),
+                output=_sql_path(contacts_out),
+            ))
+        manifest["contacts"] = {"fingerprint": contacts_fp}
+        save_manifest(manifest_path, manifest)
+    else:
+        logger.info("Contacts stage is current, skipping")
+    results["contacts"] = {"path": contacts_out, "rebuilt": rebuilt}
+
+    # --- Stage 2: parcel/address spatial join ---
+    rebuilt = not is_stage_current(manifest, "parcel_address", parcel_address_fp, [parcel_address_out])
+    if rebuilt:
+        logger.info(f"Joining {parcels_path.name} and {addresses_path.name}")
+        with stage("golden.parcel_address"), _connect(spatial=True) as con:
+            con.execute(PARCEL_ADDRESS_STAGE_SQL.format(
+                parcels=_sql_path(parcels_path),
+                addresses=_sql_path(addresses_path),
+                output=_sql_path(parcel_address_out),
+            ))
+        manifest["parcel_address"] = {"fingerprint": parcel_address_fp}
+        save_manifest(manifest_path, manifest)
+    else:
+        logger.info("Parcel/address stage is current, skipping")
+    results["parcel_address"] = {"path": parcel_address_out, "rebuilt": rebuilt}
+
+    # --- Stage 3: golden join, zones and final ordering ---
+    rebuilt = not is_stage_current(manifest, "golden", golden_fp, [golden_join_out, output_path])
+    if rebuilt:
+        logger.info(f"Writing golden join: {output_path}")
+        with stage("golden.golden"), _connect() as con:
+            con.execute(GOLDEN_JOIN_SQL.format(
+                parcel_address=_sql_path(parcel_address_out),
+                contacts=_sql_path(contacts_out),
+                golden_join=_sql_path(golden_join_out),
+            ))
+            con.execute(GOLDEN_VIEW_SQL.format(
+                golden_join=_sql_path(golden_join_out),
+                output=_sql_path(output_path),
+            ))
+        manifest["golden"] = {"fingerprint": golden_fp}
+        save_manifest(manifest_path, manifest)
+    else:
+        logger.info("Golden stage is current, skipping")
+    results["golden_join"] = {"path": golden_join_out, "rebuilt": rebuilt}
+    results["golden"] = {"path": output_path, "rebuilt": rebuilt}
+
+    return results
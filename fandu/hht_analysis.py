@@ -1,11 +1,174 @@
 """
 """
 
+import numpy as np
 import pandas as pd
+from functools import cached_property
+
+from loguru import logger
+
+from fandu.aggregates import AggregateStore
+from fandu.dtype_utils import optimize_dtypes
+
+EARTH_RADIUS_M = 6_371_008.8
+
+
+def haversine(lat1, lon1, lat2, lon2):
+    """Great-circle distance in meters between points in degrees (broadcasting)."""
+    lat1, lon1, lat2, lon2 = (np.radians(v) for v in (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+
+
+def walking_distances(latitude: np.ndarray, longitude: np.ndarray) -> np.ndarray:
+    """
+    Pairwise haversine distances in meters.
+
+    Parameters
+    ----------
+    latitude, longitude : np.ndarray
+        Degrees, shape (..., n); leading axes are independent batches.
+
+    Returns
+    -------
+    np.ndarray
+        Shape (..., n, n).
+    """
+    return haversine(latitude[..., :, None], longitude[..., :, None], latitude[..., None, :], longitude[..., None, :])
+
+
+def _nearest_neighbor_routes(dist: np.ndarray, sizes: np.ndarray, start: np.ndarray) -> np.ndarray:
+    """
+    Nearest-neighbor orderings of a padded batch of stops.
+
+    Node 0 of every group is a free start (zero distance to all stops), nodes
+    1..size are the stops and the rest is padding, so the route is
+    [0, stops..., padding...]. All groups advance one stop per step.
+    """
+    n_groups, m = dist.shape[:2]
+    groups = np.arange(n_groups)
+    order = np.zeros((n_groups, m), dtype=np.intp)
+    order[:, 1] = start
+    visited = np.zeros((n_groups, m), dtype=bool)
+    visited[:, 0] = True
+    visited[groups, start] = True
+    visited[np.arange(m)[None, :] > sizes[:, None]] = True
+
+    for step in range(2, m):
+        remaining = ~visited.all(axis=1)
+        candidates = np.where(visited, np.inf, dist[groups, order[:, step - 1]])
+        nearest = np.argmin(candidates, axis=1)
+        # Groups with every stop placed take their padding in order
+        order[:, step] = np.where(remaining, nearest, step)
+        visited[groups, order[:, step]] = True
+    return order
+
+
+def _two_opt_routes(dist: np.ndarray, order: np.ndarray, sizes: np.ndarray, max_iterations: int = 1000) -> np.ndarray:
+    """
+    Improve open routes with best-improvement 2-opt, all groups at once.
+
+    Each iteration scores reversing every stop segment order[i..j] of every
+    group and applies the best improving reversal per group, until none
+    improves. The trailing padding node (zero distance to everything) makes
+    the last stop a free end.
+    """
+    n_groups, m = order.shape
+    groups = np.arange(n_groups)[:, None]
+    i, j = np.triu_indices(m - 1, k=1)
+    keep = i >= 1
+    i, j = i[keep], j[keep]
+    valid = j[None, :] <= sizes[:, None]
+    positions = np.arange(m)
+
+    for _ in range(max_iterations):
+        a, b, c, d = order[:, i - 1], order[:, i], order[:, j], order[:, j + 1]
+        gain = (dist[groups, a, c] + dist[groups, b, d]) - (dist[groups, a, b] + dist[groups, c, d])
+        gain = np.where(valid, gain, 0.0)
+        best = np.argmin(gain, axis=1)
+        improving = gain[groups[:, 0], best] < -1e-9
+        if not improving.any():
+            break
+        lo = np.where(improving, i[best], 0)[:, None]
+        hi = np.where(improving, j[best], -1)[:, None]
+        inside = (positions >= lo) & (positions <= hi)
+        order = np.take_along_axis(order, np.where(inside, lo + hi - positions, positions), axis=1)
+    return order
+
+
+def plan_routes(stops: pd.DataFrame, by=("year", "tour"), max_iterations: int = 1000) -> pd.DataFrame:
+    """
+    Order the stops of each group into a short walking route.
+
+    Groups are padded to the size of the largest and solved together: a
+    haversine distance matrix per group, a nearest-neighbor route from the
+    stop farthest from the group's center, then 2-opt.
+
+    Parameters
+    ----------
+    stops : pd.DataFrame
+        Rows with 'latitude' and 'longitude' (no missing values) and the `by`
+        columns; rows missing a `by` value belong to no route and are dropped.
+    by : sequence of str, optional
+        Columns identifying a route (default=('year', 'tour')).
+    max_iterations : int, optional
+        Cap on 2-opt passes (default=1000).
+
+    Returns
+    -------
+    pd.DataFrame
+        `stops` sorted by group and route order, with 'stop' (1-based) and
+        'leg_m' (meters from the previous stop, 0 for the first).
+    """
+    by = list(by)
+    keyed = stops[by].notna().all(axis=1)
+    if not keyed.all():
+        logger.warning(f"plan_routes: dropped {int((~keyed).sum())} stops missing {' or '.join(by)}")
+        stops = stops[keyed]
+    group_id = stops.groupby(by, sort=True, observed=True).ngroup().to_numpy()
+    n_groups = int(group_id.max()) + 1 if len(stops) else 0
+    if n_groups == 0:
+        return stops.assign(stop=pd.Series(dtype="int64"), leg_m=pd.Series(dtype="float64"))
+
+    # Slot of each stop in its group: node 0 is the free start, stops from 1
+    rows = np.argsort(group_id, kind="stable")
+    sizes = np.bincount(group_id, minlength=n_groups)
+    first = np.concatenate([[0], np.cumsum(sizes)[:-1]])
+    slot = np.empty(len(stops), dtype=np.intp)
+    slot[rows] = np.arange(len(stops)) - np.repeat(first, sizes) + 1
+    m = sizes.max() + 2
+
+    lat = np.zeros((n_groups, m))
+    lon = np.zeros((n_groups, m))
+    lat[group_id, slot] = stops["latitude"].to_numpy(dtype=float)
+    lon[group_id, slot] = stops["longitude"].to_numpy(dtype=float)
+    dist = walking_distances(lat, lon)
+    is_stop = np.zeros((n_groups, m), dtype=bool)
+    is_stop[group_id, slot] = True
+    dist[~(is_stop[:, :, None] & is_stop[:, None, :])] = 0.0
+
+    # Start from the stop farthest from the group's center, a natural end of a walk
+    center_lat = lat.sum(axis=1) / sizes
+    center_lon = lon.sum(axis=1) / sizes
+    from_center = np.where(is_stop, haversine(lat, lon, center_lat[:, None], center_lon[:, None]), -1.0)
+    start = np.argmax(from_center, axis=1)
+
+    order = _nearest_neighbor_routes(dist, sizes, start)
+    order = _two_opt_routes(dist, order, sizes, max_iterations=max_iterations)
+
+    # Route position of every slot; the free start at position 0 makes stops 1-based
+    rank = np.empty_like(order)
+    np.put_along_axis(rank, order, np.broadcast_to(np.arange(m), order.shape), axis=1)
+    stop = rank[group_id, slot]
+    previous = order[group_id, stop - 1]
+
+    routes = stops.assign(stop=stop, leg_m=dist[group_id, previous, slot])
+    return routes.sort_values(by + ["stop"], kind="stable")
+
 
 class HHTAnalysis:
     def __init__(self, csv_path):
-        self.df = pd.read_csv(csv_path)
+        self.df = optimize_dtypes(pd.read_csv(csv_path), "HHT")
     
     @property
     def geocoded(self):
@@ -30,7 +193,7 @@ class HHTAnalysis:
         # Group by year and collapse the notes (you can change join separator if needed)
         result = (
             filtered
-            .groupby("year", as_index=False)
+            .groupby("year", as_index=False, observed=True)
             .agg({"notes": lambda x: " | ".join(x.dropna().unique())})
         )
 
@@ -46,7 +209,7 @@ class HHTAnalysis:
         # Group by year, count addresses, extract informal_chairs and notes
         result = (
             valid
-            .groupby("year", as_index=False)
+            .groupby("year", as_index=False, observed=True)
             .agg(
                 informal_chairs=("informal_chairs", lambda x: next((v for v in x if pd.notna(v) and str(v).strip() != ""), None)),
                 address_count=("clean_address", "count"),
@@ -77,7 +240,7 @@ class HHTAnalysis:
         # Group by chair name and count unique years
         summary = (
             combined
-            .groupby(["chair", "chair_first_name", "chair_last_name"], as_index=False)
+            .groupby(["chair", "chair_first_name", "chair_last_name"], as_index=False, observed=True)
             .agg(year_count=("year", lambda x: x.nunique()))
             .sort_values(by=["year_count", "chair_last_name", "chair_first_name"], ascending=[False, True, True])
         )
@@ -94,7 +257,7 @@ class HHTAnalysis:
 
         # Group by combined street name and count
         summary = (
-            df.groupby("full_street", as_index=False)
+            df.groupby("full_street", as_index=False, observed=True)
             .size()
             .rename(columns={"size": "count"})
             .sort_values("count", ascending=False)
@@ -103,24 +266,35 @@ class HHTAnalysis:
         return summary.reset_index(drop=True)
 
 
+    @cached_property
+    def routes(self):
+        """Geocoded homes in walking order per year and tour (see `plan_routes`)."""
+        return plan_routes(self.geocoded, by=["year", "tour"]).reset_index(drop=True)
+
     @property
-    def number_summary(self):
-        df = self.df
+    def route_summary(self):
+        # One row per year and tour: homes and walking distance of the planned route
+        summary = (
+            self.routes
+            .groupby(["year", "tour"], as_index=False, observed=True)
+            .agg(homes=("stop", "size"), route_m=("leg_m", "sum"), longest_leg_m=("leg_m", "max"))
+            .sort_values(["year", "tour"])
+        )
 
-        # Ensure street_number is numeric and drop nulls
-        valid = df[df["street_number"].notna()]
-        valid = valid.copy()
-        valid["street_number"] = valid["street_number"].astype(int)
+        return summary.reset_index(drop=True)
 
-        # Calculate block (floor to nearest 100)
-        valid["block"] = (valid["street_number"] // 100) * 100
-        valid["block_label"] = valid["block"].astype(str) + " block"
+    @cached_property
+    def aggregates(self):
+        """Homes per hundred block, block, street and map cell (see `fandu.aggregates`)."""
+        return AggregateStore.build(self.df, "HHT")
 
-        # Group by block label and count
+    @property
+    def number_summary(self):
+        # Homes per hundred block (street number floored to 100), from the precomputed aggregates
         summary = (
-            valid.groupby("block_label", as_index=False)
-            .size()
-            .rename(columns={"size": "count"})
+            self.aggregates.query("block_number")
+            .rename_axis("block_label")
+            .reset_index()
             .sort_values("count", ascending=False)
         )
 
@@ -137,7 +311,7 @@ class HHTAnalysis:
         # Group by address and place_name, count occurrences
         summary = (
             valid
-            .groupby(["address", "place_name", "street_name", "street_number"], as_index=False)
+            .groupby(["address", "place_name", "street_name", "street_number"], as_index=False, observed=True)
             .size()
             .rename(columns={"size": "count"})
             .sort_values(by=["count", "street_name", "street_number"], ascending=[False, True, True])
@@ -154,7 +328,7 @@ class HHTAnalysis:
 
         summary = (
             valid
-            .groupby("place_name", as_index=False)
+            .groupby("place_name", as_index=False, observed=True)
             .size()
             .rename(columns={"size": "count"})
             .sort_values("count", ascending=False)
@@ -0,0 +1,414 @@
+"""
+Point-to-parcel lookup with a persistent spatial index
+
+Answers "which parcel, address and civic association is at this coordinate?"
+without loading the layers into a notebook.
+
+`build_lookup_index` projects each layer once and writes, per layer:
+
+    <layer>.parquet          attributes (+ WKB geometry for polygon layers)
+    <layer>.bounds.npy       feature bounding boxes (projected)
+    <layer>.offsets.npy      uniform-grid cell -> slice of <layer>.ids.npy
+    <layer>.ids.npy          feature ids, grouped by grid cell
+    <layer>.xy.npy           point coordinates (point layers only)
+
+`PointLookup` memory-maps the .npy arrays, so opening the index is cheap and a
+batch query is a handful of numpy operations plus one vectorized
+point-in-polygon test over the few candidates in each point's grid cell.
+"""
+import json
+
+from pathlib import Path
+from typing import Optional
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+import numpy as np
+import pandas as pd
+import geopandas as gpd
+import shapely
+from loguru import logger
+from pyproj import Transformer
+
+from fandu.geo_utils import get_newest_path, FAN_PROJECTED_CRS
+from fandu.cache_utils import file_fingerprint, combine_fingerprints, load_manifest, save_manifest
+from fandu.profiling import profiled
+
+# Bump when the index layout changes, so existing indexes are rebuilt.
+LOOKUP_INDEX_VERSION = "1"
+
+# Projected CRS for the index (meters)
+LOOKUP_CRS = FAN_PROJECTED_CRS
+
+# Layer name -> precious/ feature prefix, attribute columns kept, and layer kind
+LOOKUP_LAYERS = {
+    "parcels": {
+        "feature": "Parcels",
+        "columns": ["ParcelID", "PIN", "LandUse", "PropertyClass"],
+        "kind": "polygon",
+    },
+    "addresses": {
+        "feature": "Addresses",
+        "columns": ["AddressId", "AddressLabel"],
+        "kind": "point",
+    },
+    "civic_associations": {
+        "feature": "Civic_Associations",
+        "columns": ["Name"],
+        "kind": "polygon",
+    },
+}
+
+
+def _grid_cells(bounds: np.ndarray, x0: float, y0: float, cell_size: float, ncols: int, nrows: int):
+    """Column/row ranges of the grid cells covered by each bounding box."""
+    ix0 = np.clip(np.floor((bounds[:, 0] - x0) / cell_size).astype(np.int64), 0, ncols - 1)
+    iy0 = np.clip(np.floor((bounds[:, 1] - y0) / cell_size).astype(np.int64), 0, nrows - 1)
+    ix1 = np.clip(np.floor((bounds[:, 2] - x0) / cell_size).astype(np.int64), 0, ncols - 1)
+    iy1 = np.clip(np.floor((bounds[:, 3] - y0) / cell_size).astype(np.int64), 0, nrows - 1)
+    return ix0, iy0, ix1, iy1
+
+
+def _build_grid(bounds: np.ndarray, cell_size: float):
+    """
+    Bucket features into a uniform grid by bounding box.
+
+    Returns
+    -------
+    tuple
+        (grid parameters dict, offsets array, ids array) where the ids of the
+        features touching cell `c` are `ids[offsets[c]:offsets[c + 1]]`.
+    """
+    x0, y0 = float(bounds[:, 0].min()), float(bounds[:, 1].min())
+    ncols = int(np.floor((bounds[:, 2].max() - x0) / cell_size)) + 1
+    nrows = int(np.floor((bounds[:, 3].max() - y0) / cell_size)) + 1
+    ix0, iy0, ix1, iy1 = _grid_cells(bounds, x0, y0, cell_size, ncols, nrows)
+
+    # Expand each feature's cell rectangle into (cell, feature) pairs
+    widths = ix1 - ix0 + 1
+    counts = widths * (iy1 - iy0 + 1)
+    feature = np.repeat(np.arange(len(bounds), dtype=np.int64), counts)
+    local = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    cell_x = ix0[feature] + local % widths[feature]
+    cell_y = iy0[feature] + local // widths[feature]
+    cells = cell_y * ncols + cell_x
+
+    order = np.argsort(cells, kind="stable")
+    ids = feature[order].astype(np.int32)
+    offsets = np.searchsorted(cells[order], np.arange(ncols * nrows + 1)).astype(np.int64)
+
+    grid = {"x0": x0, "y0": y0, "cell_size": cell_size, "ncols": ncols, "nrows": nrows}
+    return grid, offsets, ids
+
+
+def _index_config(cell_size: float) -> str:
+    """Fingerprint of the index layout and settings, independent of the snapshot."""
+    return combine_fingerprints([LOOKUP_INDEX_VERSION, cell_size])
+
+
+def _source_stat(source: Path) -> list:
+    """Resolved path, size and mtime of a snapshot, as stored in the manifest."""
+    stat = source.stat()
+    return [str(source.resolve()), stat.st_size, stat.st_mtime_ns]
+
+
+@profiled()
+def build_lookup_index(
+    index_dir: Optional[Path] = None,
+    precious_folder: Path = Path("../precious/"),
+    sources: Optional[dict] = None,
+    cell_size: float = 100.0,
+    force: bool = False,
+) -> Path:
+    """
+    Build (or refresh) the persistent lookup index over Parcels, Addresses and
+    Civic_Associations.
+
+    Parameters
+    ----------
+    index_dir : Path, optional
+        Folder for the index files (default=`precious_folder`/.cache/lookup).
+    precious_folder : Path, optional
+        Folder holding the dated layer snapshots (default='../precious/').
+    sources : dict, optional
+        Layer name -> snapshot path, overriding the newest file in `precious_folder`.
+    cell_size : float, optional
+        Grid cell size in meters (default=100).  Also the maximum distance used
+        when snapping to the nearest address point.
+    force : bool, optional
+        If True, rebuild every layer even if its snapshot is unchanged.  Otherwise
+        a layer whose snapshot has the same path, size and mtime as when it was
+        indexed is kept without re-hashing, and one whose contents hash the same
+        is kept as well; only stale layers are rebuilt.
+
+    Returns
+    -------
+    Path
+        The index folder.
+    """
+    precious_folder = Path(precious_folder)
+    index_dir = Path(index_dir) if index_dir is not None else precious_folder / ".cache" / "lookup"
+    index_dir.mkdir(parents=True, exist_ok=True)
+    sources = sources or {}
+
+    manifest_path = index_dir / "manifest.json"
+    manifest = {} if force else load_manifest(manifest_path)
+
+    for layer, spec in LOOKUP_LAYERS.items():
+        source = sources.get(layer) or get_newest_path(precious_folder, spec["feature"])
+        if source is None:
+            raise FileNotFoundError(f"No {spec['feature']} snapshot found in {precious_folder}")
+        source = Path(source)
+
+        entry = manifest.get(layer, {})
+        stat = _source_stat(source)
+        built = entry.get("config") == _index_config(cell_size) and (index_dir / f"{layer}.parquet").is_file()
+
+        # An unchanged snapshot (same path, size and mtime) is trusted without
+        # re-hashing it, so a warm call only stats the files
+        if built and entry.get("source_stat") == stat:
+            logger.debug(f"Lookup index for {layer} is current, skipping")
+            continue
+
+        fingerprint = combine_fingerprints([LOOKUP_INDEX_VERSION, cell_size, file_fingerprint(source)])
+        if built and entry.get("fingerprint") == fingerprint:
+            logger.info(f"Lookup index for {layer} is current (snapshot touched), skipping")
+            entry["source_stat"] = stat
+            save_manifest(manifest_path, manifest)
+            continue
+
+        logger.info(f"Indexing {layer} from {source.name}")
+        gdf = gpd.read_file(source) if source.suffix.lower() != ".parquet" else gpd.read_parquet(source)
+        gdf = gdf[gdf.geometry.notna() & ~gdf.geometry.is_empty].to_crs(LOOKUP_CRS).reset_index(drop=True)
+
+        columns = [c for c in spec["columns"] if c in gdf.columns]
+        attributes = pd.DataFrame(gdf[columns]).astype("string")
+
+        geoms = gdf.geometry.values
+        if spec["kind"] == "point":
+            geoms = shapely.centroid(geoms)
+            np.save(index_dir / f"{layer}.xy.npy", shapely.get_coordinates(geoms))
+        else:
+            attributes["geometry"] = shapely.to_wkb(geoms)
+        attributes.to_parquet(index_dir / f"{layer}.parquet", index=False)
+
+        bounds = shapely.bounds(geoms)
+        grid, offsets, ids = _build_grid(bounds, cell_size)
+        np.save(index_dir / f"{layer}.bounds.npy", bounds)
+        np.save(index_dir / f"{layer}.offsets.npy", offsets)
+        np.save(index_dir / f"{layer}.ids.npy", ids)
+
+        manifest[layer] = {
+            "fingerprint": fingerprint,
+            "config": _index_config(cell_size),
+            "source": source.name,
+            "source_stat": stat,
+            "kind": spec["kind"],
+            "count": len(gdf),
+            "grid": grid,
+        }
+        save_manifest(manifest_path, manifest)
+
+    return index_dir
+
+
+class _LayerIndex:
+    """One memory-mapped layer of the lookup index."""
+
+    def __init__(self, index_dir: Path, layer: str, info: dict):
+        self.layer = layer
+        self.kind = info["kind"]
+        self.grid = info["grid"]
+        self.bounds = np.load(index_dir / f"{layer}.bounds.npy", mmap_mode="r")
+        self.offsets = np.load(index_dir / f"{layer}.offsets.npy", mmap_mode="r")
+        self.ids = np.load(index_dir / f"{layer}.ids.npy", mmap_mode="r")
+
+        table = pd.read_parquet(index_dir / f"{layer}.parquet")
+        if self.kind == "point":
+            self.xy = np.load(index_dir / f"{layer}.xy.npy", mmap_mode="r")
+            self.geoms = None
+        else:
+            self.geoms = shapely.from_wkb(table.pop("geometry").to_numpy())
+            shapely.prepare(self.geoms)
+        self.attributes = table
+        # Attributes are stored as strings; blanks come back as pd.NA, which
+        # json.dumps (serve_lookup) can't encode, so hold them as None
+        self._columns = {
+            c: table[c].astype(object).where(table[c].notna(), None).to_numpy() for c in table.columns
+        }
+
+    def _candidates(self, x: np.ndarray, y: np.ndarray, dx: int = 0, dy: int = 0):
+        """(point index, feature id) pairs for the grid cell at offset (dx, dy) from each point."""
+        g = self.grid
+        ix = np.floor((x - g["x0"]) / g["cell_size"]).astype(np.int64) + dx
+        iy = np.floor((y - g["y0"]) / g["cell_size"]).astype(np.int64) + dy
+        inside = (ix >= 0) & (ix < g["ncols"]) & (iy >= 0) & (iy < g["nrows"])
+        points = np.flatnonzero(inside)
+        cells = iy[points] * g["ncols"] + ix[points]
+
+        start = self.offsets[cells]
+        counts = self.offsets[cells + 1] - start
+        point_idx = np.repeat(points, counts)
+        slots = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts) + np.repeat(start, counts)
+        return point_idx, np.asarray(self.ids[slots], dtype=np.int64)
+
+    def query(self, x: np.ndarray, y: np.ndarray, max_distance: Optional[float] = None) -> np.ndarray:
+        """
+        Feature id per point (-1 if none).  Polygon layers return the first
+        feature containing the point; point layers the nearest point within
+        `max_distance` (default: one grid cell).
+        """
+        result = np.full(len(x), -1, dtype=np.int64)
+        if len(x) == 0:
+            return result
+
+        if self.kind == "polygon":
+            point_idx, feature = self._candidates(x, y)
+            b = self.bounds[feature]
+            px, py = x[point_idx], y[point_idx]
+            in_box = (px >= b[:, 0]) & (px <= b[:, 2]) & (py >= b[:, 1]) & (py <= b[:, 3])
+            point_idx, feature = point_idx[in_box], feature[in_box]
+            hit = shapely.contains_xy(self.geoms[feature], x[point_idx], y[point_idx])
+            point_idx, feature = point_idx[hit], feature[hit]
+            # First (lowest id) containing feature per point
+            order = np.lexsort((feature, point_idx))
+            point_idx, feature = point_idx[order], feature[order]
+            first = np.unique(point_idx, return_index=True)[1]
+            result[point_idx[first]] = feature[first]
+            return result
+
+        # Point layer: search the 3x3 block of cells around each point
+        max_distance = self.grid["cell_size"] if max_distance is None else min(max_distance, self.grid["cell_size"])
+        best = np.full(len(x), np.inf)
+        for dx in (-1, 0, 1):
+            for dy in (-1, 0, 1):
+                point_idx, feature = self._candidates(x, y, dx, dy)
+                xy = self.xy[feature]
+                dist = np.hypot(xy[:, 0] - x[point_idx], xy[:, 1] - y[point_idx])
+                closer = dist < best[point_idx]
+                point_idx, feature, dist = point_idx[closer], feature[closer], dist[closer]
+                # Keep the closest candidate per point from this cell
+                order = np.lexsort((dist, point_idx))
+                point_idx, feature, dist = point_idx[order], feature[order], dist[order]
+                first = np.unique(point_idx, return_index=True)[1]
+                best[point_idx[first]] = dist[first]
+                result[point_idx[first]] = feature[first]
+        result[best > max_distance] = -1
+        return result
+
+    def values(self, ids: np.ndarray) -> dict:
+        """Attribute columns for `ids` (None where id is -1)."""
+        found = ids >= 0
+        out = {}
+        for column, values in self._columns.items():
+            col = np.full(len(ids), None, dtype=object)
+            col[found] = values[ids[found]]
+            out[column] = col
+        return out
+
+
+class PointLookup:
+    """
+    Answer point queries against an index written by `build_lookup_index`.
+
+    Examples
+    --------
+    >>> lookup = PointLookup(build_lookup_index())
+    >>> lookup.lookup(-77.4634, 37.5507)
+    {'parcels.ParcelID': ..., 'parcels.PIN': 'W0000814001', ..., 'addresses.AddressLabel': '1827 Grove Ave',
+     'civic_associations.Name': 'Fan District Association'}
+    """
+
+    def __init__(self, index_dir: Path):
+        index_dir = Path(index_dir)
+        manifest = load_manifest(index_dir / "manifest.json")
+        if not manifest:
+            raise FileNotFoundError(f"No lookup index found in {index_dir}; run build_lookup_index first")
+        self.layers = {layer: _LayerIndex(index_dir, layer, info) for layer, info in manifest.items()}
+        self._to_index_crs = Transformer.from_crs("EPSG:4326", LOOKUP_CRS, always_xy=True)
+
+    def _query(self, lon, lat, max_distance: Optional[float] = None) -> dict:
+        x, y = self._to_index_crs.transform(np.asarray(lon, dtype=float), np.asarray(lat, dtype=float))
+        x, y = np.atleast_1d(x), np.atleast_1d(y)
+        columns = {}
+        for layer, index in self.layers.items():
+            ids = index.query(x, y, max_distance=max_distance)
+            for column, values in index.values(ids).items():
+                columns[f"{layer}.{column}"] = values
+        return columns
+
+    def lookup(self, lon: float, lat: float, max_distance: Optional[float] = None) -> dict:
+        """
+        Look up one WGS84 coordinate.
+
+        Returns
+        -------
+        dict
+            '<layer>.<column>' -> value (None where nothing matched).
+        """
+        return {k: v[0] for k, v in self._query([lon], [lat], max_distance).items()}
+
+    @profiled()
+    def lookup_many(self, lon, lat, max_distance: Optional[float] = None) -> pd.DataFrame:
+        """
+        Look up arrays of WGS84 coordinates in one call.
+
+        Returns
+        -------
+        pd.DataFrame
+            One row per point, one '<layer>.<column>' column per indexed attribute.
+        """
+        return pd.DataFrame(self._query(lon, lat, max_distance))
+
+
+def serve_lookup(lookup: PointLookup, host: str = "127.0.0.1", port: int = 8765) -> None:
+    """
+    Serve `lookup` over a small local HTTP API (blocks until interrupted).
+
+        GET  /lookup?lon=-77.46&lat=37.55     -> JSON object
+        POST /lookup  {"lon": [...], "lat": [...]}  -> JSON list of objects
+    """
+
+    class Handler(BaseHTTPRequestHandler):
+        def _reply(self, status, payload):
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.send_header("Access-Control-Allow-Origin", "*")
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            if url.path != "/lookup":
+                return self._reply(404, {"error": "not found"})
+            params = parse_qs(url.query)
+            try:
+                lon, lat = float(params["lon"][0]), float(params["lat"][0])
+            except (KeyError, ValueError):
+                return self._reply(400, {"error": "lon and lat are required numbers"})
+            self._reply(200, lookup.lookup(lon, lat))
+
+        def do_POST(self):
+            if urlparse(self.path).path != "/lookup":
+                return self._reply(404, {"error": "not found"})
+            try:
+                length = int(self.headers.get("Content-Length", 0))
+                body = json.loads(self.rfile.read(length) or b"{}")
+                result = lookup.lookup_many(body["lon"], body["lat"])
+            except (KeyError, ValueError, TypeError):
+                return self._reply(400, {"error": "body must be {\"lon\": [...], \"lat\": [...]}"})
+            self._reply(200, result.astype(object).where(result.notna(), None).to_dict(orient="records"))
+
+        def log_message(self, format, *args):
+            logger.debug(format % args)
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    logger.info(f"Serving lookups on http://{host}:{port}/lookup")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
@@ -3,12 +3,25 @@
 
 """
 
+import hashlib
+
 from pathlib import Path
+import numpy as np
 import pandas as pd
 import geopandas as gpd
 import folium
+from branca.element import MacroElement
+from jinja2 import Template
 from shapely.geometry import mapping
-from typing import Tuple, Optional
+from typing import Tuple, Optional, Sequence
+
+from fandu.geo_utils import to_crs_cached
+
+# Class breaks per (column, scheme, k, classifier options, values digest)
+_class_breaks: dict = {}
+
+# Base style of choropleth features; the fill color comes from the feature
+CHOROPLETH_STYLE = {"color": "#666666", "weight": 0.5, "fillOpacity": 0.7}
 
 def get_boundary_map(
     boundary_path: Path,
@@ -44,7 +57,7 @@ def get_boundary_map(
 
     # --- Load and project ---
     boundaries: gpd.GeoDataFrame = gpd.read_file(boundary_path)
-    border_shape: gpd.GeoDataFrame = boundaries.to_crs(epsg=4326)
+    border_shape: gpd.GeoDataFrame = to_crs_cached(boundaries, "EPSG:4326", boundary_path)
 
     # --- Optional filtering by name ---
     if boundary_name is not None:
@@ -102,3 +115,196 @@ def get_boundary_map(
     boundary_layer.add_to( m )
     
     return m, boundary_layer, border_shape
+
+
+def class_breaks(values: pd.Series, scheme: str = "Quantiles", k: int = 5, **classifier_kwargs) -> np.ndarray:
+    """
+    Upper bounds of the mapclassify classes of `values`, computed once per
+    column, scheme, k and data.
+
+    Parameters
+    ----------
+    values : pd.Series
+        Numeric values; missing values are ignored.
+    scheme : str, optional
+        mapclassify scheme, e.g. 'Quantiles', 'NaturalBreaks', 'UserDefined' (default='Quantiles').
+    k : int, optional
+        Number of classes (default=5).
+    **classifier_kwargs
+        Passed to `mapclassify.classify` (e.g. bins=[...] for 'UserDefined').
+
+    Returns
+    -------
+    np.ndarray
+        Ascending class upper bounds; the last is the maximum value.
+    """
+    present = pd.to_numeric(values, errors="coerce").dropna().to_numpy(dtype=float)
+    digest = hashlib.sha256(present.tobytes()).hexdigest()
+    key = (values.name, scheme.lower(), k, repr(sorted(classifier_kwargs.items())), digest)
+    if key not in _class_breaks:
+        import mapclassify
+
+        classifier = mapclassify.classify(present, scheme, k=k, **classifier_kwargs)
+        _class_breaks[key] = np.asarray(classifier.bins, dtype=float)
+    return _class_breaks[key]
+
+
+def class_colors(n: int, cmap: str = "YlOrRd") -> list[str]:
+    """`n` hex colors spread over a matplotlib colormap."""
+    from matplotlib import colormaps
+    from matplotlib.colors import to_hex
+
+    return [to_hex(c) for c in colormaps[cmap](np.linspace(0, 1, n))]
+
+
+def classify_column(
+    gdf: gpd.GeoDataFrame,
+    column: str,
+    scheme: str = "Quantiles",
+    k: int = 5,
+    cmap: str = "YlOrRd",
+    colors: Optional[Sequence[str]] = None,
+    missing_color: str = "#ffffff",
+    **classifier_kwargs,
+) -> tuple[gpd.GeoDataFrame, np.ndarray, list[str]]:
+    """
+    Add the class index and fill color of `column` as '<column>_class' and '<column>_fill'.
+
+    Values are placed in the cached `class_breaks` with a binary search, so
+    restyling a layer never refits the classifier.
+
+    Parameters
+    ----------
+    gdf : gpd.GeoDataFrame
+        Layer to classify.
+    column : str
+        Numeric column to classify.
+    scheme, k, **classifier_kwargs
+        See `class_breaks`.
+    cmap : str, optional
+        Matplotlib colormap for the classes (default='YlOrRd').
+    colors : sequence of str, optional
+        Explicit class colors instead of `cmap`, one per class.
+    missing_color : str, optional
+        Fill of missing values (default='#ffffff'); their class is -1.
+
+    Returns
+    -------
+    tuple
+        (copy of `gdf` with the two columns, class breaks, class colors)
+    """
+    breaks = class_breaks(gdf[column], scheme, k, **classifier_kwargs)
+    colors = list(colors) if colors is not None else class_colors(len(breaks), cmap)
+    if len(colors) != len(breaks):
+        raise ValueError(f"Expected {len(breaks)} colors for {column}, got {len(colors)}")
+
+    values = pd.to_numeric(gdf[column], errors="coerce").to_numpy(dtype=float)
+    missing = np.isnan(values)
+    classes = np.minimum(np.searchsorted(breaks, values, side="left"), len(breaks) - 1)
+    classes = np.where(missing, -1, classes).astype(np.int8)
+
+    palette = np.array(colors + [missing_color], dtype=object)
+    gdf = gdf.copy()
+    gdf[f"{column}_class"] = classes
+    gdf[f"{column}_fill"] = palette[classes]
+    return gdf, breaks, colors
+
+
+class _PropertyStyle(MacroElement):
+    """Style a GeoJson layer in the browser from a fill color stored on each feature."""
+
+    _template = Template("""
+        {% macro script(this, kwargs) %}
+        {{ this._parent.get_name() }}.setStyle(function(feature) {
+            return Object.assign({{ this.base_style|tojson }}, {fillColor: feature.properties[{{ this.fill_property|tojson }}]});
+        });
+        {% endmacro %}
+    """)
+
+    def __init__(self, fill_property: str, base_style: dict):
+        super().__init__()
+        self._name = "PropertyStyle"
+        self.fill_property = fill_property
+        self.base_style = base_style
+
+
+def add_choropleth(
+    m: folium.Map,
+    gdf: gpd.GeoDataFrame,
+    column: str,
+    scheme: str = "Quantiles",
+    k: int = 5,
+    cmap: str = "YlOrRd",
+    colors: Optional[Sequence[str]] = None,
+    name: Optional[str] = None,
+    tooltip: Optional[Sequence[str]] = None,
+    aliases: Optional[Sequence[str]] = None,
+    style: Optional[dict] = None,
+    legend: bool = True,
+    **classifier_kwargs,
+) -> folium.GeoJson:
+    """
+    Add a classified choropleth of `column` to a Folium map.
+
+    Unlike a `style_function`, which Folium calls in Python for every feature
+    when the map is serialized, the fill color is precomputed by
+    `classify_column` and looked up per feature by the browser. Only the
+    geometry, `column`, its class/fill columns and the tooltip fields are
+    embedded.
+
+    Parameters
+    ----------
+    m : folium.Map
+        Map (or feature group) to add the layer to.
+    gdf : gpd.GeoDataFrame
+        Layer to draw; reprojected to EPSG:4326 if needed.
+    column : str
+        Numeric column to classify.
+    scheme, k, cmap, colors, **classifier_kwargs
+        See `classify_column`.
+    name : str, optional
+        Layer name (default: `column`).
+    tooltip : sequence of str, optional
+        Columns shown on hover (default: `column`).
+    aliases : sequence of str, optional
+        Tooltip labels for `tooltip`.
+    style : dict, optional
+        Leaflet style overrides of `CHOROPLETH_STYLE`.
+    legend : bool, optional
+        If True (default), add a step legend of the classes to `m`.
+
+    Returns
+    -------
+    folium.GeoJson
+        The added layer.
+    """
+    import branca.colormap as cm
+
+    classified, breaks, colors = classify_column(gdf, column, scheme, k, cmap, colors, **classifier_kwargs)
+    fields = list(tooltip) if tooltip is not None else [column]
+    keep = list(dict.fromkeys(fields + [column, f"{column}_class", f"{column}_fill", classified.geometry.name]))
+    layer_data = classified[keep].copy()
+    if layer_data.crs is not None and not layer_data.crs.equals("EPSG:4326"):
+        layer_data = layer_data.to_crs("EPSG:4326")
+    for col in fields:
+        if pd.api.types.is_datetime64_any_dtype(layer_data[col]):
+            layer_data[col] = layer_data[col].astype(str)
+
+    layer = folium.GeoJson(
+        layer_data,
+        name=name or column,
+        tooltip=folium.GeoJsonTooltip(fields=fields, aliases=list(aliases) if aliases else fields),
+    )
+    layer.add_child(_PropertyStyle(f"{column}_fill", {**CHOROPLETH_STYLE, **(style or {})}))
+    layer.add_to(m)
+
+    if legend and len(breaks):
+        # Open-ended user bins (np.inf) end the legend at the largest value
+        values = pd.to_numeric(gdf[column], errors="coerce")
+        finite = breaks[np.isfinite(breaks)]
+        vmin = min(float(values.min()), float(finite.min()) if len(finite) else float(values.min()))
+        vmax = max(float(values.max()), float(finite.max()) if len(finite) else float(values.max()))
+        index = [vmin] + [float(b) if np.isfinite(b) else vmax for b in breaks]
+        legend_map = cm.StepColormap(colors, index=index, vmin=index[0], vmax=index[-1], caption=name or column)
+        legend_map.add_to(m)
+    return layer
@@ -0,0 +1,405 @@
+"""
+Per-association parcel and address outputs for every civic association
+
+The 01_* reports build Parcels_in_fan / Addresses_in_fan for the Fan District
+Association only.  `build_associations` produces the same layers for any (or
+every) association in Civic_Associations:
+
+    <output_dir>/<association_slug>/Parcels.parquet   (+ Parcels.csv without geometry)
+    <output_dir>/<association_slug>/Addresses.parquet
+    <output_dir>/summary.csv
+
+The city layers are read and reprojected once, every feature is assigned to
+its associations with one spatial-index query, and the layers are written as
+uncompressed Arrow IPC files that the worker processes memory-map; each worker
+only takes (and decodes the geometry of) the rows of its association.
+`build_association` is the single-neighborhood flow, used as the baseline
+when comparing.
+"""
+import re
+import time
+import tempfile
+
+from pathlib import Path
+from typing import Optional, Sequence
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+import geopandas as gpd
+import pyarrow as pa
+import shapely
+from loguru import logger
+
+from fandu.geo_utils import get_newest_path, to_crs_cached
+from fandu.profiling import profiled
+
+BOUNDARY_FEATURE = "Civic_Associations"
+
+# Layers cut to each association
+CITY_LAYERS = ("Parcels", "Addresses")
+
+# Columns dropped on load, and after the join, as in the 01_* reports
+_LOAD_DROPS = ["OBJECTID", "CreatedBy", "CreatedDate", "EditBy", "EditDate"]
+_JOIN_DROPS = ["GlobalID", "MaskedOwner", "AdoptionDate", "ChangeDate", "Shape__Area", "Shape__Length"]
+
+# Boundary columns added to each feature, as gpd.sjoin does
+BOUNDARY_COLUMNS = ["ID", "Name"]
+
+_FAN_USE = {
+    "Single Family": "FanResidential",
+    "Multi-Family": "FanResidential",
+    "Duplex (2 Family)": "FanResidential",
+    "Commercial": "FanBusiness",
+    "Industrial": "FanOther",
+    "Office": "FanBusiness",
+    "Institutional": "FanOther",
+    "Mixed-Use": "FanMixedUse",
+}
+_FAN_USE_ORDER = {
+    "FanResidential": 1,
+    "FanBusiness": 10,
+    "FanMixedUse": 20,
+    "FanSchools": 30,
+    "FanChurches": 40,
+    "FanUniversity": 50,
+    "FanOther": 99,
+}
+_OTHER_CLASSES = "vacant|parking|common|garage|storage|tower|space"
+
+
+def association_slug(name: str) -> str:
+    """Folder name for an association, e.g. 'Fan District Association' -> 'fan_district_association'."""
+    return re.sub(r"[^0-9a-z]+", "_", str(name).lower()).strip("_") or "unnamed"
+
+
+def prepare_parcels(gdf: gpd.GeoDataFrame, owner_zips: Optional[Sequence[str]] = None) -> gpd.GeoDataFrame:
+    """
+    Add the OwnerOccupied, SharedGeometry, FanUse, FanUseType, FanUseOrder and
+    ParcelGeometryID columns built in 01_Parcels_in_fan.qmd.
+
+    Parameters
+    ----------
+    gdf : gpd.GeoDataFrame
+        Parcels cut to one association.
+    owner_zips : sequence of str, optional
+        Mailing ZIP codes that count as owner occupied (the Fan report uses
+        ['23220']).  None accepts any Richmond, VA mailing address.
+    """
+    gdf = gdf.copy()
+    mail_address = gdf["MailAddress"].astype(str)
+    building_no = gdf["AsrLocationBldgNo"].astype(str)
+    owner = pd.Series([a.startswith(b) for a, b in zip(mail_address, building_no)], index=gdf.index, dtype=bool)
+    owner &= gdf["MailCity"].astype(str).str.upper().eq("RICHMOND")
+    owner &= gdf["MailState"].astype(str).str.upper().eq("VA")
+    if owner_zips is not None:
+        owner &= gdf["MailZip"].astype(str).isin(list(owner_zips))
+    gdf["OwnerOccupied"] = owner.astype(int)
+
+    property_class = gdf["PropertyClass"].fillna("")
+    gdf.loc[property_class.str.contains("Commercial", case=False), "LandUse"] = "Commercial"
+    gdf.loc[property_class.str.contains("Condo", case=False), "LandUse"] = "Multi-Family"
+
+    gdf["SharedGeometry"] = gdf.duplicated(subset="geometry", keep=False).astype(int)
+
+    gdf["FanUse"] = gdf["LandUse"].map(_FAN_USE).fillna("FanOther")
+    other = property_class.str.contains(_OTHER_CLASSES, case=False)
+    gdf.loc[other, "FanUse"] = "FanOther"
+    gdf.loc[property_class.eq("B University"), "FanUse"] = "FanUniversity"
+    gdf.loc[property_class.eq("B Educational"), "FanUse"] = "FanSchools"
+    gdf.loc[property_class.eq("B Religious/Church/Synagogue"), "FanUse"] = "FanChurches"
+
+    gdf["FanUseType"] = "FanIgnore"
+    gdf.loc[(gdf["OwnerOccupied"] == 1) & (gdf["Mailable"] == 1), "FanUseType"] = "FanOwner"
+    gdf.loc[(gdf["OwnerOccupied"] == 0) & (gdf["Mailable"] == 1), "FanUseType"] = "FanRental"
+    gdf.loc[other, "FanUseType"] = "FanIgnore"
+
+    gdf["FanUseOrder"] = gdf["FanUse"].map(_FAN_USE_ORDER).fillna(99)
+
+    gdf["ParcelGeometryID"] = pd.factorize(shapely.to_wkt(gdf.geometry.values))[0] + 50000
+    gdf["Shared_ParcelGeometry_Cnt"] = gdf.groupby("ParcelGeometryID")["ParcelGeometryID"].transform("count")
+    return gdf
+
+
+def prepare_addresses(gdf: gpd.GeoDataFrame) -> gpd.GeoDataFrame:
+    """
+    Clean address labels and add the AddressBase, AddressExtension,
+    AddressStreet, Shared_* and AddressGeometryID columns built in
+    01_Addresses_in_fan.qmd (without its Fan-specific ZIP and label fixes).
+    """
+    gdf = gdf.copy()
+    for column in gdf.columns:
+        if gdf[column].dtype == object and column != gdf.geometry.name:
+            gdf[column] = gdf[column].str.strip().str.replace(r"\s+", " ", regex=True)
+
+    gdf["AddressLabel"] = (
+        gdf["AddressLabel"].astype(str)
+        .str.replace("\u00A0", " ", regex=False)
+        .str.replace(r"[\x00-\x1F\x7F-\x9F]", "", regex=True)
+        .str.replace(r"\s+", " ", regex=True)
+        .str.strip()
+    )
+    gdf["HasDoubleSpaces"] = gdf["AddressLabel"].str.contains(r"\s{2,}")
+    gdf["AddressLen"] = gdf["AddressLabel"].str.len()
+
+    def joined(columns):
+        return (
+            gdf[columns].fillna("").astype(str).agg(" ".join, axis=1)
+            .str.replace(r"\s+", " ", regex=True).str.strip()
+        )
+
+    gdf["AddressBase"] = joined(["BuildingNumber", "StreetDirection", "StreetName", "StreetType"])
+    unit_type = gdf["UnitType"].where(~gdf["UnitType"].isin(["", "None"]))
+    gdf["AddressExtension"] = (
+        pd.concat([unit_type, gdf["UnitValue"]], axis=1).fillna("").astype(str)
+        .agg(" ".join, axis=1).str.strip()
+    )
+
+    extension = gdf["AddressExtension"].str.len()
+    with_unit = gdf["ExtensionWithUnit"].fillna("").str.len()
+    gdf.loc[(extension == 0) & (with_unit > 0), "AddressExtension"] = gdf["ExtensionWithUnit"]
+    gdf.loc[(with_unit == 0) & (extension > 0), "ExtensionWithUnit"] = gdf["AddressExtension"]
+
+    rear = gdf["AddressLabel"].str.contains("REAR APT", case=False, na=False)
+    gdf.loc[rear, "AddressLabel"] = gdf.loc[rear, "AddressLabel"].str.replace("REAR APT", "APT", case=False, regex=False).str.strip()
+    gdf.loc[rear, "ExtensionWithUnit"] = gdf.loc[rear, "AddressExtension"]
+
+    gdf["AddressStreet"] = joined(["StreetDirection", "StreetName", "StreetType"])
+    gdf["Shared_AddressBase_Cnt"] = gdf.groupby("AddressBase")["AddressBase"].transform("count")
+    gdf["AddressGeometryID"] = pd.factorize(shapely.to_wkt(gdf.geometry.values))[0] + 10000
+    gdf["Shared_AddressGeometry_Cnt"] = gdf.groupby("AddressGeometryID")["AddressGeometryID"].transform("count")
+    return gdf
+
+
+def _read_layer(path: Path) -> gpd.GeoDataFrame:
+    path = Path(path)
+    gdf = gpd.read_parquet(path) if path.suffix.lower() == ".parquet" else gpd.read_file(path)
+    return gdf.drop(columns=_LOAD_DROPS, errors="ignore")
+
+
+def _layer_paths(precious_folder: Path, ext: str) -> dict:
+    paths = {}
+    for feature in (BOUNDARY_FEATURE,) + CITY_LAYERS:
+        path = get_newest_path(Path(precious_folder), feature, ext=".geojson" if feature == BOUNDARY_FEATURE else ext)
+        if path is None:
+            raise FileNotFoundError(f"No {feature} snapshot found in {precious_folder}")
+        paths[feature] = path
+    return paths
+
+
+def _select_boundaries(boundaries: gpd.GeoDataFrame, names: Optional[Sequence[str]]) -> gpd.GeoDataFrame:
+    if not names:
+        return boundaries
+    missing = sorted(set(names) - set(boundaries["Name"]))
+    if missing:
+        raise ValueError(f"Unknown civic association(s): {', '.join(missing)}")
+    return boundaries[boundaries["Name"].isin(names)]
+
+
+def _finish_association(name: str, layers: dict, output_dir: Path, owner_zips) -> dict:
+    """Prepare one association's layers, write them and return its summary row."""
+    start = time.perf_counter()
+    folder = Path(output_dir) / association_slug(name)
+    folder.mkdir(parents=True, exist_ok=True)
+    row = {"association": name, "folder": folder.name}
+    for feature, gdf in layers.items():
+        gdf = gdf.drop(columns=_JOIN_DROPS, errors="ignore")
+        if len(gdf):
+            gdf = prepare_parcels(gdf, owner_zips) if feature == "Parcels" else prepare_addresses(gdf)
+        gdf.to_parquet(folder / f"{feature}.parquet", engine="pyarrow")
+        if feature == "Parcels":
+            pd.DataFrame(gdf.drop(columns=gdf.geometry.name)).to_csv(folder / "Parcels.csv", index=False)
+            row["owner_occupied"] = int((gdf.get("FanUseType") == "FanOwner").sum()) if len(gdf) else 0
+            row["rentals"] = int((gdf.get("FanUseType") == "FanRental").sum()) if len(gdf) else 0
+        row[feature.lower()] = len(gdf)
+    row["seconds"] = round(time.perf_counter() - start, 3)
+    return row
+
+
+def _with_boundary(gdf: gpd.GeoDataFrame, boundary: pd.Series) -> gpd.GeoDataFrame:
+    gdf = gdf.drop(columns=BOUNDARY_COLUMNS, errors="ignore")
+    for column in BOUNDARY_COLUMNS:
+        if column in boundary:
+            gdf[column] = boundary[column]
+    return gdf
+
+
+@profiled()
+def build_association(
+    name: str,
+    precious_folder: Path = Path("../precious/"),
+    output_dir: Path = Path("neighborhoods"),
+    ext: str = ".geojson",
+    owner_zips: Optional[Sequence[str]] = None,
+) -> dict:
+    """
+    Build one association's outputs the way the 01_* reports do: read the
+    snapshots, reproject, `gpd.sjoin(..., predicate="within")` and prepare.
+
+    Returns
+    -------
+    dict
+        The association's summary row (see `build_associations`).
+    """
+    paths = _layer_paths(precious_folder, ext)
+    boundaries = _select_boundaries(_read_layer(paths[BOUNDARY_FEATURE]), [name])
+    boundary = boundaries.drop(columns=["GlobalID"], errors="ignore")
+
+    layers = {}
+    for feature in CITY_LAYERS:
+        gdf = to_crs_cached(_read_layer(paths[feature]), boundaries.crs, paths[feature])
+        gdf = gdf.drop(columns=BOUNDARY_COLUMNS, errors="ignore")
+        joined = gpd.sjoin(gdf, boundary[BOUNDARY_COLUMNS + ["geometry"]], predicate="within", how="inner")
+        layers[feature] = joined.drop(columns="index_right")
+    return _finish_association(name, layers, output_dir, owner_zips)
+
+
+# --- Batch mode ---
+
+# Per-worker memory-mapped layers, set by _init_worker
+_shared: dict = {}
+
+
+def _write_shared(gdf: gpd.GeoDataFrame, path: Path) -> None:
+    """Write a layer as an uncompressed Arrow IPC file with WKB geometry, for memory-mapping."""
+    frame = pd.DataFrame(gdf.drop(columns=gdf.geometry.name))
+    frame["geometry"] = shapely.to_wkb(gdf.geometry.values)
+    table = pa.Table.from_pandas(frame, preserve_index=False)
+    with pa.OSFile(str(path), "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+
+
+def _init_worker(shared_paths: dict, crs: str) -> None:
+    _shared.clear()
+    for feature, path in shared_paths.items():
+        # Zero-copy: the table's buffers point into the page cache, shared by all workers
+        _shared[feature] = pa.ipc.open_file(pa.memory_map(str(path), "r")).read_all()
+    _shared["crs"] = crs
+
+
+def _association_task(name: str, boundary: dict, rows: dict, output_dir: Path, owner_zips) -> dict:
+    layers = {}
+    for feature, indices in rows.items():
+        frame = _shared[feature].take(pa.array(indices, type=pa.int64())).to_pandas()
+        geometry = shapely.from_wkb(frame.pop("geometry").to_numpy())
+        gdf = gpd.GeoDataFrame(frame, geometry=geometry, crs=_shared["crs"])
+        layers[feature] = _with_boundary(gdf, boundary)
+    return _finish_association(name, layers, output_dir, owner_zips)
+
+
+@profiled()
+def build_associations(
+    names: Optional[Sequence[str]] = None,
+    precious_folder: Path = Path("../precious/"),
+    output_dir: Path = Path("neighborhoods"),
+    ext: str = ".geojson",
+    jobs: Optional[int] = None,
+    owner_zips: Optional[Sequence[str]] = None,
+) -> pd.DataFrame:
+    """
+    Build parcel and address outputs for many civic associations in parallel.
+
+    Parameters
+    ----------
+    names : sequence of str, optional
+        Association names (the 'Name' column of Civic_Associations); default all.
+    precious_folder : Path, optional
+        Folder holding the dated layer snapshots (default='../precious/').
+    output_dir : Path, optional
+        Destination; one folder per association plus summary.csv (default='neighborhoods').
+    ext : str, optional
+        Snapshot format of the Parcels and Addresses layers (default='.geojson';
+        '.parquet' reads much faster).
+    jobs : int, optional
+        Worker processes (default: number of CPUs).
+    owner_zips : sequence of str, optional
+        See `prepare_parcels`.
+
+    Returns
+    -------
+    pd.DataFrame
+        One row per association: 'association', 'folder', 'parcels',
+        'addresses', 'owner_occupied', 'rentals' and worker 'seconds'.
+    """
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    paths = _layer_paths(precious_folder, ext)
+
+    boundaries = _select_boundaries(_read_layer(paths[BOUNDARY_FEATURE]), names).reset_index(drop=True)
+    crs = boundaries.crs.to_string()
+
+    layers, assignments = {}, {}
+    for feature in CITY_LAYERS:
+        logger.info(f"Loading {paths[feature].name}")
+        gdf = to_crs_cached(_read_layer(paths[feature]), boundaries.crs, paths[feature]).reset_index(drop=True)
+        # boundary i contains feature j  <=>  feature j is within boundary i
+        boundary_idx, feature_idx = gdf.sindex.query(boundaries.geometry.values, predicate="contains")
+        order = np.lexsort((feature_idx, boundary_idx))
+        boundary_idx, feature_idx = boundary_idx[order], feature_idx[order]
+        splits = np.searchsorted(boundary_idx, np.arange(len(boundaries) + 1))
+        assignments[feature] = [feature_idx[splits[i]:splits[i + 1]] for i in range(len(boundaries))]
+        layers[feature] = gdf
+
+    rows = []
+    with tempfile.TemporaryDirectory(prefix=".shared-", dir=output_dir) as shared_dir:
+        shared_paths = {}
+        for feature, gdf in layers.items():
+            shared_paths[feature] = Path(shared_dir) / f"{feature}.arrow"
+            _write_shared(gdf, shared_paths[feature])
+        del layers
+
+        logger.info(f"Building {len(boundaries)} associations with {jobs or 'all'} workers")
+        with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker, initargs=(shared_paths, crs)) as pool:
+            futures = [
+                pool.submit(
+                    _association_task,
+                    boundary["Name"],
+                    {c: boundary[c] for c in BOUNDARY_COLUMNS if c in boundary},
+                    {feature: assignments[feature][i] for feature in CITY_LAYERS},
+                    output_dir,
+                    owner_zips,
+                )
+                for i, boundary in boundaries.iterrows()
+            ]
+            rows = [future.result() for future in futures]
+
+    summary = pd.DataFrame(rows)
+    summary.to_csv(output_dir / "summary.csv", index=False)
+    return summary
+
+
+def compare_with_loop(
+    names: Optional[Sequence[str]] = None,
+    precious_folder: Path = Path("../precious/"),
+    output_dir: Path = Path("neighborhoods"),
+    ext: str = ".geojson",
+    jobs: Optional[int] = None,
+    owner_zips: Optional[Sequence[str]] = None,
+) -> dict:
+    """
+    Time `build_associations` against running `build_association` in a loop
+    (into `output_dir`/_loop) over the same associations.
+
+    Returns
+    -------
+    dict
+        'batch_seconds', 'loop_seconds', 'speedup' and the batch 'summary'.
+    """
+    if not names:
+        names = list(_read_layer(_layer_paths(precious_folder, ext)[BOUNDARY_FEATURE])["Name"])
+
+    start = time.perf_counter()
+    summary = build_associations(names, precious_folder, output_dir, ext=ext, jobs=jobs, owner_zips=owner_zips)
+    batch_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for name in names:
+        build_association(name, precious_folder, Path(output_dir) / "_loop", ext=ext, owner_zips=owner_zips)
+    loop_seconds = time.perf_counter() - start
+
+    return {
+        "batch_seconds": batch_seconds,
+        "loop_seconds": loop_seconds,
+        "speedup": loop_seconds / batch_seconds if batch_seconds else float("nan"),
+        "summary": summary,
+    }
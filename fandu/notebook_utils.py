@@ -0,0 +1,437 @@
+"""
+Notebook helpers for Fandu
+
+Functions here return IPython `Markdown` or `HTML` objects for display in
+Jupyter or Quarto, so this module is only imported from notebooks and reports.
+"""
+import json
+import gzip
+import base64
+import hashlib
+import html as html_lib
+import uuid
+
+from collections import OrderedDict
+from pathlib import Path
+from string import Template
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from loguru import logger
+from IPython.display import Markdown, HTML, display
+
+# Largest compressed table payload embedded in a page; bigger results are cut to the rows that fit
+TABLE_INLINE_BYTES = 1_000_000
+TABLE_PAGE_LENGTH = 25
+
+
+def _cell_text(values: pd.Series):
+    """
+    Markdown cell strings for a column, and whether it is numeric (right-aligned).
+    Missing values are blank, whole-number floats print without '.0' and pipes
+    are escaped.
+    """
+    numeric = pd.api.types.is_numeric_dtype(values) and not pd.api.types.is_bool_dtype(values)
+    if pd.api.types.is_float_dtype(values):
+        present = values.dropna()
+        if len(present) and np.array_equal(present, np.floor(present)) and present.abs().max() < 2 ** 53:
+            values = values.astype("Int64")
+    text = values.astype("string").fillna("")
+    if not numeric:
+        text = text.str.replace("|", "\\|", regex=False).str.replace("\n", " ", regex=False)
+    return text, numeric
+
+
+def markdown_table(df: pd.DataFrame, index: bool = False) -> str:
+    """
+    A GitHub-flavored Markdown table of `df`, laid out like tabulate's 'github'
+    format (strings left-aligned, numbers right-aligned) but built with
+    vectorized string operations.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        Rows to render; select and limit them first, every row is formatted.
+    index : bool, optional
+        If True, the index is the first column, headed by its name.
+
+    Returns
+    -------
+    str
+        The Markdown table.
+    """
+    if index:
+        df = df.reset_index()
+    headers = [str(c) for c in df.columns]
+    columns = []
+    for position, header in enumerate(headers):
+        text, numeric = _cell_text(df.iloc[:, position].reset_index(drop=True))
+        width = max(len(header), int(text.str.len().max()) if len(text) else 0)
+        if numeric:
+            columns.append((header.rjust(width), "-" * (width + 2), text.str.rjust(width)))
+        else:
+            columns.append((header.ljust(width), "-" * (width + 2), text.str.ljust(width)))
+
+    lines = [
+        "| " + " | ".join(header for header, _, _ in columns) + " |",
+        "|" + "|".join(rule for _, rule, _ in columns) + "|",
+    ]
+    if len(df) and columns:
+        cells = [cells for _, _, cells in columns]
+        body = ("| " + cells[0].str.cat(cells[1:], sep=" | ") + " |") if len(cells) > 1 else ("| " + cells[0] + " |")
+        lines.extend(body.tolist())
+    return "\n".join(lines)
+
+
+# (row, column, fingerprint of the two columns) -> crosstab with both totals, most recent last
+_CROSSTAB_CACHE: "OrderedDict[tuple, pd.DataFrame]" = OrderedDict()
+_CROSSTAB_CACHE_SIZE = 64
+_MARGINS_NAME = "Total"
+
+
+def _with_missing_label(column: pd.Series, value: str) -> pd.Series:
+    """`column` with missing values labelled `value` (added to the categories of a categorical)."""
+    if isinstance(column.dtype, pd.CategoricalDtype) and value not in column.cat.categories:
+        column = column.cat.add_categories([value])
+    return column.fillna(value)
+
+
+def _cached_crosstab(contacts: pd.DataFrame, row_variable: str, col_variable: str) -> pd.DataFrame:
+    """Crosstab of two columns with row and column totals, cached per column pair and content."""
+    pair = contacts[[row_variable, col_variable]]
+    # Counts don't depend on row order, so an order-independent sum of row hashes identifies the content
+    fingerprint = (len(pair), int(pd.util.hash_pandas_object(pair, index=False).to_numpy().sum()))
+    key = (row_variable, col_variable, fingerprint)
+    if key in _CROSSTAB_CACHE:
+        _CROSSTAB_CACHE.move_to_end(key)
+        return _CROSSTAB_CACHE[key]
+
+    crosstab = pd.crosstab(
+        _with_missing_label(pair[row_variable], "Unknown"),
+        _with_missing_label(pair[col_variable], "None"),
+        margins=True,
+        margins_name=_MARGINS_NAME,
+    )
+    _CROSSTAB_CACHE[key] = crosstab
+    if len(_CROSSTAB_CACHE) > _CROSSTAB_CACHE_SIZE:
+        _CROSSTAB_CACHE.popitem(last=False)
+    return crosstab
+
+
+def cross_tab_markdown(contacts, row_variable, col_variable, show_row_totals=False, show_col_totals=False):
+    """
+    Create a markdown cross-tabulation of two columns in the contacts DataFrame.
+    Missing values are counted as 'Unknown' (rows) and 'None' (columns); the
+    caller's frame is not modified.  The crosstab is cached per column pair, so
+    repeated tables of the same columns only re-render.
+
+    Parameters:
+        contacts (pd.DataFrame): The contacts DataFrame.
+        row_variable (str): The column to group as rows.
+        col_variable (str): The column to group as columns.
+        show_row_totals (bool): Whether to include a totals row.
+        show_col_totals (bool): Whether to include a totals column.
+
+    Returns:
+        Markdown: A GitHub-flavored Markdown table for use in Jupyter or Quarto.
+    """
+    crosstab = _cached_crosstab(contacts, row_variable, col_variable)
+
+    # Remove unwanted total rows/cols if needed
+    if not show_row_totals:
+        crosstab = crosstab.drop(index=_MARGINS_NAME, errors="ignore")
+    if not show_col_totals:
+        crosstab = crosstab.drop(columns=_MARGINS_NAME, errors="ignore")
+
+    crosstab = crosstab.set_axis(crosstab.columns.astype(str), axis=1)
+    return Markdown(markdown_table(crosstab, index=True))
+
+
+def _sort_codes(values: pd.Series, ascending: bool) -> np.ndarray:
+    """
+    Integer sort key of a column: case-insensitive for strings, category order
+    for categoricals, missing values last in either direction.
+    """
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        codes, size = values.cat.codes.to_numpy(np.int64), len(values.cat.categories)
+    else:
+        if values.dtype == object or pd.api.types.is_string_dtype(values):
+            values = values.astype("string").str.lower()
+        codes, uniques = pd.factorize(values, sort=True)
+        codes, size = codes.astype(np.int64), len(uniques)
+    missing = codes < 0
+    if not ascending:
+        codes = size - 1 - codes
+    codes[missing] = size
+    return codes
+
+
+def _top_positions(keys: list, max_rows: int) -> np.ndarray:
+    """
+    Positions of the first `max_rows` rows in the order of the sort `keys`
+    (ties keep their original order), using a partial sort.
+    """
+    n = len(keys[0][0]) if keys else 0
+    # Fold the keys and the row position into one int64 when it can't overflow
+    combined, span = np.zeros(n, dtype=np.int64), 1
+    for codes, size in keys + [(np.arange(n, dtype=np.int64), n)]:
+        span *= size + 1
+        if span >= 2 ** 62:
+            order = np.lexsort([np.arange(n)] + [codes for codes, _ in reversed(keys)])
+            return order[:max_rows]
+        combined = combined * (size + 1) + codes
+
+    if max_rows < n:
+        top = np.argpartition(combined, max_rows - 1)[:max_rows]
+        return top[np.argsort(combined[top])]
+    return np.argsort(combined)
+
+
+def list_contacts_markdown(contacts, columns, max_rows=20, sort_columns=None):
+    """
+    Returns a Markdown-formatted table of selected columns from the contacts DataFrame,
+    optionally allowing custom column labels and case-insensitive sorting.
+
+    Only the `max_rows` rows shown are selected (with a partial sort) and formatted.
+
+    Parameters:
+        contacts (pd.DataFrame): The full contacts dataset.
+        columns (list of str or dict): Columns to include. Dicts map real column -> display label.
+        max_rows (int): Maximum number of rows to show in the Markdown table.
+        sort_columns (list of str or dict): Optional sort order. Strings default to ascending.
+            Dicts must be of form {column: "asc" or "desc"}.
+
+    Returns:
+        Markdown: A GitHub-flavored Markdown table.
+    """
+    column_keys = []
+    column_labels = []
+
+    for col in columns:
+        if isinstance(col, str):
+            if col not in contacts.columns:
+                raise KeyError(f"Column '{col}' not found in contacts DataFrame.")
+            column_keys.append(col)
+            column_labels.append(col)
+        elif isinstance(col, dict):
+            for key, label in col.items():
+                if key not in contacts.columns:
+                    raise KeyError(f"Column '{key}' not found in contacts DataFrame.")
+                column_keys.append(key)
+                column_labels.append(label)
+        else:
+            raise TypeError("Each column must be a string or a single-key dictionary.")
+
+    max_rows = max(0, min(max_rows, len(contacts)))
+
+    # Handle sorting (case-insensitive where applicable)
+    if sort_columns:
+        sort_keys = []
+
+        for item in sort_columns:
+            if isinstance(item, str):
+                key = item
+                order = "asc"
+            elif isinstance(item, dict):
+                key, order = next(iter(item.items()))
+            else:
+                raise TypeError("sort_columns must be a list of strings or single-key dictionaries.")
+
+            if key not in column_keys:
+                raise ValueError(f"Sort column '{key}' must also be in the columns list.")
+            if order.lower() not in ["asc", "desc"]:
+                raise ValueError(f"Invalid sort order '{order}' for column '{key}'. Use 'asc' or 'desc'.")
+
+            codes = _sort_codes(contacts[key], order.lower() == "asc")
+            sort_keys.append((codes, int(codes.max(initial=0))))
+
+        subset = contacts[column_keys].iloc[_top_positions(sort_keys, max_rows)]
+    else:
+        subset = contacts[column_keys].iloc[:max_rows]
+
+    # Apply column renaming
+    subset = subset.set_axis(column_labels, axis=1)
+
+    return Markdown(markdown_table(subset))
+
+
+_TABLE_TEMPLATE = Template("""<div class="fandu-table" id="$id">
+<table class="display compact"><thead><tr>$header</tr></thead><tbody></tbody></table>
+<div class="fandu-table-pager"><button data-step="-1">&lsaquo; Prev</button> <span></span> <button data-step="1">Next &rsaquo;</button></div>
+<p class="fandu-table-note">$note</p>
+</div>
+<script>
+(async () => {
+  const root = document.getElementById("$id");
+  const bytes = Uint8Array.from(atob("$payload"), c => c.charCodeAt(0));
+  const stream = new Blob([bytes]).stream().pipeThrough(new DecompressionStream("gzip"));
+  const data = JSON.parse(await new Response(stream).text());
+  const rows = data.length ? data[0].length : 0, size = $page_length;
+  let page = 0, order = [...Array(rows).keys()], sorted = null;
+  const tbody = root.querySelector("tbody"), label = root.querySelector(".fandu-table-pager span");
+  function render() {
+    tbody.replaceChildren();
+    for (const r of order.slice(page * size, (page + 1) * size)) {
+      const tr = tbody.insertRow();
+      for (const column of data) tr.insertCell().textContent = column[r] === null ? "" : column[r];
+    }
+    label.textContent = `$${rows ? page * size + 1 : 0}-$${Math.min(rows, (page + 1) * size)} of $${rows}`;
+  }
+  root.querySelectorAll("button").forEach(b => b.onclick = () => {
+    page = Math.min(Math.max(0, Math.ceil(rows / size) - 1), Math.max(0, page + Number(b.dataset.step)));
+    render();
+  });
+  root.querySelectorAll("th").forEach((th, c) => th.onclick = () => {
+    const sign = sorted === c ? -1 : 1;
+    sorted = sorted === c ? null : c;
+    const column = data[c];
+    order.sort((a, b) => sign * (column[a] === column[b] ? 0 : column[a] === null ? 1 : column[b] === null ? -1 : column[a] < column[b] ? -1 : 1));
+    page = 0;
+    render();
+  });
+  render();
+})();
+</script>""")
+
+
+def _as_arrow(data) -> pa.Table:
+    """A pyarrow Table from a Table, RecordBatchReader or (Geo)DataFrame; geometry becomes WKT."""
+    if isinstance(data, pa.Table):
+        return data
+    if isinstance(data, pa.RecordBatchReader):
+        return data.read_all()
+    df = pd.DataFrame(data)
+    geometry = [c for c in df.columns if df[c].dtype.name == "geometry"]
+    if geometry:
+        df = df.assign(**{c: df[c].to_wkt() for c in geometry})
+    return pa.Table.from_pandas(df, preserve_index=False)
+
+
+def _json_column(column: pa.ChunkedArray) -> list:
+    """Column values that JSON can carry: numbers (decimals too), bools and strings (NaN -> null)."""
+    kind = column.type
+    if pa.types.is_floating(kind):
+        column = pc.if_else(pc.is_nan(column), pa.scalar(None, kind), column)
+    elif pa.types.is_decimal(kind):
+        # DECIMAL and HUGEINT (decimal128(38, 0)) stay numbers so the table sorts
+        # them numerically; int64 when whole and in range, else float64
+        if kind.scale == 0:
+            try:
+                return pc.cast(column, pa.int64()).to_pylist()
+            except pa.ArrowInvalid:
+                pass
+        return pc.cast(column, pa.float64(), safe=False).to_pylist()
+    elif pa.types.is_binary(kind) or pa.types.is_large_binary(kind):
+        return [None if v is None else f"<{len(v)} bytes>" for v in column.to_pylist()]
+    elif not (pa.types.is_integer(kind) or pa.types.is_boolean(kind)
+              or pa.types.is_string(kind) or pa.types.is_large_string(kind)):
+        try:
+            column = pc.cast(column, pa.string())
+        except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+            return [None if v is None else str(v) for v in column.to_pylist()]
+    return column.to_pylist()
+
+
+def _table_payload(table: pa.Table) -> str:
+    """Columns as gzip-compressed JSON arrays, base64 encoded."""
+    columns = [_json_column(column) for column in table.columns]
+    raw = json.dumps(columns, separators=(",", ":"), default=str).encode("utf-8")
+    return base64.b64encode(gzip.compress(raw, compresslevel=6)).decode("ascii")
+
+
+def render_table(
+    data,
+    page_length: int = TABLE_PAGE_LENGTH,
+    max_inline_bytes: int = TABLE_INLINE_BYTES,
+    sidecar_dir: Optional[Path] = None,
+    name: Optional[str] = None,
+):
+    """
+    Render a table as HTML with its data embedded compressed and paged client-side.
+
+    Parameters
+    ----------
+    data : pa.Table, pa.RecordBatchReader or pd.DataFrame
+        Rows to show.
+    page_length : int, optional
+        Rows per page (default=25).
+    max_inline_bytes : int, optional
+        Cap on the embedded (compressed, base64) payload.  Larger results are
+        cut to the leading rows that fit (default=1,000,000).
+    sidecar_dir : Path, optional
+        If given and the result was cut, the full result is written here as
+        '<name>.parquet' and linked below the table.
+    name : str, optional
+        Sidecar file name (default: a hash of the full result's payload, so
+        different results never share a file).
+
+    Returns
+    -------
+    tuple
+        (HTML string, stats dict with 'rows', 'inline_rows', 'inline_bytes'
+        and 'sidecar').
+    """
+    table = _as_arrow(data)
+    rows = table.num_rows
+
+    inline_rows = rows
+    payload = _table_payload(table)
+    name = name or hashlib.sha1(payload.encode("ascii")).hexdigest()[:12]
+    while len(payload) > max_inline_bytes and inline_rows > 0:
+        # Shrink in proportion to the overshoot, with a margin for uneven rows
+        inline_rows = min(inline_rows - 1, int(inline_rows * max_inline_bytes / len(payload) * 0.9))
+        payload = _table_payload(table.slice(0, inline_rows))
+
+    sidecar = None
+    note = f"{rows:,} rows"
+    if inline_rows < rows:
+        note = f"First {inline_rows:,} of {rows:,} rows"
+        if sidecar_dir is not None:
+            sidecar = Path(sidecar_dir) / f"{name}.parquet"
+            sidecar.parent.mkdir(parents=True, exist_ok=True)
+            pq.write_table(table, sidecar)
+            note += f' (all rows: <a href="{html_lib.escape(sidecar.as_posix())}">{html_lib.escape(sidecar.name)}</a>)'
+
+    header = "".join(f"<th>{html_lib.escape(str(c))}</th>" for c in table.column_names)
+    rendered = _TABLE_TEMPLATE.substitute(
+        # A fresh element id per call: one page may show the same result twice
+        id=f"fandu-table-{uuid.uuid4().hex}", header=header, note=note, payload=payload, page_length=int(page_length),
+    )
+    stats = {"rows": rows, "inline_rows": inline_rows, "inline_bytes": len(payload), "sidecar": sidecar}
+    logger.info(f"Table {name}: {rows} rows, {inline_rows} inline in {len(payload) / 1024:.1f} KB"
+                + (f", full result in {sidecar}" if sidecar else ""))
+    return rendered, stats
+
+
+def show_table(data, **kwargs) -> dict:
+    """Display a table rendered by `render_table` and return its stats."""
+    rendered, stats = render_table(data, **kwargs)
+    display(HTML(rendered))
+    return stats
+
+
+def show_result_set(
+    con,
+    query: str,
+    layout: str = "column-screen-inset",
+    font_size: str = "0.7em",
+    **kwargs,
+) -> None:
+    """
+    Run a DuckDB query and display its result as a paged table in a Quarto
+    layout block.  The result is fetched as Arrow, so no DataFrame is built;
+    `kwargs` go to `render_table`.  In a report:
+
+        show_result_set = functools.partial(notebook_utils.show_result_set, con)
+        show_result_set("SELECT ...", page_length=10)
+    """
+    result = con.execute(query)
+    fetch = getattr(result, "to_arrow_table", None) or result.fetch_arrow_table
+    print(f'::: {{.{layout} style="font-size:{font_size}"}}')
+    show_table(fetch(), **kwargs)
+    print(":::")
@@ -0,0 +1,289 @@
+"""
+Stage timing and memory instrumentation for Fandu pipelines
+
+Wrap a pipeline step with the `profiled` decorator or the `stage` context
+manager to record wall and CPU time, peak RSS, Python allocation deltas
+(when tracemalloc is tracing) and rows in/out.  Each stage is logged at
+DEBUG level; within a run started by `profile_run` (or `start_profiling` /
+`stop_profiling`, for notebooks where a run spans cells) the stages are also
+written as a JSON trace that opens in chrome://tracing or Perfetto, plus an
+optional cProfile dump.
+
+    from fandu.profiling import profile_run, stage
+
+    with profile_run("hht", trace_dir="profiles", cprofile=True):
+        df = extract_and_fill_year_and_chair_column(df)   # already instrumented
+        with stage("geocode", rows_in=len(df)) as s:
+            result = geocoder.geocode(df["clean_address"])
+            s.rows_out = len(result)
+
+The standard library is all this module needs, so importing it is cheap.
+"""
+import os
+import json
+import time
+import cProfile
+import functools
+import threading
+import tracemalloc
+
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+_MB = 1024 * 1024
+
+# The active run (None when not profiling) and the per-thread stage stack
+_run: Optional[dict] = None
+_local = threading.local()
+
+
+def _peak_rss_mb() -> Optional[float]:
+    """Peak resident set size of this process so far, in MB."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / _MB if os.uname().sysname == "Darwin" else peak / 1024
+
+
+def _rss_mb() -> Optional[float]:
+    """Current resident set size in MB (Linux only)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / _MB
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def count_rows(obj) -> Optional[int]:
+    """Row count of a DataFrame/Series/array (first element of a tuple), else None."""
+    if isinstance(obj, tuple) and obj:
+        obj = obj[0]
+    shape = getattr(obj, "shape", None)
+    if shape:
+        return int(shape[0])
+    return None
+
+
+class Stage:
+    """Measurements for one pipeline stage; set `rows_out` inside a `stage` block."""
+
+    def __init__(self, name: str, rows_in: Optional[int] = None):
+        self.name = name
+        self.rows_in = rows_in
+        self.rows_out: Optional[int] = None
+        self.seconds: float = 0.0
+        self.cpu_seconds: float = 0.0
+        self.rss_mb: Optional[float] = None
+        self.rss_delta_mb: Optional[float] = None
+        self.peak_rss_mb: Optional[float] = None
+        self.alloc_delta_mb: Optional[float] = None
+        self.alloc_peak_mb: Optional[float] = None
+        self._child_alloc_peak = 0
+
+    def as_dict(self) -> dict:
+        return {k: v for k, v in vars(self).items() if not k.startswith("_")}
+
+
+@contextmanager
+def stage(name: str, rows_in: Optional[int] = None):
+    """
+    Measure the enclosed block as one stage.
+
+    Yields
+    ------
+    Stage
+        Set its `rows_out` before the block ends to record rows out.
+    """
+    record = Stage(name, rows_in)
+    stack = _local.__dict__.setdefault("stack", [])
+    parent = stack[-1] if stack else None
+    stack.append(record)
+
+    tracing = tracemalloc.is_tracing()
+    if tracing:
+        alloc_start, outer_peak = tracemalloc.get_traced_memory()
+        if parent is not None:
+            parent._child_alloc_peak = max(parent._child_alloc_peak, outer_peak)
+        tracemalloc.reset_peak()
+    rss_start = _rss_mb()
+    start_wall, start_cpu = time.perf_counter(), time.process_time()
+    try:
+        yield record
+    finally:
+        record.seconds = time.perf_counter() - start_wall
+        record.cpu_seconds = time.process_time() - start_cpu
+        record.rss_mb = _rss_mb()
+        if rss_start is not None and record.rss_mb is not None:
+            record.rss_delta_mb = record.rss_mb - rss_start
+        record.peak_rss_mb = _peak_rss_mb()
+        if tracing and tracemalloc.is_tracing():
+            alloc_end, peak = tracemalloc.get_traced_memory()
+            peak = max(peak, record._child_alloc_peak)
+            record.alloc_delta_mb = (alloc_end - alloc_start) / _MB
+            record.alloc_peak_mb = (peak - alloc_start) / _MB
+            if parent is not None:
+                parent._child_alloc_peak = max(parent._child_alloc_peak, peak)
+        stack.pop()
+        _finish(record, start_wall, len(stack))
+
+
+def _finish(record: Stage, start_wall: float, depth: int) -> None:
+    """Log a finished stage and add it to the active run's trace."""
+    rows = ""
+    if record.rows_in is not None or record.rows_out is not None:
+        rows = f", rows {record.rows_in if record.rows_in is not None else '?'} -> " \
+               f"{record.rows_out if record.rows_out is not None else '?'}"
+    memory = f", peak RSS {record.peak_rss_mb:.0f} MB" if record.peak_rss_mb is not None else ""
+    if record.alloc_peak_mb is not None:
+        memory += f", alloc +{record.alloc_delta_mb:.1f} MB (peak +{record.alloc_peak_mb:.1f} MB)"
+    # loguru is imported here rather than at module level: fandu.utils imports
+    # this module on every CLI path, which must stay stdlib-only
+    from loguru import logger
+
+    logger.debug(f"{'  ' * depth}{record.name}: {record.seconds:.3f}s{rows}{memory}")
+
+    run = _run
+    if run is not None:
+        run["events"].append({
+            "name": record.name,
+            "ph": "X",
+            "ts": (start_wall - run["t0"]) * 1e6,
+            "dur": record.seconds * 1e6,
+            "pid": os.getpid(),
+            "tid": threading.get_ident(),
+            "args": record.as_dict(),
+        })
+
+
+def profiled(name: Optional[str] = None):
+    """
+    Decorator measuring each call of a function as a stage.
+
+    Rows in are taken from the first argument with a `shape` (skipping `self`)
+    and rows out from the result, when they are DataFrames or arrays.
+    """
+    def decorator(func):
+        stage_name = name or f"{func.__module__.rsplit('.', 1)[-1]}.{func.__qualname__}"
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            rows_in = next((n for n in map(count_rows, args[:2]) if n is not None), None)
+            with stage(stage_name, rows_in=rows_in) as record:
+                result = func(*args, **kwargs)
+                record.rows_out = count_rows(result)
+            return result
+        return wrapper
+    return decorator
+
+
+def start_profiling(
+    name: str = "fandu",
+    trace_dir: Path = Path("profiles"),
+    trace_memory: bool = True,
+    cprofile: bool = False,
+) -> None:
+    """
+    Start collecting stages into a run (see `profile_run`).  Use this with
+    `stop_profiling` when the run spans several notebook cells.
+    """
+    global _run
+    if _run is not None:
+        stop_profiling()
+    started_tracemalloc = trace_memory and not tracemalloc.is_tracing()
+    if started_tracemalloc:
+        tracemalloc.start()
+    profiler = cProfile.Profile() if cprofile else None
+    _run = {
+        "name": name,
+        "trace_dir": Path(trace_dir),
+        "started": datetime.now(),
+        "t0": time.perf_counter(),
+        "events": [],
+        "profiler": profiler,
+        "started_tracemalloc": started_tracemalloc,
+    }
+    if profiler is not None:
+        profiler.enable()
+
+
+def stop_profiling() -> Optional[Path]:
+    """
+    Finish the active run and write its trace (and cProfile dump, if enabled).
+
+    Returns
+    -------
+    Path or None
+        The JSON trace, '<trace_dir>/<name>-<timestamp>.trace.json'; the cProfile
+        dump is written next to it as '.prof'.  None if no run was active.
+    """
+    global _run
+    run, _run = _run, None
+    if run is None:
+        return None
+
+    if run["profiler"] is not None:
+        run["profiler"].disable()
+    if run["started_tracemalloc"]:
+        tracemalloc.stop()
+
+    trace_dir = run["trace_dir"]
+    trace_dir.mkdir(parents=True, exist_ok=True)
+    stem = f"{run['name']}-{run['started']:%Y%m%d-%H%M%S}"
+    trace_path = trace_dir / f"{stem}.trace.json"
+    trace = {
+        "traceEvents": run["events"],
+        "displayTimeUnit": "ms",
+        "otherData": {
+            "run": run["name"],
+            "started": run["started"].isoformat(timespec="seconds"),
+            "seconds": time.perf_counter() - run["t0"],
+            "peak_rss_mb": _peak_rss_mb(),
+        },
+    }
+    with open(trace_path, "w", encoding="utf-8") as f:
+        json.dump(trace, f, indent=1, default=str)
+
+    if run["profiler"] is not None:
+        run["profiler"].dump_stats(trace_dir / f"{stem}.prof")
+
+    from loguru import logger
+
+    logger.info(f"Profile trace: {trace_path} ({len(run['events'])} stages)")
+    return trace_path
+
+
+@contextmanager
+def profile_run(
+    name: str = "fandu",
+    trace_dir: Path = Path("profiles"),
+    trace_memory: bool = True,
+    cprofile: bool = False,
+):
+    """
+    Collect every stage run inside the block and write them as a JSON trace.
+
+    Parameters
+    ----------
+    name : str, optional
+        Run name, used in the trace file name (default='fandu').
+    trace_dir : Path, optional
+        Folder for the trace and cProfile files (default='profiles').
+    trace_memory : bool, optional
+        If True, trace Python allocations with tracemalloc (slower; default=True).
+    cprofile : bool, optional
+        If True, also write a cProfile dump of the whole run (view with snakeviz
+        or `python -m pstats`).
+    """
+    start_profiling(name, trace_dir, trace_memory=trace_memory, cprofile=cprofile)
+    try:
+        yield
+    finally:
+        stop_profiling()
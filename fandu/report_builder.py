@@ -0,0 +1,257 @@
+"""
+Parallel, cached builder for the Quarto reports
+
+Each report's file inputs and outputs are discovered from its source (and
+an optional `fandu:` block in its front matter), reports are ordered by
+those dependencies, independent ones are rendered concurrently, and a
+report is skipped when its source, imported fandu modules and inputs hash
+the same as at its last successful build.
+"""
+import os
+import re
+import time
+import subprocess
+
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Optional, Sequence
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+import yaml
+from loguru import logger
+
+from fandu.cache_utils import file_fingerprint, combine_fingerprints, load_manifest, save_manifest
+
+# Bump when the build key changes meaning
+BUILD_VERSION = "1"
+
+BUILD_MANIFEST = ".build_manifest.json"
+
+RENDER_COMMAND = ("quarto", "render")
+
+_FRONT_MATTER = re.compile(r"\A---\s*\n(.*?)\n---\s*\n", re.DOTALL)
+_DATA_LITERAL = re.compile(r"""['"]([\w./-]+\.(?:parquet|csv|xlsx))['"]""")
+_WRITE_CALL = re.compile(r"""(?:\.to_(?:parquet|csv|excel)|ExcelWriter)\(\s*['"]([\w./-]+)['"]""")
+_COPY_TO = re.compile(r"""\bCOPY\b[^;]*?\bTO\s+['"]([\w./-]+)['"]""", re.IGNORECASE | re.DOTALL)
+_PRECIOUS_FEATURE = re.compile(r"""get_newest_path\(\s*precious_folder\s*,\s*['"]([\w-]+)['"]""")
+_FANDU_IMPORT = re.compile(r"^\s*(?:from|import)\s+fandu\.(\w+)", re.MULTILINE)
+_LOCAL_IMPORT = re.compile(r"^\s*(?:from|import)\s+utils\b", re.MULTILINE)
+
+
+@dataclass
+class Report:
+    """A Quarto report and the files it reads and writes (relative to the reports folder)."""
+    path: Path
+    inputs: list = field(default_factory=list)
+    outputs: list = field(default_factory=list)
+    sources: list = field(default_factory=list)
+
+
+def _strip_comments(text: str) -> str:
+    """Drop commented-out Python/SQL lines so disabled writes aren't picked up."""
+    return "\n".join(
+        line for line in text.splitlines()
+        if not line.lstrip().startswith(("#", "--"))
+    )
+
+
+def parse_report(path: Path) -> Report:
+    """
+    Discover a report's inputs, outputs and source files.
+
+    Outputs are literal file names passed to `.to_parquet/.to_csv/.to_excel`,
+    `pd.ExcelWriter` or `COPY ... TO`; every other literal data file it
+    mentions is an input, as is each `get_newest_path(precious_folder, '<Feature>')` snapshot.
+    Anything built from variables can be declared in the front matter:
+
+        fandu:
+          inputs: [../precious/Addresses-*.geojson]
+          outputs: [Addresses_in_fan.parquet]
+    """
+    path = Path(path)
+    text = path.read_text(encoding="utf-8")
+
+    declared = {}
+    front_matter = _FRONT_MATTER.match(text)
+    if front_matter:
+        declared = (yaml.safe_load(front_matter.group(1)) or {}).get("fandu") or {}
+
+    code = _strip_comments(text)
+    outputs = set(_WRITE_CALL.findall(code)) | set(_COPY_TO.findall(code)) | set(declared.get("outputs", []))
+    inputs = set(_DATA_LITERAL.findall(code)) | set(declared.get("inputs", []))
+    inputs |= {f"../precious/{feature}-*" for feature in _PRECIOUS_FEATURE.findall(code)}
+    inputs -= outputs
+
+    package = Path(__file__).parent
+    sources = [path] + [package / f"{module}.py" for module in sorted(set(_FANDU_IMPORT.findall(code)))]
+    if _LOCAL_IMPORT.search(code):
+        sources.append(path.parent / "utils.py")
+
+    return Report(
+        path=path,
+        inputs=sorted(inputs),
+        outputs=sorted(outputs),
+        sources=[s for s in sources if s.is_file()],
+    )
+
+
+def discover_reports(reports_dir: Path = Path("."), pattern: str = "[0-9]*.qmd") -> list[Report]:
+    """Parse every report in `reports_dir` matching `pattern` (default: the numbered pipeline reports)."""
+    return [parse_report(p) for p in sorted(Path(reports_dir).glob(pattern))]
+
+
+def report_dependencies(reports: Sequence[Report]) -> dict:
+    """
+    Map each report name to the names of the reports producing its inputs.
+
+    Raises
+    ------
+    ValueError
+        If the dependencies form a cycle.
+    """
+    producers = {}
+    for report in reports:
+        for output in report.outputs:
+            producers[output] = report.path.name
+
+    deps = {
+        report.path.name: sorted({producers[i] for i in report.inputs if i in producers} - {report.path.name})
+        for report in reports
+    }
+
+    # Cycle check (Kahn)
+    remaining = {name: set(d) for name, d in deps.items()}
+    while remaining:
+        ready = [name for name, d in remaining.items() if not d]
+        if not ready:
+            raise ValueError(f"Report dependency cycle among: {', '.join(sorted(remaining))}")
+        for name in ready:
+            del remaining[name]
+        for d in remaining.values():
+            d.difference_update(ready)
+    return deps
+
+
+def build_key(report: Report, reports_dir: Path) -> str:
+    """Content hash of a report's sources and current inputs."""
+    parts = [BUILD_VERSION, " ".join(RENDER_COMMAND)]
+    for source in report.sources:
+        parts += [source.name, file_fingerprint(source)]
+    for pattern in report.inputs:
+        matches = sorted(Path(reports_dir).glob(pattern))
+        if not matches:
+            parts += [pattern, "missing"]
+        for match in matches:
+            parts += [match.name, file_fingerprint(match)]
+    return combine_fingerprints(parts)
+
+
+def _render(report: Report, reports_dir: Path) -> tuple[bool, float, str]:
+    """Render one report in its own process; returns (ok, seconds, output tail)."""
+    start = time.perf_counter()
+    result = subprocess.run(
+        [*RENDER_COMMAND, report.path.name],
+        cwd=reports_dir,
+        capture_output=True,
+        text=True,
+    )
+    output = (result.stdout + result.stderr).strip().splitlines()
+    return result.returncode == 0, time.perf_counter() - start, "\n".join(output[-20:])
+
+
+def build_reports(
+    reports_dir: Path = Path("."),
+    names: Optional[Sequence[str]] = None,
+    pattern: str = "[0-9]*.qmd",
+    jobs: Optional[int] = None,
+    force: bool = False,
+    dry_run: bool = False,
+) -> list[dict]:
+    """
+    Render reports in dependency order, in parallel, skipping unchanged ones.
+
+    Parameters
+    ----------
+    reports_dir : Path, optional
+        Quarto project folder (default='.').
+    names : sequence of str, optional
+        Only build these reports (plus whatever they depend on).
+    pattern : str, optional
+        Glob selecting the pipeline reports (default='[0-9]*.qmd').
+    jobs : int, optional
+        Maximum concurrent renders (default: number of CPUs).
+    force : bool, optional
+        If True, render every selected report regardless of the cache.
+    dry_run : bool, optional
+        If True, only report what would be rendered.
+
+    Returns
+    -------
+    list of dict
+        One entry per report in completion order: 'report', 'status'
+        ('built', 'cached', 'failed', 'blocked' or 'pending'), 'seconds'
+        and 'depends_on'.
+    """
+    reports_dir = Path(reports_dir)
+    reports = {r.path.name: r for r in discover_reports(reports_dir, pattern)}
+    deps = report_dependencies(list(reports.values()))
+
+    if names:
+        wanted, stack = set(), [Path(n).name for n in names]
+        while stack:
+            name = stack.pop()
+            if name not in reports:
+                raise FileNotFoundError(f"No report named {name} in {reports_dir}")
+            if name not in wanted:
+                wanted.add(name)
+                stack.extend(deps[name])
+        reports = {n: r for n, r in reports.items() if n in wanted}
+
+    manifest_path = reports_dir / BUILD_MANIFEST
+    manifest = load_manifest(manifest_path)
+    results, status = [], {}
+    pending = dict(reports)
+
+    def record(name, state, seconds=0.0):
+        status[name] = state
+        results.append({"report": name, "status": state, "seconds": seconds, "depends_on": deps[name]})
+
+    with ThreadPoolExecutor(max_workers=jobs or os.cpu_count()) as pool:
+        running = {}
+        while pending or running:
+            # Start (or skip) everything whose upstream reports are finished
+            for name in list(pending):
+                upstream = [status.get(d) for d in deps[name] if d in reports]
+                if any(s in ("failed", "blocked") for s in upstream):
+                    record(name, "blocked")
+                    del pending[name]
+                    continue
+                if any(s is None for s in upstream):
+                    continue
+
+                report = pending.pop(name)
+                key = build_key(report, reports_dir)
+                outputs_exist = all((reports_dir / o).is_file() for o in report.outputs)
+                if not force and outputs_exist and manifest.get(name, {}).get("key") == key:
+                    record(name, "cached")
+                elif dry_run:
+                    record(name, "pending")
+                else:
+                    logger.info(f"Rendering {name}")
+                    running[pool.submit(_render, report, reports_dir)] = (name, key)
+
+            if not running:
+                continue
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name, key = running.pop(future)
+                ok, seconds, tail = future.result()
+                if ok:
+                    manifest[name] = {"key": key, "seconds": round(seconds, 2)}
+                    save_manifest(manifest_path, manifest)
+                    record(name, "built", seconds)
+                else:
+                    logger.error(f"{name} failed:\n{tail}")
+                    record(name, "failed", seconds)
+
+    return results
@@ -0,0 +1,308 @@
+"""
+Keyed diffs between dated snapshots of a precious/ layer
+
+`diff_snapshots` lines two snapshots of the same feature up by key (ParcelID,
+AddressId, contact User ID), hashes every row once and compares the hashes,
+then compares only the changed rows column by column:
+
+    diff = diff_snapshots("precious/Parcels-2025-05-16.geojson", "precious/Parcels-2025-06-01.geojson")
+    diff.summary()            # counts of added, removed, changed and unchanged rows
+    diff.changes              # one row per changed value: key, column, old_value, new_value
+
+Row hashes are cached next to each snapshot ('.cache/<snapshot>.rowhash.parquet'),
+so a snapshot is hashed once however often it is diffed.  Downstream stages
+can reprocess just the delta with `apply_delta`.
+"""
+import re
+
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Optional, Sequence, Union
+
+import numpy as np
+import pandas as pd
+import shapely
+from loguru import logger
+
+from fandu.cache_utils import (
+    file_fingerprint,
+    combine_fingerprints,
+    snapshot_cache_path,
+    write_fingerprinted_parquet,
+    read_parquet_fingerprint,
+)
+from fandu.profiling import profiled
+
+# Bump when row hashing changes, so cached hashes are recomputed.
+DIFF_VERSION = "1"
+
+# Feature prefix -> candidate keys (the first whose columns are all present is used).
+# Condominium units share a ParcelID, so parcels are keyed by ParcelID and PIN.
+SNAPSHOT_KEYS = {
+    "Parcels": [["ParcelID", "PIN"], ["ParcelID"]],
+    "Addresses": [["AddressId"]],
+    "FDA_contacts": [["User ID"], ["UserId"]],
+    "Civic_Associations": [["Name"]],
+    "Neighborhoods": [["Name"]],
+    "National_Historic_Districts": [["Name"]],
+}
+
+# Bookkeeping columns that change on every export without the data changing
+IGNORED_COLUMNS = ["OBJECTID", "EditBy", "EditDate"]
+
+_SNAPSHOT_NAME = re.compile(r"^(?P<feature>.+?)-(?P<date>\d{4}-\d{2}-\d{2})")
+
+
+@dataclass
+class SnapshotDiff:
+    """Rows and values that differ between two snapshots, indexed by key."""
+    key: list
+    added: pd.DataFrame
+    removed: pd.DataFrame
+    changed: pd.DataFrame
+    changes: pd.DataFrame
+    unchanged: int
+    added_columns: list = field(default_factory=list)
+    removed_columns: list = field(default_factory=list)
+
+    @property
+    def delta_keys(self) -> pd.Index:
+        """Keys whose rows must be (re)processed downstream: added and changed."""
+        return self.added.index.append(self.changed.index)
+
+    def summary(self) -> dict:
+        return {
+            "added": len(self.added),
+            "removed": len(self.removed),
+            "changed": len(self.changed),
+            "unchanged": self.unchanged,
+            "added_columns": self.added_columns,
+            "removed_columns": self.removed_columns,
+        }
+
+    def column_counts(self) -> pd.Series:
+        """Number of changed values per column, most changed first."""
+        return self.changes["column"].value_counts()
+
+    def write(self, output_dir: Path) -> Path:
+        """Write added/removed/changed rows and the value changes as Parquet files."""
+        output_dir = Path(output_dir)
+        output_dir.mkdir(parents=True, exist_ok=True)
+        for name in ("added", "removed", "changed"):
+            _plain(getattr(self, name)).reset_index().to_parquet(output_dir / f"{name}.parquet", index=False)
+        self.changes.to_parquet(output_dir / "changes.parquet", index=False)
+        return output_dir
+
+
+def snapshot_feature(path: Path) -> Optional[str]:
+    """Feature prefix of a dated snapshot name, e.g. 'Parcels' for 'Parcels-2025-05-16.geojson'."""
+    match = _SNAPSHOT_NAME.match(Path(path).name)
+    return match.group("feature") if match else None
+
+
+def list_snapshots(folder: Path, feature: str, ext: Optional[str] = None) -> list[Path]:
+    """Snapshots of `feature` in `folder`, oldest first (optionally only one extension)."""
+    snapshots = []
+    for path in Path(folder).iterdir():
+        match = _SNAPSHOT_NAME.match(path.name)
+        if path.is_file() and match and match.group("feature").lower() == feature.lower():
+            if ext is None or path.suffix.lower() == ext.lower():
+                snapshots.append((match.group("date"), path.name, path))
+    return [path for _, _, path in sorted(snapshots)]
+
+
+def read_snapshot(path: Path) -> pd.DataFrame:
+    """Read a snapshot (GeoJSON/shapefile/GeoPackage, Parquet or CSV) into a DataFrame."""
+    path = Path(path)
+    suffix = path.suffix.lower()
+    if suffix == ".csv":
+        return pd.read_csv(path, low_memory=False)
+    if suffix == ".parquet":
+        import pyarrow.parquet as pq
+        if b"geo" in (pq.read_schema(path).metadata or {}):
+            import geopandas as gpd
+            return gpd.read_parquet(path)
+        return pd.read_parquet(path)
+    import geopandas as gpd
+    return gpd.read_file(path)
+
+
+def snapshot_key(df: pd.DataFrame, feature: Optional[str]) -> list:
+    """Key columns for a snapshot: the first candidate of its feature present in `df`."""
+    for key in SNAPSHOT_KEYS.get(feature, []):
+        if set(key).issubset(df.columns):
+            return list(key)
+    raise ValueError(f"No key column known for {feature!r}; pass key=")
+
+
+def _plain(df: pd.DataFrame) -> pd.DataFrame:
+    """Geometry columns as hex WKB, so frames hash, compare and write as plain tables."""
+    df = pd.DataFrame(df)
+    for column in df.columns:
+        if df[column].dtype.name == "geometry":
+            df[column] = shapely.to_wkb(df[column].values, hex=True)
+    return df
+
+
+def _keyed(df: pd.DataFrame, key: list, label: str) -> pd.DataFrame:
+    df = _plain(df.drop(columns=[c for c in IGNORED_COLUMNS if c in df.columns and c not in key]))
+    missing = df[key].isna().any(axis=1)
+    if missing.any():
+        logger.warning(f"{label}: dropping {int(missing.sum())} rows without a {'/'.join(key)}")
+        df = df[~missing]
+    df = df.set_index(key)
+    duplicated = df.index.duplicated()
+    if duplicated.any():
+        logger.warning(f"{label}: {int(duplicated.sum())} duplicate {'/'.join(key)} values, keeping the first")
+        df = df[~duplicated]
+    return df
+
+
+def _row_hashes(df: pd.DataFrame) -> pd.Series:
+    """uint64 hash of each row's values (columns in sorted order), indexed like `df`."""
+    columns = sorted(df.columns)
+    values = df[columns].astype({c: str for c in columns if df[c].dtype == object})
+    return pd.Series(pd.util.hash_pandas_object(values, index=False).to_numpy(), index=df.index)
+
+
+def _cached_row_hashes(path: Optional[Path], df: pd.DataFrame, key: list) -> pd.Series:
+    if path is None:
+        return _row_hashes(df)
+    cache_path = snapshot_cache_path(path, "rowhash")
+    fingerprint = combine_fingerprints([DIFF_VERSION, *key, *sorted(df.columns), file_fingerprint(path)])
+    if read_parquet_fingerprint(cache_path) == fingerprint:
+        cached = pd.read_parquet(cache_path).set_index(key)["hash"]
+        if cached.index.equals(df.index):
+            return cached
+    hashes = _row_hashes(df)
+    write_fingerprinted_parquet(hashes.rename("hash").reset_index(), cache_path, fingerprint)
+    return hashes
+
+
+def _values_differ(old: pd.Series, new: pd.Series) -> np.ndarray:
+    if old.dtype != new.dtype:
+        if pd.api.types.is_numeric_dtype(old) and pd.api.types.is_numeric_dtype(new):
+            old, new = old.astype("float64"), new.astype("float64")
+        else:
+            old, new = old.astype(str).where(old.notna()), new.astype(str).where(new.notna())
+    equal = (old.to_numpy() == new.to_numpy()) | (old.isna().to_numpy() & new.isna().to_numpy())
+    return ~equal
+
+
+@profiled()
+def diff_snapshots(
+    old: Union[Path, pd.DataFrame],
+    new: Union[Path, pd.DataFrame],
+    key: Optional[Sequence[str]] = None,
+    columns: Optional[Sequence[str]] = None,
+) -> SnapshotDiff:
+    """
+    Compare two snapshots of the same feature by key.
+
+    Parameters
+    ----------
+    old, new : Path or pd.DataFrame
+        Snapshot files (GeoJSON, Parquet, CSV, ...) or already-loaded frames.
+    key : sequence of str, optional
+        Key columns (default: from `SNAPSHOT_KEYS` for the snapshot's feature).
+    columns : sequence of str, optional
+        Only compare these columns (default: every column in both snapshots,
+        except `IGNORED_COLUMNS`).
+
+    Returns
+    -------
+    SnapshotDiff
+        `added` and `changed` hold the new rows, `removed` the old ones, all
+        indexed by key; `changes` has one row per changed value (key columns,
+        'column', 'old_value', 'new_value' as strings, geometry as hex WKB).
+    """
+    old_path = Path(old) if not isinstance(old, pd.DataFrame) else None
+    new_path = Path(new) if not isinstance(new, pd.DataFrame) else None
+    old_df = read_snapshot(old_path) if old_path is not None else old
+    new_df = read_snapshot(new_path) if new_path is not None else new
+
+    if key is None:
+        feature = snapshot_feature(new_path or old_path or "")
+        key = snapshot_key(new_df, feature)
+    key = list(key)
+
+    old_df = _keyed(old_df, key, old_path.name if old_path else "old")
+    new_df = _keyed(new_df, key, new_path.name if new_path else "new")
+
+    added_columns = [c for c in new_df.columns if c not in old_df.columns]
+    removed_columns = [c for c in old_df.columns if c not in new_df.columns]
+    common = [c for c in new_df.columns if c in old_df.columns and (columns is None or c in columns)]
+
+    # Only the row hashes of the compared columns are cached, so hash from files only when comparing everything
+    cacheable = columns is None and not added_columns and not removed_columns
+    old_hash = _cached_row_hashes(old_path if cacheable else None, old_df[common], key)
+    new_hash = _cached_row_hashes(new_path if cacheable else None, new_df[common], key)
+
+    added_keys = new_df.index.difference(old_df.index)
+    removed_keys = old_df.index.difference(new_df.index)
+    both = new_df.index.intersection(old_df.index)
+    candidates = both[old_hash.reindex(both).to_numpy() != new_hash.reindex(both).to_numpy()]
+
+    # Compare the candidate rows column by column; dtype-only differences don't count as changes
+    old_rows, new_rows = old_df.loc[candidates, common], new_df.loc[candidates, common]
+    parts, changed_mask = [], np.zeros(len(candidates), dtype=bool)
+    for column in common:
+        differs = _values_differ(old_rows[column], new_rows[column])
+        if not differs.any():
+            continue
+        changed_mask |= differs
+        part = pd.DataFrame(index=candidates[differs])
+        part["column"] = column
+        part["old_value"] = old_rows[column][differs].astype("string").to_numpy()
+        part["new_value"] = new_rows[column][differs].astype("string").to_numpy()
+        parts.append(part)
+
+    changes = pd.concat(parts) if parts else pd.DataFrame(columns=["column", "old_value", "new_value"])
+    changes = changes.rename_axis(key).reset_index()
+    changed_keys = candidates[changed_mask]
+
+    diff = SnapshotDiff(
+        key=key,
+        added=new_df.loc[added_keys],
+        removed=old_df.loc[removed_keys],
+        changed=new_df.loc[changed_keys],
+        changes=changes,
+        unchanged=len(both) - len(changed_keys),
+        added_columns=added_columns,
+        removed_columns=removed_columns,
+    )
+    logger.info(f"Snapshot diff: {diff.summary()}")
+    return diff
+
+
+def apply_delta(
+    previous: pd.DataFrame,
+    diff: SnapshotDiff,
+    process: Callable[[pd.DataFrame], pd.DataFrame],
+) -> pd.DataFrame:
+    """
+    Update a downstream stage's output by processing only the delta.
+
+    Parameters
+    ----------
+    previous : pd.DataFrame
+        The stage's output for the old snapshot, with the key columns.
+    diff : SnapshotDiff
+        Diff between the old and new snapshots.
+    process : callable
+        The stage itself: takes snapshot rows (key as columns) and returns output
+        rows carrying the key columns.
+
+    Returns
+    -------
+    pd.DataFrame
+        `previous` without removed and changed keys, plus `process` applied to the
+        added and changed rows.
+    """
+    if diff.added_columns or diff.removed_columns:
+        logger.warning("Snapshot columns changed; the delta may not cover derived columns")
+    stale = diff.removed.index.append(diff.changed.index)
+    keep = ~previous.set_index(diff.key).index.isin(stale)
+    delta = pd.concat([diff.added, diff.changed]).reset_index()
+    processed = process(delta) if len(delta) else previous.iloc[:0]
+    return pd.concat([previous[keep], processed], ignore_index=True)
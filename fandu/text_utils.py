@@ -0,0 +1,121 @@
+"""
+Whole-frame text normalization for address layers
+
+City layers arrive with stray whitespace: doubled or trailing spaces,
+non-breaking spaces and the odd control character.  `normalize_text_columns`
+cleans every text column in one pass per column: each distinct value is
+normalized once (control characters dropped, any whitespace run, NBSP
+included, collapsed to a single space, ends trimmed) and the results are
+taken back onto the column by factor code.  `join_text_columns` builds
+composite labels (e.g. AddressBase) from several columns the same way.
+"""
+from typing import Optional, Sequence
+
+import numpy as np
+import pandas as pd
+from loguru import logger
+
+from fandu.profiling import profiled
+
+# Control characters (C0, DEL, C1) that are not whitespace are deleted;
+# whitespace, NBSP included, is left for str.split() to collapse
+_TEXT_TABLE = {
+    c: None
+    for c in [*range(0x00, 0x20), *range(0x7F, 0xA0)]
+    if not chr(c).isspace()
+}
+
+
+def normalize_text(value: str) -> str:
+    """Drop control characters, collapse whitespace runs to one space and trim."""
+    return " ".join(value.translate(_TEXT_TABLE).split())
+
+
+def _normalize_factorized(values: pd.Series) -> tuple[pd.Series, int]:
+    """Normalize the string values of `values` once per distinct value; return (values, changed count)."""
+    codes, uniques = pd.factorize(values, use_na_sentinel=True)
+    uniques = np.asarray(uniques, dtype=object)
+    normalized = np.array([normalize_text(u) if isinstance(u, str) else u for u in uniques], dtype=object)
+
+    changed_unique = normalized != uniques
+    present = codes >= 0
+    changed = int(changed_unique[codes[present]].sum())
+
+    out = values.to_numpy(dtype=object, copy=True)
+    out[present] = normalized[codes[present]]
+    return pd.Series(out, index=values.index, name=values.name).astype(values.dtype), changed
+
+
+@profiled()
+def normalize_text_columns(
+    df: pd.DataFrame,
+    columns: Optional[Sequence[str]] = None,
+    name: str = "Text",
+) -> tuple[pd.DataFrame, pd.Series]:
+    """
+    Normalize the text columns of a frame.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        Frame (or GeoDataFrame) to clean; it is not modified.
+    columns : sequence of str, optional
+        Columns to normalize (default: every object and string column).
+    name : str, optional
+        Label used when logging the change counts (default='Text').
+
+    Returns
+    -------
+    tuple
+        (cleaned copy of `df`, values changed per column). Missing values and
+        non-string values are left as they are.
+    """
+    if columns is None:
+        columns = [
+            col for col in df.columns
+            if pd.api.types.is_object_dtype(df[col]) or pd.api.types.is_string_dtype(df[col])
+        ]
+
+    df = df.copy()
+    counts = {}
+    for col in columns:
+        df[col], counts[col] = _normalize_factorized(df[col])
+
+    counts = pd.Series(counts, dtype="int64", name="changed")
+    changed = counts[counts > 0]
+    logger.info(
+        f"{name}: normalized {len(counts)} text columns, {int(changed.sum())} values changed"
+        + (f" ({', '.join(f'{col}={n}' for col, n in changed.items())})" if len(changed) else "")
+    )
+    return df, counts
+
+
+def join_text_columns(df: pd.DataFrame, columns: Sequence[str], exclude: Sequence[str] = ()) -> pd.Series:
+    """
+    Join several columns with spaces into one normalized label, e.g. AddressBase.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        Frame holding `columns`.
+    columns : sequence of str
+        Columns to join, in order.
+    exclude : sequence of str, optional
+        Values treated as empty (e.g. 'None').
+
+    Returns
+    -------
+    pd.Series
+        Labels with missing and excluded parts skipped, whitespace collapsed
+        and ends trimmed; '' when every part is empty.
+    """
+    parts = []
+    for col in columns:
+        part = df[col].fillna("").astype(str)
+        if exclude:
+            part = part.mask(part.isin(list(exclude)), "")
+        parts.append(part.astype(object))
+    joined = parts[0].str.cat(parts[1:], sep=" ") if len(parts) > 1 else parts[0]
+
+    labels, _ = _normalize_factorized(joined)
+    return labels
@@ -6,12 +6,12 @@ import os
 import re
 import json
 import click
-import numpy as np
-import pandas as pd
-from rapidfuzz import fuzz, process
 
-from tabulate import tabulate
-from IPython.display import Markdown
+from fandu.profiling import profiled
+
+# pandas and rapidfuzz are imported inside the functions that use them so that
+# importing fandu.utils (e.g. from the CLI) stays cheap.  The Markdown table
+# helpers live in fandu.notebook_utils.
 
 
 def test_function():
@@ -70,6 +70,7 @@ def fix_common_broken_characters(df):
 
     return df
 
+@profiled()
 def fix_mojibake_dataframe(df):
     """
     Apply mojibake fixing to 'data' column.
@@ -78,6 +79,7 @@ def fix_mojibake_dataframe(df):
     df["data"] = df["data"].apply(fix_mojibake_text)
     return df
 
+@profiled()
 def load_excel_sheet(file_path, *, sheet_name=0, header_row=0, skip_rows=None, column_names=None, columns=None):
     """
     Load an Excel sheet into a pandas DataFrame with optional mojibake repair.
@@ -90,6 +92,8 @@ def load_excel_sheet(file_path, *, sheet_name=0, header_row=0, skip_rows=None, c
     - column_names: If provided, overrides header and uses these names.
     - columns: Restrict to specific columns (e.g., [0, 2, 4] or ['Name', 'Address'])
     """
+    import pandas as pd
+
     try:
         read_args = {
             "sheet_name": sheet_name,
@@ -142,12 +146,15 @@ def standardize_string_columns(df, columns):
     return df
 
     
+@profiled()
 def load_csv_file(file_path, *, header_row=None, skip_rows=None, column_names=None):
     """
     Load a CSV UTF-8 file into a pandas DataFrame.
     Trims and cleans all records.
     Always forces one clean string column after loading.
     """
+    import pandas as pd
+
     try:
         read_args = {
             "encoding": "utf-8",
@@ -207,6 +214,7 @@ def resort_by_year_and_chair_block_order(df):
     return df_sorted.reset_index(drop=True)
 
 
+@profiled()
 def extract_and_fill_year_and_chair_column(df):
     """
     Identify header rows (4-digit year + 'chair') and detect Tour A / Tour B markers.
@@ -219,6 +227,8 @@ def extract_and_fill_year_and_chair_column(df):
     Returns:
     - DataFrame with columns: 'data', 'year_and_chair', 'tour', 'notes'
     """
+    import pandas as pd
+
     df = df.copy()
     df["data"] = df["data"].astype(str).str.strip()
 
@@ -287,6 +297,7 @@ def extract_and_fill_year_and_chair_column(df):
     return df_clean
 
 
+@profiled()
 def split_year_and_chair_columns(df):
     """
     Given a DataFrame with a 'year_and_chair' column, extract 'year' and 'chair' parts.
@@ -324,6 +335,7 @@ def extract_chair_names(chair_entry):
     - chair1_first, chair1_last: parsed components of chair1
     - chair2_first, chair2_last: parsed components of chair2
     """
+    import pandas as pd
 
     def get_first_and_last_name(name):
         """
@@ -421,21 +433,27 @@ def extract_chair_names(chair_entry):
 
     return chair1, chair1_first, chair1_last, chair2, chair2_first, chair2_last
 
+@profiled()
 def split_and_add_chairs( df ):
     """
     Pull out the chair names to new column.
     """
+    import pandas as pd
+
     df = df.copy()
     df[['chair1', 'chair1_first_name', 'chair1_last_name', \
         'chair2', 'chair2_first_name', 'chair2_last_name']] = df['chair'].apply(lambda x: pd.Series(extract_chair_names(x)))
     return df
 
 
+@profiled()
 def split_address_and_host(df):
     """
     Splits the 'data' column into 'address', 'unit_number', 'place_name', and 'host_name'.
     Handles unit numbers even without comma before '#', extracts place names, and splits address vs host safely.
     """
+    import pandas as pd
+
     df = df.copy()
 
     dash_pattern = re.compile(r'[-–—]{1,2}')
@@ -484,6 +502,7 @@ def split_address_and_host(df):
 
     return df
 
+@profiled()
 def split_address_parts(df):
     """
     Splits the 'address' column into 'street_number', 'street_name', and 'street_type'.
@@ -511,6 +530,7 @@ def split_address_parts(df):
     return df
 
 
+@profiled()
 def perform_column_cleaning( df ):
     """
     Cleans a specific column by applying street type corrections.
@@ -566,6 +586,7 @@ def perform_column_cleaning( df ):
     return df
 
 
+@profiled()
 def recode_street_names(df):
     """
     Recode specific street_name values to standard form.
@@ -606,6 +627,7 @@ def recode_street_names(df):
     return df
 
 
+@profiled()
 def build_clean_address( df ):
     df = df.copy()
     df["clean_address"] = df["street_number"] + " " + df["street_name"] + " " + df["street_type"]
@@ -617,6 +639,7 @@ def normalize_address(address):
     """
     Lowercase, strip, and replace common punctuation and abbreviations.
     """
+    import pandas as pd
 
     if not isinstance(address, str):
         address = str(address) if pd.notna(address) else ""
@@ -629,7 +652,11 @@ def normalize_address(address):
                   .strip())
 
 
+@profiled()
 def match_addresses(master_df, unmatched_df, threshold=90):
+    import pandas as pd
+    from rapidfuzz import fuzz, process
+
     # Normalize address columns
     master_df['normalized'] = master_df['AddressLabel'].apply(normalize_address)
     unmatched_df['normalized'] = unmatched_df['clean_address'].apply(normalize_address)
@@ -666,9 +693,12 @@ def match_addresses(master_df, unmatched_df, threshold=90):
     return matched_df, unmatched_df
 
 
+@profiled()
 def save_to_geojson(df, filename):
     """
     """
+    import pandas as pd
+
     keep_props = [
         "year", "chair1", "chair2", "clean_address", 
         "host_name", "zip_code", "state_plane_x", "state_plane_y"
@@ -703,59 +733,16 @@ def save_to_geojson(df, filename):
 
 
 def load_contacts_csv(filepath):
-    df = pd.read_csv(filepath, skiprows=[1])  # Skip 2nd row with SystemCode
-    return df
-
-
-def cross_tab_markdown(contacts, row_variable, col_variable, show_row_totals=False, show_col_totals=False):
     """
-    Create a markdown cross-tabulation of two columns in the contacts DataFrame.
-
-    Parameters:
-        contacts (pd.DataFrame): The contacts DataFrame.
-        row_variable (str): The column to group as rows.
-        col_variable (str): The column to group as columns.
-        show_row_totals (bool): Whether to include a totals row.
-        show_col_totals (bool): Whether to include a totals column.
-
-    Returns:
-        Markdown: A GitHub-flavored Markdown table for use in Jupyter or Quarto.
-    """
-
-    def safe_fillna(column, value):
-        # Add value to categories first if the column is categorical
-        if isinstance(column.dtype, pd.CategoricalDtype):
-            if value not in column.cat.categories:
-                column = column.cat.add_categories([value])
-        return column.fillna(value)
-
-    # Safely handle missing values in both axes
-    contacts[row_variable] = safe_fillna(contacts[row_variable], "Unknown")
-    contacts[col_variable] = safe_fillna(contacts[col_variable], "None")
-
-    # Determine whether to add totals
-    add_margins = show_row_totals or show_col_totals
-    margins_name = "Total"
-
-    # Generate crosstab
-    crosstab = pd.crosstab(
-        contacts[row_variable],
-        contacts[col_variable],
-        margins=add_margins,
-        margins_name=margins_name
-    )
-
-    # Remove unwanted total rows/cols if needed
-    if add_margins:
-        if not show_row_totals:
-            crosstab = crosstab.drop(index=margins_name, errors="ignore")
-        if not show_col_totals:
-            crosstab = crosstab.drop(columns=margins_name, errors="ignore")
+    Wild Apricot contact export with its original headers (the SystemCode row is skipped).
+    Flags (Member, IsAccountAdministrator, ...) are bool, User ID and Id int64 and
+    the other declared numbers float, as `pd.read_csv` infers them; the remaining
+    columns are strings.
+    """
+    from fandu.csv_sources import read_source_csv
 
-    # Format table
-    markdown_table = tabulate(crosstab, headers="keys", tablefmt="github")
+    return read_source_csv(filepath, "FDA_contacts", normalize=False)
 
-    return Markdown(markdown_table)
 
 def filter_contacts(contacts, criteria, logic="and"):
     """
@@ -804,88 +791,6 @@ def filter_contacts(contacts, criteria, logic="and"):
     return contacts[combined_mask]
 
 
-def list_contacts_markdown(contacts, columns, max_rows=20, sort_columns=None):
-    """
-    Returns a Markdown-formatted table of selected columns from the contacts DataFrame,
-    optionally allowing custom column labels and case-insensitive sorting.
-
-    Parameters:
-        contacts (pd.DataFrame): The full contacts dataset.
-        columns (list of str or dict): Columns to include. Dicts map real column -> display label.
-        max_rows (int): Maximum number of rows to show in the Markdown table.
-        sort_columns (list of str or dict): Optional sort order. Strings default to ascending.
-            Dicts must be of form {column: "asc" or "desc"}.
-
-    Returns:
-        Markdown: A GitHub-flavored Markdown table.
-    """
-    column_keys = []
-    column_labels = []
-
-    for col in columns:
-        if isinstance(col, str):
-            if col not in contacts.columns:
-                raise KeyError(f"Column '{col}' not found in contacts DataFrame.")
-            column_keys.append(col)
-            column_labels.append(col)
-        elif isinstance(col, dict):
-            for key, label in col.items():
-                if key not in contacts.columns:
-                    raise KeyError(f"Column '{key}' not found in contacts DataFrame.")
-                column_keys.append(key)
-                column_labels.append(label)
-        else:
-            raise TypeError("Each column must be a string or a single-key dictionary.")
-
-    # Create a DataFrame with only the selected columns
-    subset = contacts[column_keys].copy()
-
-    # Handle sorting (case-insensitive where applicable)
-    if sort_columns:
-        sort_keys = []
-        ascending_flags = []
-
-        for item in sort_columns:
-            if isinstance(item, str):
-                key = item
-                order = "asc"
-            elif isinstance(item, dict):
-                key, order = next(iter(item.items()))
-            else:
-                raise TypeError("sort_columns must be a list of strings or single-key dictionaries.")
-
-            if key not in column_keys:
-                raise ValueError(f"Sort column '{key}' must also be in the columns list.")
-            if order.lower() not in ["asc", "desc"]:
-                raise ValueError(f"Invalid sort order '{order}' for column '{key}'. Use 'asc' or 'desc'.")
-
-            sort_keys.append(key)
-            ascending_flags.append(order.lower() == "asc")
-
-            # Convert string columns to lowercase temporarily for sorting
-            if subset[key].dtype == object:
-                subset[key + "_sortkey"] = subset[key].str.lower()
-            else:
-                subset[key + "_sortkey"] = subset[key]
-
-        # Sort by sortkey columns
-        sortkey_columns = [k + "_sortkey" for k in sort_keys]
-        subset = subset.sort_values(by=sortkey_columns, ascending=ascending_flags)
-
-        # Drop temporary sort columns
-        subset = subset.drop(columns=sortkey_columns)
-
-    # Apply column renaming
-    subset.columns = column_labels
-
-    # Limit rows
-    subset = subset.head(max_rows)
-
-    # Generate markdown
-    markdown_table = tabulate(subset, headers="keys", tablefmt="github", showindex=False)
-    return Markdown(markdown_table)
-
-
 def find_duplicate_contacts(contacts, key_columns=["FirstName", "LastName"]):
     """
     Finds potential duplicate contacts based on matching values in key columns.
@@ -943,3 +848,10 @@ def filter_contains(contacts, criteria, logic="or"):
 
     return contacts[combined_mask]
 
+
+def __getattr__(name):
+    # The Markdown helpers moved to fandu.notebook_utils; keep old imports working
+    if name in ("cross_tab_markdown", "list_contacts_markdown"):
+        from fandu import notebook_utils
+        return getattr(notebook_utils, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
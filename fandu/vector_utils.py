@@ -0,0 +1,397 @@
+"""
+Streaming vector I/O for Fandu
+
+Reads shapefiles, GeoJSON and GeoParquet as Arrow batches (WKB geometry), so
+city-wide layers can be merged or rasterized without ever holding a whole
+layer in memory.
+"""
+import json
+
+from pathlib import Path
+from typing import Iterator, Optional, Sequence
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+import pyogrio
+import shapely
+import geopandas as gpd
+import matplotlib.pyplot as plt
+from loguru import logger
+from pyproj import CRS, Transformer
+
+from fandu.profiling import profiled
+
+GEOMETRY_COLUMN = "geometry"
+
+# Shapely geometry type ids
+_POINT_TYPES = (0, 4)        # Point, MultiPoint
+_LINE_TYPES = (1, 2, 5)      # LineString, LinearRing, MultiLineString
+_POLYGON_TYPES = (3, 6)      # Polygon, MultiPolygon
+
+# Upper bound on (polygon, pixel) pairs tested at once while rasterizing
+_MAX_PIXEL_TESTS = 4_000_000
+
+
+def _is_parquet(path: Path) -> bool:
+    return Path(path).suffix.lower() in (".parquet", ".geoparquet")
+
+
+def _parquet_geo(schema: pa.Schema) -> tuple[str, str]:
+    """Primary geometry column and CRS recorded in GeoParquet 'geo' metadata."""
+    geo = json.loads((schema.metadata or {}).get(b"geo", b"{}"))
+    column = geo.get("primary_column", GEOMETRY_COLUMN)
+    crs = geo.get("columns", {}).get(column, {}).get("crs", "OGC:CRS84")
+    return column, CRS.from_user_input(crs).to_string() if crs else None
+
+
+def vector_schema(path: Path) -> tuple[pa.Schema, Optional[str]]:
+    """
+    Attribute schema (geometry excluded) and CRS of a vector file, read without
+    loading any features.
+    """
+    path = Path(path)
+    if _is_parquet(path):
+        schema = pq.read_schema(path)
+        column, crs = _parquet_geo(schema)
+        return pa.schema([f for f in schema if f.name != column]), crs
+
+    with pyogrio.raw.open_arrow(path, use_pyarrow=True, max_features=0) as (meta, reader):
+        column = meta["geometry_name"] or "wkb_geometry"
+        return pa.schema([f for f in reader.schema if f.name != column]), meta["crs"]
+
+
+def iter_vector_batches(
+    path: Path,
+    batch_size: int = 65_536,
+    columns: Optional[Sequence[str]] = None,
+) -> Iterator[tuple[pa.Table, Optional[str]]]:
+    """
+    Stream a vector file as Arrow tables of at most `batch_size` rows.
+
+    Parameters
+    ----------
+    path : Path
+        Shapefile, GeoJSON (any OGR format) or GeoParquet file.
+    batch_size : int, optional
+        Maximum rows per batch (default=65536).
+    columns : sequence of str, optional
+        Attribute columns to read (default: all).  Pass [] for geometry only.
+
+    Yields
+    ------
+    tuple
+        (table, crs) where the table's WKB geometry is in a 'geometry' column.
+    """
+    path = Path(path)
+    if _is_parquet(path):
+        parquet = pq.ParquetFile(path)
+        column, crs = _parquet_geo(parquet.schema_arrow)
+        read_columns = None if columns is None else [*columns, column]
+        for batch in parquet.iter_batches(batch_size=batch_size, columns=read_columns):
+            table = pa.Table.from_batches([batch])
+            if column != GEOMETRY_COLUMN:
+                table = table.rename_columns([GEOMETRY_COLUMN if c == column else c for c in table.column_names])
+            yield table, crs
+        return
+
+    with pyogrio.raw.open_arrow(
+        path, use_pyarrow=True, batch_size=batch_size, columns=columns
+    ) as (meta, reader):
+        column = meta["geometry_name"] or "wkb_geometry"
+        for batch in reader:
+            table = pa.Table.from_batches([batch])
+            table = table.rename_columns([GEOMETRY_COLUMN if c == column else c for c in table.column_names])
+            yield table, meta["crs"]
+
+
+def reconcile_schemas(schemas: Sequence[pa.Schema]) -> pa.Schema:
+    """
+    Union of several attribute schemas.
+
+    Columns keep their first-seen order.  Conflicting types are widened:
+    integers to int64, mixed integers/floats to float64, anything else to string.
+    """
+    types: dict[str, list] = {}
+    for schema in schemas:
+        for field in schema:
+            if not pa.types.is_null(field.type):
+                types.setdefault(field.name, []).append(field.type)
+            else:
+                types.setdefault(field.name, [])
+
+    fields = []
+    for name, candidates in types.items():
+        unique = list(dict.fromkeys(candidates))
+        if not unique:
+            dtype = pa.string()
+        elif len(unique) == 1:
+            dtype = unique[0]
+        elif all(pa.types.is_integer(t) for t in unique):
+            dtype = pa.int64()
+        elif all(pa.types.is_integer(t) or pa.types.is_floating(t) for t in unique):
+            dtype = pa.float64()
+        else:
+            dtype = pa.string()
+        fields.append(pa.field(name, dtype))
+    return pa.schema(fields)
+
+
+def _reproject_wkb(wkb: pa.ChunkedArray, transformer: Optional[Transformer]) -> np.ndarray:
+    """Decode WKB geometries as 2D and reproject them with `transformer` (if any)."""
+    geoms = shapely.force_2d(shapely.from_wkb(wkb.to_numpy(zero_copy_only=False)))
+    if transformer is not None:
+        geoms = shapely.transform(geoms, transformer.transform, interleaved=False)
+    return geoms
+
+
+def _conform(table: pa.Table, schema: pa.Schema) -> list[pa.Array]:
+    """Attribute columns of `table` cast to `schema`, with missing columns as nulls."""
+    arrays = []
+    for field in schema:
+        if field.name in table.column_names:
+            arrays.append(pc.cast(table[field.name], field.type, safe=False))
+        else:
+            arrays.append(pa.nulls(table.num_rows, field.type))
+    return arrays
+
+
+@profiled()
+def merge_vector_files(
+    paths: Sequence[Path],
+    output: Path,
+    crs: Optional[str] = None,
+    batch_size: int = 65_536,
+    source_column: Optional[str] = "source",
+) -> int:
+    """
+    Concatenate vector files into one layer, streaming batch by batch.
+
+    Attribute schemas are reconciled up front (see `reconcile_schemas`), each
+    batch is reprojected to the common CRS and written straight to `output`.
+
+    Parameters
+    ----------
+    paths : sequence of Path
+        Input shapefiles, GeoJSON or GeoParquet files.
+    output : Path
+        Output file.  '.parquet' is written as GeoParquet; any other extension
+        is written by OGR (e.g. '.gpkg', '.shp').
+    crs : str, optional
+        Output CRS (default: the CRS of the first input).
+    batch_size : int, optional
+        Rows per batch (default=65536).
+    source_column : str, optional
+        Column recording each feature's input file name (default='source');
+        None to omit.
+
+    Returns
+    -------
+    int
+        Number of features written.
+    """
+    paths = [Path(p) for p in paths]
+    output = Path(output)
+    schemas, crses = zip(*(vector_schema(p) for p in paths))
+    schema = reconcile_schemas(schemas)
+    if source_column is not None:
+        schema = schema.append(pa.field(source_column, pa.string()))
+    target_crs = CRS.from_user_input(crs or next((c for c in crses if c), "EPSG:4326"))
+
+    parquet_out = _is_parquet(output)
+    writer = None
+    written = 0
+    try:
+        for path, source_crs in zip(paths, crses):
+            transformer = None
+            if source_crs and not CRS.from_user_input(source_crs).equals(target_crs):
+                transformer = Transformer.from_crs(source_crs, target_crs, always_xy=True)
+
+            for table, _ in iter_vector_batches(path, batch_size=batch_size):
+                geoms = _reproject_wkb(table[GEOMETRY_COLUMN], transformer)
+                if source_column is not None:
+                    table = table.append_column(source_column, pa.array([path.name] * table.num_rows))
+                arrays = _conform(table, schema)
+
+                if parquet_out:
+                    batch = pa.Table.from_arrays(
+                        [*arrays, pa.array(shapely.to_wkb(geoms), pa.binary())],
+                        schema=schema.append(pa.field(GEOMETRY_COLUMN, pa.binary())),
+                    )
+                    if writer is None:
+                        geo = {
+                            "version": "1.0.0",
+                            "primary_column": GEOMETRY_COLUMN,
+                            "columns": {GEOMETRY_COLUMN: {
+                                "encoding": "WKB",
+                                "geometry_types": [],
+                                "crs": target_crs.to_json_dict(),
+                            }},
+                        }
+                        batch_schema = batch.schema.with_metadata({b"geo": json.dumps(geo).encode("utf-8")})
+                        writer = pq.ParquetWriter(output, batch_schema)
+                    writer.write_table(batch.replace_schema_metadata(writer.schema.metadata))
+                else:
+                    gdf = gpd.GeoDataFrame(
+                        pa.Table.from_arrays(arrays, schema=schema).to_pandas(),
+                        geometry=geoms,
+                        crs=target_crs,
+                    )
+                    pyogrio.write_dataframe(gdf, output, append=written > 0)
+
+                written += table.num_rows
+            logger.info(f"Merged {path.name} ({written} features so far)")
+    finally:
+        if writer is not None:
+            writer.close()
+    return written
+
+
+def _fill_polygons(grid: np.ndarray, geoms: np.ndarray, x0: float, y1: float, pixel: float) -> None:
+    """
+    Add 1 to every pixel whose centre falls inside each polygon.
+
+    Polygons smaller than a pixel are counted at their centroid, so small
+    parcels don't vanish at city scale.
+    """
+    height, width = grid.shape
+    bounds = shapely.bounds(geoms)
+    col0 = np.clip(np.floor((bounds[:, 0] - x0) / pixel - 0.5).astype(np.int64) + 1, 0, width)
+    col1 = np.clip(np.floor((bounds[:, 2] - x0) / pixel - 0.5).astype(np.int64), -1, width - 1)
+    row0 = np.clip(np.floor((y1 - bounds[:, 3]) / pixel - 0.5).astype(np.int64) + 1, 0, height)
+    row1 = np.clip(np.floor((y1 - bounds[:, 1]) / pixel - 0.5).astype(np.int64), -1, height - 1)
+    widths = np.maximum(col1 - col0 + 1, 0)
+    counts = widths * np.maximum(row1 - row0 + 1, 0)
+    hits = np.zeros(len(geoms), dtype=np.int64)
+    shapely.prepare(geoms)
+
+    # Test (polygon, pixel-centre) pairs in chunks of bounded size
+    ends = np.cumsum(counts)
+    start = 0
+    while start < len(geoms):
+        stop = max(int(np.searchsorted(ends, ends[start] - counts[start] + _MAX_PIXEL_TESTS, side="right")), start + 1)
+        chunk = np.arange(start, stop)
+        chunk_counts = counts[chunk]
+        geom_idx = np.repeat(chunk, chunk_counts)
+        local = np.arange(chunk_counts.sum()) - np.repeat(np.cumsum(chunk_counts) - chunk_counts, chunk_counts)
+        cols = col0[geom_idx] + local % widths[geom_idx]
+        rows = row0[geom_idx] + local // widths[geom_idx]
+        inside = shapely.contains_xy(geoms[geom_idx], x0 + (cols + 0.5) * pixel, y1 - (rows + 0.5) * pixel)
+        np.add.at(grid, (rows[inside], cols[inside]), 1)
+        hits[chunk] = np.bincount(geom_idx[inside] - start, minlength=len(chunk))
+        start = stop
+
+    tiny = hits == 0
+    if tiny.any():
+        _add_points(grid, shapely.get_coordinates(shapely.centroid(geoms[tiny])), x0, y1, pixel)
+
+
+def _add_points(grid: np.ndarray, xy: np.ndarray, x0: float, y1: float, pixel: float) -> None:
+    """Add 1 to the pixel under each coordinate."""
+    height, width = grid.shape
+    cols = np.floor((xy[:, 0] - x0) / pixel).astype(np.int64)
+    rows = np.floor((y1 - xy[:, 1]) / pixel).astype(np.int64)
+    keep = (cols >= 0) & (cols < width) & (rows >= 0) & (rows < height)
+    np.add.at(grid, (rows[keep], cols[keep]), 1)
+
+
+@profiled()
+def rasterize_vector_files(
+    paths: Sequence[Path],
+    width: int = 2000,
+    crs: Optional[str] = None,
+    batch_size: int = 65_536,
+) -> dict:
+    """
+    Aggregate vector layers into count grids instead of drawing each feature.
+
+    Two streaming passes: the first finds the extent, the second bins
+    polygon interiors and points into a 'fill' grid and polygon outlines and
+    lines into an 'edge' grid.
+
+    Parameters
+    ----------
+    paths : sequence of Path
+        Input shapefiles, GeoJSON or GeoParquet files.
+    width : int, optional
+        Raster width in pixels (default=2000); height follows the extent.
+    crs : str, optional
+        CRS to render in (default: the CRS of the first input).
+    batch_size : int, optional
+        Rows per batch (default=65536).
+
+    Returns
+    -------
+    dict
+        'fill' and 'edge' (float32 arrays, row 0 at the top), 'extent'
+        (xmin, xmax, ymin, ymax) and 'crs'.
+    """
+    paths = [Path(p) for p in paths]
+    crses = [vector_schema(p)[1] for p in paths]
+    target_crs = CRS.from_user_input(crs or next((c for c in crses if c), "EPSG:4326"))
+    transformers = [
+        Transformer.from_crs(c, target_crs, always_xy=True)
+        if c and not CRS.from_user_input(c).equals(target_crs) else None
+        for c in crses
+    ]
+
+    def batches():
+        for path, transformer in zip(paths, transformers):
+            for table, _ in iter_vector_batches(path, batch_size=batch_size, columns=[]):
+                geoms = _reproject_wkb(table[GEOMETRY_COLUMN], transformer)
+                yield geoms[~(shapely.is_missing(geoms) | shapely.is_empty(geoms))]
+
+    # Pass 1: extent
+    extent = np.array([np.inf, np.inf, -np.inf, -np.inf])
+    for geoms in batches():
+        if len(geoms):
+            b = shapely.total_bounds(geoms)
+            extent = np.array([min(extent[0], b[0]), min(extent[1], b[1]), max(extent[2], b[2]), max(extent[3], b[3])])
+    if not np.isfinite(extent).all():
+        raise ValueError("No geometries to rasterize")
+    x0, y0, x1, y1 = extent
+    pixel = max(x1 - x0, y1 - y0, 1e-9) / width
+    height = max(int(np.ceil((y1 - y0) / pixel)), 1)
+
+    # Pass 2: aggregate
+    fill = np.zeros((height, width), dtype=np.float32)
+    edge = np.zeros((height, width), dtype=np.float32)
+    for geoms in batches():
+        types = shapely.get_type_id(geoms)
+        polygons = geoms[np.isin(types, _POLYGON_TYPES)]
+        if len(polygons):
+            _fill_polygons(fill, polygons, x0, y1, pixel)
+        outlines = np.concatenate([shapely.boundary(polygons), geoms[np.isin(types, _LINE_TYPES)]])
+        if len(outlines):
+            dense = shapely.segmentize(outlines, pixel / 2)
+            _add_points(edge, shapely.get_coordinates(dense), x0, y1, pixel)
+        points = geoms[np.isin(types, _POINT_TYPES)]
+        if len(points):
+            _add_points(fill, shapely.get_coordinates(points), x0, y1, pixel)
+
+    return {"fill": fill, "edge": edge, "extent": (x0, x0 + width * pixel, y1 - height * pixel, y1), "crs": target_crs.to_string()}
+
+
+def plot_raster(raster: dict, output: Path, cmap: str = "Blues", edge_color: str = "#333333", dpi: int = 100) -> Path:
+    """
+    Save a raster from `rasterize_vector_files` as an image, one output pixel per grid cell.
+
+    Fill counts are log-scaled with `cmap`; edges are drawn in `edge_color`.
+    """
+    fill, edge = raster["fill"], raster["edge"]
+    height, width = fill.shape
+    fig = plt.figure(figsize=(width / dpi, height / dpi), dpi=dpi)
+    ax = fig.add_axes((0, 0, 1, 1))
+    ax.set_axis_off()
+
+    shown = np.ma.masked_equal(np.log1p(fill), 0)
+    ax.imshow(shown, cmap=cmap, extent=raster["extent"], interpolation="nearest")
+    edges = np.zeros((height, width, 4), dtype=np.float32)
+    edges[..., :3] = plt.matplotlib.colors.to_rgb(edge_color)
+    edges[..., 3] = edge > 0
+    ax.imshow(edges, extent=raster["extent"], interpolation="nearest")
+
+    fig.savefig(output, dpi=dpi, transparent=False, facecolor="white")
+    plt.close(fig)
+    return Path(output)
@@ -2,25 +2,72 @@
 
 """
 
+import numpy as np
 import pandas as pd
+from functools import cached_property
 from pathlib import Path
 
+# Columns the metrics below use; only these are read from the workbook by default
+ANALYZER_COLUMNS = [
+    "User ID",
+    "Username",
+    "First name",
+    "Last name",
+    "Email",
+    "Membership enabled",
+    "Membership level",
+    "Member bundle ID or email",
+]
+
+# Added when several exports are analyzed together; duplicates are found within each export
+SOURCE_COLUMN = "Export file"
+
+# Duplicate check name -> key columns
+DUPLICATE_KEYS = {
+    "email": ["Email"],
+    "name": ["First name", "Last name"],
+    "bundle": ["Member bundle ID or email"],
+}
+
 
 class ExcelAnalyzer:
-    def __init__(self, file_path, sheet_name=0):
-        """Initialize with an Excel file and load it into a Pandas DataFrame."""
+    def __init__(self, file_path, sheet_name=0, columns=ANALYZER_COLUMNS):
+        """Initialize with one or more Excel exports (e.g. several years) and load them into a Pandas DataFrame.
+
+        Only `columns` are kept (pass None to keep every column).  Metrics are
+        computed once and cached on the instance.
+        """
+        paths = [file_path] if isinstance(file_path, (str, Path)) else list(file_path)
         self.file_path = file_path
+
+        frames = []
+        for path in paths:
+            df = self._read_export(path, sheet_name, columns)
+            if len(paths) > 1:
+                df[SOURCE_COLUMN] = Path(path).name
+            frames.append(df)
+        self.df = pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
+
+        # Fill missing values in "Member bundle ID or email"
+        self.fill_member_bundle_column()
+
+    @staticmethod
+    def _read_export(path, sheet_name, columns):
+        """Read one export, keeping only `columns` (matched after stripping header spaces)."""
         engine = "openpyxl"
-        if Path(file_path).suffix.lower()==".xls":
+        if Path(path).suffix.lower()==".xls":
             engine = "xlrd"
 
-        self.df = pd.read_excel(file_path, sheet_name=sheet_name, engine=engine)
+        usecols = None
+        if columns is not None:
+            wanted = set(columns)
+            usecols = lambda column: str(column).strip() in wanted
 
-        # Clean up the column names to avoid leading/trailing spaces
-        self.df.columns = self.df.columns.str.strip()
+        df = pd.read_excel(path, sheet_name=sheet_name, engine=engine, usecols=usecols)
 
-        # Fill missing values in "Member bundle ID or email"
-        self.fill_member_bundle_column()
+        # Clean up the column names to avoid leading/trailing spaces
+        df.columns = df.columns.str.strip()
+        return df
 
     def fill_member_bundle_column(self):
         """Fill missing values in 'Member bundle ID or email' with 'Email' or 'User ID'."""
@@ -33,84 +80,93 @@ class ExcelAnalyzer:
         """Returns the total number of records (rows) in the DataFrame."""
         return len(self.df)
 
-    @property
+    @cached_property
     def num_unique_user_ids(self):
         """Returns the number of unique values in the 'User ID' column."""
         return self.df["User ID"].nunique()
 
-    @property
+    @cached_property
     def num_unique_nonblank_emails(self):
         """Returns the number of unique, non-blank emails in the 'Email' column."""
         return self.df["Email"].dropna().nunique()
 
-    @property
+    @cached_property
     def num_unique_nonblank_usernames(self):
         """Returns the number of unique, non-blank values in the 'Username' column."""
         return self.df["Username"].dropna().nunique()
 
-    @property
+    @cached_property
     def num_unique_nonblank_member_bundles(self):
         """Returns the number of unique, non-blank values in the 'Member bundle ID or email' column."""
         return self.df["Member bundle ID or email"].dropna().nunique()
 
-    def count_membership_by_level(self):
-        """Returns a dictionary of counts of 'User ID' where 'Membership enabled' is 'yes', grouped by 'Membership level'."""
+    @cached_property
+    def _enabled_by_level(self):
+        """Unique users and bundles per 'Membership level' where 'Membership enabled' is 'yes', in one groupby."""
         if not {"User ID", "Membership enabled", "Membership level"}.issubset(self.df.columns):
             raise ValueError("Required columns ('User ID', 'Membership enabled', 'Membership level') are missing.")
 
         filtered_df = self.df[self.df["Membership enabled"].str.lower() == "yes"]
-        grouped_counts = filtered_df.groupby("Membership level")["User ID"].nunique()
-        
-        return grouped_counts
-        #return grouped_counts.to_dict()  # Convert to dictionary for easy access
+        columns = [c for c in ("User ID", "Member bundle ID or email") if c in filtered_df.columns]
+        return filtered_df.groupby("Membership level")[columns].nunique()
 
-    def count_bundles_by_level(self):
+    def count_membership_by_level(self):
         """Returns a dictionary of counts of 'User ID' where 'Membership enabled' is 'yes', grouped by 'Membership level'."""
-        if not {"User ID", "Membership enabled", "Membership level"}.issubset(self.df.columns):
-            raise ValueError("Required columns ('User ID', 'Membership enabled', 'Membership level') are missing.")
+        return self._enabled_by_level["User ID"]
 
-        filtered_df = self.df[self.df["Membership enabled"].str.lower() == "yes"]
-        grouped_counts = filtered_df.groupby("Membership level")["Member bundle ID or email"].nunique()
-        
-        return grouped_counts
-        #return grouped_counts.to_dict()  # Convert to dictionary for easy access
+    def count_bundles_by_level(self):
+        """Returns a dictionary of counts of 'Member bundle ID or email' where 'Membership enabled' is 'yes', grouped by 'Membership level'."""
+        return self._enabled_by_level["Member bundle ID or email"]
+
+    @cached_property
+    def duplicate_counts(self):
+        """Rows sharing each record's email, name and bundle (0 where the key is blank).
+
+        Each key is hashed into group numbers once (`groupby().ngroup()`) and
+        the groups counted with a bincount; with several exports the export
+        file is part of each key.
+        """
+        group = [SOURCE_COLUMN] if SOURCE_COLUMN in self.df.columns else []
+        counts = pd.DataFrame(index=self.df.index)
+        for check, columns in DUPLICATE_KEYS.items():
+            if not set(columns).issubset(self.df.columns):
+                continue
+            codes = self.df.groupby(group + columns, sort=False).ngroup().fillna(-1).to_numpy(np.int64)
+            valid = codes >= 0
+            sizes = np.zeros(len(codes), dtype=np.int64)
+            sizes[valid] = np.bincount(codes[valid])[codes[valid]]
+            counts[check] = sizes
+        return counts
+
+    def get_duplicates(self):
+        """Returns user rows with a duplicate email, name or bundle, with the size of each duplicate group."""
+        counts = self.duplicate_counts
+        columns = [c for c in [SOURCE_COLUMN, "User ID", "Username", "First name", "Last name", "Email",
+                               "Membership enabled", "Member bundle ID or email"] if c in self.df.columns]
+        mask = (counts > 1).any(axis=1)
+        return self.df.loc[mask, columns].join(counts[mask].add_prefix("duplicate_"))
 
     def get_users_with_duplicate_emails(self):
-        """Returns a DataFrame with 'User ID', 'Username', 'First name', 'Last name', and 'Email' 
+        """Returns a DataFrame with 'User ID', 'Username', 'First name', 'Last name', and 'Email'
         for all rows where 'Email' appears more than once in the dataset.
         """
         required_columns = {"User ID", "Username", "First name", "Last name", "Email"}
         if not required_columns.issubset(self.df.columns):
             raise ValueError(f"Missing required columns: {required_columns - set(self.df.columns)}")
 
-        # Find duplicate emails (excluding NaN values)
-        duplicate_emails = self.df["Email"].value_counts()
-        duplicate_emails = duplicate_emails[duplicate_emails > 1].index  # Get emails that appear more than once
-
-        # Filter the DataFrame to include only rows with duplicate emails
-        duplicate_users_df = self.df[self.df["Email"].isin(duplicate_emails)][["User ID", "Username", "First name", "Last name", "Email"]]
-
-        return duplicate_users_df
+        mask = self.duplicate_counts["email"] > 1
+        return self.df.loc[mask, ["User ID", "Username", "First name", "Last name", "Email"]]
 
     def get_users_with_duplicate_names(self):
-        """Returns a DataFrame with 'User ID', 'Username', 'First name', 'Last name', 'Email', and 'Membership enabled' 
+        """Returns a DataFrame with 'User ID', 'Username', 'First name', 'Last name', 'Email', and 'Membership enabled'
         for all rows where the combination of 'First name' and 'Last name' appears more than once.
         """
         required_columns = {"User ID", "Username", "First name", "Last name", "Email", "Membership enabled"}
         if not required_columns.issubset(self.df.columns):
             raise ValueError(f"Missing required columns: {required_columns - set(self.df.columns)}")
 
-        # Create a combined column of "First name" and "Last name"
-        name_counts = self.df.groupby(["First name", "Last name"]).size()
-
-        # Find names that appear more than once
-        duplicate_names = name_counts[name_counts > 1].index  # Get tuples of (First name, Last name)
-
-        # Filter the DataFrame for rows with duplicate names
-        duplicate_users_df = self.df[self.df.set_index(["First name", "Last name"]).index.isin(duplicate_names)]
-        
-        # Select relevant columns
-        return duplicate_users_df[["User ID", "Username", "First name", "Last name", "Email", "Membership enabled"]]
+        mask = self.duplicate_counts["name"] > 1
+        return self.df.loc[mask, ["User ID", "Username", "First name", "Last name", "Email", "Membership enabled"]]
 
 
     def summary(self):
@@ -121,4 +177,3 @@ class ExcelAnalyzer:
         print(f"Number of unique, non-blank emails: {self.num_unique_nonblank_emails}")
         print(f"Number of unique, non-blank Usernames: {self.num_unique_nonblank_usernames}")
         print(f"Number of unique, non-blank Member bundle ID or emails: {self.num_unique_nonblank_member_bundles}")
-